@@ -6,7 +6,7 @@ import aiohttp
 import json
 import uuid
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Any, Callable, Dict, Optional
 import logging
 
 from .base_engine import BaseAIEngine, AIResponse, AIEngineConfig
@@ -132,6 +132,25 @@ class AnthropicEngine(BaseAIEngine):
             request_id=str(uuid.uuid4())
         )
     
+    def _raise_api_error(self, status: int, response_data: Dict[str, Any]):
+        """Raise the exception matching an Anthropic API error response"""
+        error_msg = response_data.get("error", {}).get("message", "Unknown error")
+        error_type = response_data.get("error", {}).get("type", "api_error")
+        
+        logger.error(f"Anthropic API error {status}: {error_msg}")
+        
+        # Handle specific error types
+        if status == 401:
+            raise ValueError(f"Authentication failed: {error_msg}")
+        elif status == 429:
+            raise ValueError(f"Rate limit exceeded: {error_msg}")
+        elif status == 400:
+            raise ValueError(f"Invalid request: {error_msg}")
+        elif status >= 500:
+            raise ConnectionError(f"Server error: {error_msg}")
+        else:
+            raise ValueError(f"API error ({error_type}): {error_msg}")
+    
     async def _make_api_call(self, prompt: str, **kwargs) -> AIResponse:
         """Make the actual API call to Anthropic"""
         url = f"{self.base_url}/v1/messages"
@@ -149,22 +168,7 @@ class AnthropicEngine(BaseAIEngine):
                     
                     # Handle API errors
                     if response.status != 200:
-                        error_msg = response_data.get("error", {}).get("message", "Unknown error")
-                        error_type = response_data.get("error", {}).get("type", "api_error")
-                        
-                        logger.error(f"Anthropic API error {response.status}: {error_msg}")
-                        
-                        # Handle specific error types
-                        if response.status == 401:
-                            raise ValueError(f"Authentication failed: {error_msg}")
-                        elif response.status == 429:
-                            raise ValueError(f"Rate limit exceeded: {error_msg}")
-                        elif response.status == 400:
-                            raise ValueError(f"Invalid request: {error_msg}")
-                        elif response.status >= 500:
-                            raise ConnectionError(f"Server error: {error_msg}")
-                        else:
-                            raise ValueError(f"API error ({error_type}): {error_msg}")
+                        self._raise_api_error(response.status, response_data)
                     
                     # Parse successful response
                     return self._parse_response(response_data, payload["model"])
@@ -182,26 +186,70 @@ class AnthropicEngine(BaseAIEngine):
             logger.error(f"Unexpected error in API call: {e}")
             raise
     
-    async def generate_streaming(self, prompt: str, callback=None, **kwargs):
-        """
-        Generate streaming response (for future implementation)
-        Note: This is a placeholder for streaming functionality
-        """
-        # For now, fall back to regular generation
-        # TODO: Implement actual streaming using Anthropic's streaming API
-        response = await self.generate(prompt, **kwargs)
-        
-        if callback:
-            # Simulate streaming by calling callback with chunks
-            words = response.content.split()
-            current_content = ""
-            
-            for word in words:
-                current_content += word + " "
-                await callback(current_content.strip())
-                await asyncio.sleep(0.05)  # Simulate streaming delay
+    async def _make_streaming_api_call(self, prompt: str, on_delta: Callable[[str], Any], **kwargs) -> AIResponse:
+        """Stream a Messages API response over server-sent events, passing text deltas to on_delta"""
+        url = f"{self.base_url}/v1/messages"
+        headers = self._prepare_headers()
+        headers["Accept"] = "text/event-stream"
+        payload = self._prepare_payload(prompt, **kwargs)
+        payload["stream"] = True
+        
+        logger.debug(f"Making streaming Anthropic API call to {url}")
+        
+        timeout = aiohttp.ClientTimeout(total=self.config.timeout_seconds)
+        
+        # Rebuilt from the event stream into the shape _parse_response expects
+        response_data: Dict[str, Any] = {"content": [], "usage": {}}
+        text_parts = []
+        
+        try:
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with session.post(url, headers=headers, json=payload) as response:
+                    if response.status != 200:
+                        self._raise_api_error(response.status, await response.json())
+                    
+                    # Only data lines matter: every event payload repeats its type
+                    async for raw_line in response.content:
+                        line = raw_line.decode("utf-8").strip()
+                        if not line.startswith("data:"):
+                            continue
+                        event = json.loads(line[5:].strip())
+                        event_type = event.get("type")
+                        
+                        if event_type == "content_block_delta":
+                            delta = event.get("delta", {})
+                            if delta.get("type") == "text_delta" and delta.get("text"):
+                                text_parts.append(delta["text"])
+                                await self._emit_delta(on_delta, delta["text"])
+                        elif event_type == "message_start":
+                            message = event.get("message", {})
+                            for key in ("id", "type", "role", "model"):
+                                response_data[key] = message.get(key)
+                            response_data["usage"].update(message.get("usage", {}))
+                        elif event_type == "message_delta":
+                            response_data["stop_reason"] = event.get("delta", {}).get("stop_reason")
+                            response_data["stop_sequence"] = event.get("delta", {}).get("stop_sequence")
+                            response_data["usage"].update(event.get("usage", {}))
+                        elif event_type == "error":
+                            error = event.get("error", {})
+                            if error.get("type") == "overloaded_error":
+                                raise ConnectionError(f"Server error: {error.get('message', 'Overloaded')}")
+                            raise ValueError(f"API error ({error.get('type', 'api_error')}): {error.get('message', 'Unknown error')}")
+                        elif event_type == "message_stop":
+                            break
+                    
+        except asyncio.TimeoutError:
+            logger.error(f"Streaming request timeout after {self.config.timeout_seconds}s")
+            raise ConnectionError("Request timeout")
+        except aiohttp.ClientError as e:
+            logger.error(f"HTTP client error: {e}")
+            raise ConnectionError(f"Network error: {e}")
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse streamed event: {e}")
+            raise ValueError("Invalid event in streaming response from API")
         
-        return response
+        response_data["content"] = [{"type": "text", "text": "".join(text_parts)}]
+        return self._parse_response(response_data, payload["model"])
     
     def estimate_tokens(self, text: str) -> int:
         """
@@ -6,11 +6,13 @@ import json
 import time
 from abc import ABC, abstractmethod
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Union
 from pydantic import BaseModel, Field
 import hashlib
 import logging
 
+from .deadline import DeadlineExceeded, deadline_misses, run_within_deadline, time_remaining
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -108,6 +110,25 @@ class BaseAIEngine(ABC):
         """Return the engine type identifier"""
         pass
     
+    async def _make_streaming_api_call(self, prompt: str, on_delta: Callable[[str], Any], **kwargs) -> AIResponse:
+        """
+        Make a streaming API call, passing text deltas to on_delta as they arrive.
+        Engines without a streaming API fall back to one delta with the full content.
+        """
+        response = await self._make_api_call(prompt, **kwargs)
+        if response.content:
+            await self._emit_delta(on_delta, response.content)
+        return response
+    
+    @staticmethod
+    async def _emit_delta(on_delta: Optional[Callable[[str], Any]], delta: str):
+        """Call a sync or async delta callback."""
+        if on_delta is None:
+            return
+        result = on_delta(delta)
+        if asyncio.iscoroutine(result) or isinstance(result, asyncio.Future):
+            await result
+    
     def _generate_cache_key(self, prompt: str, **kwargs) -> str:
         """Generate a cache key for the request"""
         # Create deterministic hash from prompt and parameters
@@ -195,9 +216,15 @@ class BaseAIEngine(ABC):
         return True
     
     async def _wait_for_rate_limit(self):
-        """Wait until rate limit window resets"""
+        """Wait until rate limit window resets, failing fast if that is past the request deadline"""
         now = datetime.now()
         seconds_until_reset = 60 - (now - self.rate_limit_info.window_start).total_seconds()
+        remaining = time_remaining()
+        if seconds_until_reset > 0 and remaining is not None and remaining < seconds_until_reset:
+            deadline_misses.record("engine_rate_limit")
+            raise DeadlineExceeded(
+                f"engine: rate limited for {seconds_until_reset:.1f}s, only {max(0.0, remaining):.2f}s left"
+            )
         if seconds_until_reset > 0:
             logger.info(f"Rate limited, waiting {seconds_until_reset:.1f}s")
             await asyncio.sleep(seconds_until_reset)
@@ -233,6 +260,33 @@ class BaseAIEngine(ABC):
         
         logger.debug(f"Budget updated: +${cost:.4f}, total: ${self.budget_info.total_spent_usd:.4f}")
     
+    # A retry is only worth starting with at least this long left for the call itself
+    MIN_RETRY_ATTEMPT_SECONDS = 1.0
+    
+    def _has_time_to_retry(self, backoff_delay: float) -> bool:
+        """Whether backoff plus a useful attempt still fits before the request deadline"""
+        remaining = time_remaining()
+        if remaining is None or remaining >= backoff_delay + self.MIN_RETRY_ATTEMPT_SECONDS:
+            return True
+        deadline_misses.record("engine_retry")
+        return False
+    
+    def _check_deadline(self):
+        """Fail fast when the request deadline has already passed"""
+        remaining = time_remaining()
+        if remaining is not None and remaining <= 0:
+            deadline_misses.record("engine")
+            raise DeadlineExceeded("engine: deadline passed before the request was sent")
+    
+    def _record_completed_call(self, response: AIResponse):
+        """Update rate limit and budget tracking after a successful call"""
+        self.rate_limit_info.requests_made += 1
+        self.rate_limit_info.last_request_time = datetime.now()
+        
+        input_tokens = response.usage.get('input_tokens', 0)
+        output_tokens = response.usage.get('output_tokens', 0)
+        self._update_budget(input_tokens, output_tokens)
+    
     async def _execute_with_retries(self, prompt: str, **kwargs) -> AIResponse:
         """Execute API call with retry logic"""
         last_exception = None
@@ -243,20 +297,14 @@ class BaseAIEngine(ABC):
                 if not await self._check_rate_limit():
                     await self._wait_for_rate_limit()
                 
-                # Make the API call
-                response = await self._make_api_call(prompt, **kwargs)
-                
-                # Update rate limit tracking
-                self.rate_limit_info.requests_made += 1
-                self.rate_limit_info.last_request_time = datetime.now()
-                
-                # Update budget tracking
-                input_tokens = response.usage.get('input_tokens', 0)
-                output_tokens = response.usage.get('output_tokens', 0)
-                self._update_budget(input_tokens, output_tokens)
+                # Make the API call, bounded by the request deadline if there is one
+                response = await run_within_deadline(self._make_api_call(prompt, **kwargs), "engine")
+                self._record_completed_call(response)
                 
                 return response
                 
+            except DeadlineExceeded:
+                raise
             except Exception as e:
                 last_exception = e
                 
@@ -266,6 +314,9 @@ class BaseAIEngine(ABC):
                         self.config.retry_delay_base * (2 ** attempt),
                         self.config.retry_delay_max
                     )
+                    if not self._has_time_to_retry(delay):
+                        logger.warning(f"Attempt {attempt + 1} failed: {e}, no time left before deadline to retry")
+                        break
                     logger.warning(f"Attempt {attempt + 1} failed: {e}, retrying in {delay}s")
                     await asyncio.sleep(delay)
                 else:
@@ -290,6 +341,8 @@ class BaseAIEngine(ABC):
         if cached_response:
             return cached_response
         
+        self._check_deadline()
+        
         # Estimate token usage for budget check
         estimated_input_tokens = len(prompt.split()) * 1.3  # Rough estimation
         estimated_output_tokens = kwargs.get('max_tokens', self.config.max_tokens)
@@ -306,6 +359,71 @@ class BaseAIEngine(ABC):
         
         return response
     
+    async def generate_streaming(self, prompt: str, callback: Optional[Callable[[str], Any]] = None, **kwargs) -> AIResponse:
+        """
+        Generate a response, passing each text delta to callback (sync or async)
+        as it arrives, and return the complete response.
+        
+        Shares caching, budget checks and rate limiting with generate(). A failed
+        attempt is only retried while nothing has been streamed yet, since
+        emitted deltas cannot be taken back.
+        """
+        cache_key = self._generate_cache_key(prompt, **kwargs)
+        
+        cached_response = await self._get_from_cache(cache_key)
+        if cached_response:
+            await self._emit_delta(callback, cached_response.content)
+            return cached_response
+        
+        self._check_deadline()
+        
+        estimated_input_tokens = len(prompt.split()) * 1.3  # Rough estimation
+        estimated_output_tokens = kwargs.get('max_tokens', self.config.max_tokens)
+        if not self._check_budget(estimated_input_tokens, estimated_output_tokens):
+            raise ValueError("Request would exceed budget limit")
+        
+        streamed_chars = 0
+        
+        async def on_delta(delta: str):
+            nonlocal streamed_chars
+            streamed_chars += len(delta)
+            await self._emit_delta(callback, delta)
+        
+        last_exception = None
+        for attempt in range(self.config.max_retries + 1):
+            try:
+                if not await self._check_rate_limit():
+                    await self._wait_for_rate_limit()
+                
+                response = await run_within_deadline(
+                    self._make_streaming_api_call(prompt, on_delta, **kwargs), "engine"
+                )
+                self._record_completed_call(response)
+                await self._save_to_cache(cache_key, response)
+                return response
+                
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                last_exception = e
+                if streamed_chars:
+                    logger.error(f"Streaming failed after {streamed_chars} characters, not retrying: {e}")
+                    break
+                if attempt < self.config.max_retries:
+                    delay = min(
+                        self.config.retry_delay_base * (2 ** attempt),
+                        self.config.retry_delay_max
+                    )
+                    if not self._has_time_to_retry(delay):
+                        logger.warning(f"Streaming attempt {attempt + 1} failed: {e}, no time left before deadline to retry")
+                        break
+                    logger.warning(f"Streaming attempt {attempt + 1} failed: {e}, retrying in {delay}s")
+                    await asyncio.sleep(delay)
+                else:
+                    logger.error(f"All {self.config.max_retries + 1} streaming attempts failed")
+        
+        raise last_exception
+    
     def get_budget_info(self) -> BudgetInfo:
         """Get current budget information"""
         return self.budget_info.copy()
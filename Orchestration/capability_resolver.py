@@ -0,0 +1,355 @@
+"""
+Capability Resolver - Map free-form capability strings from the AI to canonical capabilities
+
+The AI is asked for exact capability values but returns variations such as
+"lead-gen", "Lead Generation " or "logos". The resolver is compiled once from
+the canonical capability values, an extensible alias table and registry skills,
+and resolves through increasingly fuzzy layers:
+1. Exact match on the normalized alias (trie lookup)
+2. Unique prefix completion in the trie ("lead gen" -> "lead generation")
+3. Bounded edit distance for typos ("lead_generaton"), never for very short keys
+4. Token-set overlap for reordered or extra words ("generation of leads"),
+   only when the query's most specific word is part of the match
+
+Results are memoized, so repeated strings cost one dict lookup.
+"""
+
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# alias -> canonical capability value. Extend with register_capability_alias().
+CAPABILITY_ALIASES: Dict[str, str] = {
+    'branding': 'brand_creation',
+    'brand': 'brand_creation',
+    'brand identity': 'brand_creation',
+    'brand strategy': 'brand_creation',
+    'logo': 'logo_generation',
+    'logos': 'logo_generation',
+    'logo design': 'logo_generation',
+    'market': 'market_analysis',
+    'research': 'market_analysis',
+    'market research': 'market_analysis',
+    'competitor analysis': 'market_analysis',
+    'website': 'website_building',
+    'web': 'website_building',
+    'web design': 'website_building',
+    'landing page': 'website_building',
+    'website generation': 'website_building',
+    'sales': 'sales_outreach',
+    'outreach': 'sales_outreach',
+    'content': 'content_creation',
+    'writing': 'content_creation',
+    'copywriting': 'content_creation',
+    'design': 'design_services',
+    'visual': 'design_services',
+    'leads': 'lead_generation',
+    'prospects': 'lead_generation',
+    'prospecting': 'lead_generation',
+    'lead generation': 'lead_generation',
+    'lead gen': 'lead_generation',
+    'leadgen': 'lead_generation',
+    'lead mining': 'lead_generation',
+    'find leads': 'lead_generation',
+    'data': 'data_analysis',
+    'analysis': 'data_analysis',
+    'analytics': 'data_analysis',
+    # Marketing-specific mappings
+    'marketing': 'content_marketing',
+    'marketing campaign': 'content_marketing',
+    'marketing campaigns': 'content_marketing',
+    'content marketing': 'content_marketing',
+    'content strategy': 'content_marketing',
+    'content calendar': 'content_marketing',
+    'marketing strategy': 'content_marketing',
+    'marketing automation': 'content_marketing',
+    'seo': 'content_marketing',
+    'seo optimization': 'content_marketing',
+    'content distribution': 'content_marketing',
+    'marketing materials': 'content_marketing',
+    'social': 'social_monitoring',
+    'monitoring': 'social_monitoring',
+    'mentions': 'social_monitoring',
+    'brand monitoring': 'social_monitoring',
+    'social listening': 'social_monitoring',
+    'competitor tracking': 'social_monitoring',
+    'linkedin': 'linkedin_automation',
+    'linkedin scraping': 'linkedin_automation',
+    'viral posts': 'linkedin_automation',
+    'linkedin trends': 'linkedin_automation',
+    'linkedin content': 'linkedin_automation',
+    'email': 'email_orchestration',
+    'email campaigns': 'email_orchestration',
+    'email sequences': 'email_orchestration',
+    'crm': 'crm_operations',
+    'hubspot': 'crm_operations',
+    'salesforce': 'crm_operations',
+    'icp': 'icp_generation',
+    'ideal customer profile': 'icp_generation',
+    'customer profile': 'icp_generation',
+    'slack monitoring': 'communication_monitoring',
+}
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_capability(text: str) -> str:
+    """Lowercase, turn separators into single spaces and strip ("Lead-Gen " -> "lead gen")."""
+    return _NON_ALNUM.sub(' ', text.lower()).strip()
+
+
+def _stem(token: str) -> str:
+    """Crude plural folding so "leads" and "lead" compare equal."""
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def _bounded_edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, or limit + 1 as soon as it must exceed limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j, char_b in enumerate(b, start=1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            )
+            row_min = min(row_min, current[j])
+        if row_min > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class _TrieNode:
+    __slots__ = ("children", "capability", "reachable")
+    
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.capability: Optional[str] = None  # set when an alias ends here
+        self.reachable: Set[str] = set()  # capabilities of every alias below this node
+
+
+class CapabilityAliasResolver:
+    """
+    Compiled capability resolver. Build once, resolve many times.
+
+    Keys are compacted (normalized, spaces removed) so "lead gen", "lead-gen"
+    and "leadgen" share one trie path.
+    """
+    
+    MIN_PREFIX_LENGTH = 4
+    MIN_EDIT_DISTANCE_LENGTH = 4  # shorter keys ("ic") are too close to too many aliases
+    MAX_ONE_EDIT_LENGTH = 8  # up to this length one typo is allowed, beyond it two
+    TOKEN_SET_THRESHOLD = 0.5  # overlap must exceed this
+    CACHE_SIZE = 4096
+    
+    def __init__(self, canonical_capabilities: Iterable[str], aliases: Optional[Dict[str, str]] = None,
+                 skills: Optional[Dict[str, Iterable[str]]] = None):
+        """
+        Args:
+            canonical_capabilities: Canonical capability values (e.g. "lead_generation")
+            aliases: alias -> capability value, highest precedence
+            skills: capability value -> registry skill names, lowest precedence;
+                skills claimed by several capabilities are ignored as ambiguous
+        """
+        self.canonical = set(canonical_capabilities)
+        self._alias_map: Dict[str, str] = {}  # compact key -> capability
+        self._normalized_aliases: Dict[str, str] = {}  # normalized alias -> capability, for token matching
+        
+        skill_owners: Dict[str, Set[str]] = defaultdict(set)
+        for capability, capability_skills in (skills or {}).items():
+            for skill in capability_skills:
+                skill_owners[normalize_capability(skill)].add(capability)
+        for skill, owners in skill_owners.items():
+            if len(owners) == 1:
+                self._add(skill, next(iter(owners)))
+        
+        for capability in self.canonical:
+            self._add(capability, capability)
+        for alias, capability in (aliases if aliases is not None else CAPABILITY_ALIASES).items():
+            self._add(alias, capability)
+        
+        self._compile()
+        # Raw text -> capability; cleared when full, which is rare for LLM output
+        self._cache: Dict[str, Optional[str]] = {}
+        self.stats = defaultdict(int)
+    
+    def _add(self, alias: str, capability: str):
+        if capability not in self.canonical:
+            logger.debug(f"Ignoring alias '{alias}' for unknown capability '{capability}'")
+            return
+        normalized = normalize_capability(alias)
+        if normalized:
+            # Later sources (canonical values, then aliases) override earlier ones (skills)
+            self._alias_map[normalized.replace(' ', '')] = capability
+            self._normalized_aliases[normalized] = capability
+    
+    def _compile(self):
+        """Build the trie, length buckets and token index from the alias map."""
+        self._root = _TrieNode()
+        self._keys_by_length: Dict[int, List[str]] = defaultdict(list)
+        for key, capability in self._alias_map.items():
+            node = self._root
+            node.reachable.add(capability)
+            for char in key:
+                node = node.children.setdefault(char, _TrieNode())
+                node.reachable.add(capability)
+            node.capability = capability
+            self._keys_by_length[len(key)].append(key)
+        
+        self._alias_token_sets: List[Tuple[frozenset, str]] = []
+        self._aliases_by_token: Dict[str, List[int]] = defaultdict(list)
+        for normalized, capability in self._normalized_aliases.items():
+            tokens = frozenset(_stem(token) for token in normalized.split())
+            index = len(self._alias_token_sets)
+            self._alias_token_sets.append((tokens, capability))
+            for token in tokens:
+                self._aliases_by_token[token].append(index)
+    
+    def add_alias(self, alias: str, capability: str):
+        """Add an alias at runtime; recompiles and clears the memo."""
+        self._add(alias, capability)
+        self._compile()
+        self._cache = {}
+    
+    def _lookup_trie(self, key: str) -> Tuple[Optional[str], Optional[str]]:
+        """Return (exact match, unique prefix completion) for a compact key."""
+        node = self._root
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return None, None
+        if node.capability is not None:
+            return node.capability, None
+        if len(key) >= self.MIN_PREFIX_LENGTH and len(node.reachable) == 1:
+            return None, next(iter(node.reachable))
+        return None, None
+    
+    def _match_edit_distance(self, key: str) -> Optional[str]:
+        if len(key) < self.MIN_EDIT_DISTANCE_LENGTH:
+            return None
+        limit = 1 if len(key) <= self.MAX_ONE_EDIT_LENGTH else 2
+        best_distance = limit + 1
+        best: Set[str] = set()
+        for length in range(len(key) - limit, len(key) + limit + 1):
+            for candidate in self._keys_by_length.get(length, ()):
+                distance = _bounded_edit_distance(key, candidate, min(limit, best_distance))
+                if distance < best_distance:
+                    best_distance, best = distance, {self._alias_map[candidate]}
+                elif distance == best_distance and distance <= limit:
+                    best.add(self._alias_map[candidate])
+        return next(iter(best)) if len(best) == 1 else None
+    
+    def _match_token_set(self, normalized: str) -> Optional[str]:
+        tokens = frozenset(_stem(token) for token in normalized.split())
+        if not tokens:
+            return None
+        # Only aliases sharing one of the longest query words, so "web scraping" does not resolve through "web"
+        longest = max(len(token) for token in tokens)
+        candidates = {
+            index for token in tokens if len(token) == longest
+            for index in self._aliases_by_token.get(token, ())
+        }
+        best_score = 0.0
+        best: Set[str] = set()
+        for index in candidates:
+            alias_tokens, capability = self._alias_token_sets[index]
+            score = len(tokens & alias_tokens) / len(tokens | alias_tokens)
+            if score > best_score:
+                best_score, best = score, {capability}
+            elif score == best_score:
+                best.add(capability)
+        if best_score > self.TOKEN_SET_THRESHOLD and len(best) == 1:
+            return next(iter(best))
+        return None
+    
+    def _resolve_uncached(self, normalized: str) -> Tuple[Optional[str], str]:
+        key = normalized.replace(' ', '')
+        exact, prefix = self._lookup_trie(key)
+        if exact:
+            return exact, "exact"
+        if prefix:
+            return prefix, "prefix"
+        fuzzy = self._match_edit_distance(key)
+        if fuzzy:
+            return fuzzy, "edit_distance"
+        token_match = self._match_token_set(normalized)
+        if token_match:
+            return token_match, "token_set"
+        return None, "unresolved"
+    
+    def resolve(self, text: str) -> Optional[str]:
+        """Resolve free text to a canonical capability value, or None."""
+        if not text:
+            return None
+        try:
+            return self._cache[text]
+        except KeyError:
+            pass
+        
+        normalized = normalize_capability(text)
+        capability, layer = self._resolve_uncached(normalized) if normalized else (None, "unresolved")
+        self.stats[layer] += 1
+        if len(self._cache) >= self.CACHE_SIZE:
+            self._cache = {}
+        self._cache[text] = capability
+        return capability
+    
+    def get_stats(self) -> Dict[str, int]:
+        return {"aliases": len(self._alias_map), "cached": len(self._cache), **self.stats}
+
+
+_alias_revision = 0
+
+
+def register_capability_alias(alias: str, capability: str):
+    """Add an alias to the shared table; bumps the revision so cached resolvers are recompiled."""
+    global _alias_revision
+    CAPABILITY_ALIASES[alias] = capability
+    _alias_revision += 1
+
+
+def get_alias_revision() -> int:
+    """Revision of the shared alias table, for keying compiled resolvers."""
+    return _alias_revision
+
+
+if __name__ == "__main__":
+    def benchmark_capability_resolution(iterations: int = 20000):
+        """Microbenchmark compile time, cold and memoized resolution, and the old per-miss dict rebuild."""
+        import timeit
+        
+        canonical = sorted(set(CAPABILITY_ALIASES.values()) | {"content_creation", "technical_implementation"})
+        samples = ["lead_generation", "Lead Generation ", "lead-gen", "leadgen", "logos", "lead_generaton",
+                   "generation of leads", "Content Marketing", "brand-identity", "quantum teleportation"]
+        
+        compile_time = timeit.timeit(lambda: CapabilityAliasResolver(canonical), number=50) / 50
+        resolver = CapabilityAliasResolver(canonical)
+        cold = timeit.timeit(
+            lambda: [resolver._resolve_uncached(normalize_capability(sample)) for sample in samples], number=200
+        ) / (200 * len(samples))
+        warm = timeit.timeit(lambda: [resolver.resolve(sample) for sample in samples], number=iterations // len(samples)) / iterations
+        
+        def legacy(sample: str):
+            # What _parse_capabilities used to do for every unrecognized string
+            mapping = dict(CAPABILITY_ALIASES)
+            return mapping.get(sample.lower().strip())
+        legacy_time = timeit.timeit(lambda: [legacy(sample) for sample in samples], number=iterations // len(samples)) / iterations
+        
+        print(f"Compile (once per registry version): {compile_time * 1e6:9.1f} us")
+        print(f"Resolve, uncached:                   {cold * 1e6:9.2f} us")
+        print(f"Resolve, memoized:                   {warm * 1e6:9.2f} us")
+        print(f"Legacy dict rebuild per miss:        {legacy_time * 1e6:9.2f} us")
+        for sample in samples:
+            print(f"  {sample!r:28} -> {resolver.resolve(sample)}")
+    
+    benchmark_capability_resolution()
@@ -0,0 +1,1046 @@
+"""
+Context Storage Backends - Where UniversalContextStore keeps its data
+
+The context store only needs a handful of storage operations, so it talks to
+a ContextStorageBackend instead of redis.asyncio directly:
+1. RedisContextBackend - the production layout (keys, list/time indexes, snapshot hash)
+2. InMemoryContextBackend - dicts with TTL semantics, for tests and single-process use
+3. SQLiteContextBackend - one WAL-mode file indexed on (session, type, ts), for
+   the desktop app and single-node installs without a Redis server
+
+Running this module checks the backend contract against all three and
+compares their throughput.
+"""
+
+import asyncio
+import bisect
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+Value = Union[bytes, str]
+# (entry id "<ms>-<seq>", fields) of an append-only stream
+StreamEntry = Tuple[str, Dict[str, str]]
+
+
+def parse_stream_id(entry_id: str) -> Tuple[int, int]:
+    milliseconds, _, sequence = str(entry_id).partition("-")
+    return int(milliseconds), int(sequence or 0)
+
+
+def next_stream_id(last: Tuple[int, int], now_ms: int) -> Tuple[int, int]:
+    """Redis-style monotonic id: the clock in ms, with a sequence for entries in the same ms (or after a clock step back)."""
+    return (now_ms, 0) if now_ms > last[0] else (last[0], last[1] + 1)
+
+
+def _text(value: Value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+@dataclass
+class ContextRecord:
+    """One stored context item, indexed by session, type and time."""
+    key: str
+    session_id: str
+    context_type: str
+    score: float  # item timestamp (seconds), newest = highest
+    value: Value
+    ttl_seconds: int
+
+
+@dataclass
+class ContextWriteBatch:
+    """Writes a backend applies atomically: records, plain blobs, stream entries and change events."""
+    records: List[ContextRecord] = field(default_factory=list)
+    blobs: List[Tuple[str, Value, int]] = field(default_factory=list)
+    stream_entries: List[Tuple[str, Dict[str, str], int, int]] = field(default_factory=list)
+    events: List[Tuple[str, str]] = field(default_factory=list)
+    
+    def put_record(self, record: ContextRecord):
+        self.records.append(record)
+    
+    def put_blob(self, key: str, value: Value, ttl_seconds: int):
+        self.blobs.append((key, value, ttl_seconds))
+    
+    def append_to_stream(self, stream: str, fields: Dict[str, str], max_length: int, ttl_seconds: int):
+        """Append an entry with a backend-assigned monotonic id, keeping about max_length entries."""
+        self.stream_entries.append((stream, fields, max_length, ttl_seconds))
+    
+    def publish(self, channel: str, message: str):
+        self.events.append((channel, message))
+
+
+class ContextStorageBackend(ABC):
+    """Storage operations UniversalContextStore relies on."""
+    
+    # True when values read back are str (e.g. Redis clients with decode_responses=True)
+    text_values = False
+    # True when publish/subscribe reaches other workers
+    supports_pubsub = False
+    
+    @abstractmethod
+    async def write(self, batch: ContextWriteBatch):
+        """Apply every write in the batch atomically."""
+    
+    @abstractmethod
+    async def latest(self, session_id: str, context_type: str, min_score: float, limit: int) -> List[Optional[Value]]:
+        """Values of a (session, type) scored at or above min_score, newest first; expired ones may be None."""
+    
+    @abstractmethod
+    async def latest_per_type(self, session_id: str, context_types: List[str]) -> Dict[str, Value]:
+        """Newest live value of each of the given context types stored for a session."""
+    
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Value]:
+        """A blob or record value by key, or None if missing or expired."""
+    
+    @abstractmethod
+    async def mget(self, keys: List[str]) -> List[Optional[Value]]:
+        """Blob or record values by key, None for missing or expired ones."""
+    
+    @abstractmethod
+    async def compact(self, batch_size: int = 500, dry_run: bool = False) -> Dict[str, int]:
+        """Drop index entries for expired records; returns indexes, entries and dangling_entries."""
+    
+    async def subscribe(self, channel: str) -> AsyncIterator[str]:
+        """Messages published on a channel (only when supports_pubsub)."""
+        raise NotImplementedError(f"{type(self).__name__} does not support pub/sub")
+        yield  # pragma: no cover - makes this an async generator
+    
+    async def migrate(self, batch_size: int = 1000) -> int:
+        """Backfill indexes for data written by older versions; returns records indexed."""
+        return 0
+    
+    # Streams: append-only logs read in id order, directly or through consumer groups.
+    # Each group delivers an entry to one consumer, which keeps it pending until acked.
+    
+    @abstractmethod
+    async def stream_range(self, stream: str, after_id: str = "0", count: int = 100) -> List[StreamEntry]:
+        """Entries with ids after after_id, oldest first."""
+    
+    @abstractmethod
+    async def create_stream_group(self, stream: str, group: str, start_id: str = "0") -> bool:
+        """Create a consumer group delivering entries after start_id ("$" = only new ones); False if it exists."""
+    
+    @abstractmethod
+    async def read_stream_group(
+        self,
+        stream: str,
+        group: str,
+        consumer: str,
+        count: int = 10,
+        block_ms: Optional[int] = None,
+        pending: bool = False
+    ) -> List[StreamEntry]:
+        """
+        Entries never delivered to the group, now pending for this consumer.
+
+        With block_ms, waits up to that long for new entries. With pending=True,
+        re-reads this consumer's delivered but unacknowledged entries instead
+        (recovery after a crash).
+        """
+    
+    @abstractmethod
+    async def ack_stream(self, stream: str, group: str, entry_ids: List[str]) -> int:
+        """Acknowledge entries for a group; returns how many were pending."""
+    
+    async def close(self):
+        pass
+
+
+class RedisContextBackend(ContextStorageBackend):
+    """
+    Production Redis layout.
+
+    Each record is a primary key (SETEX) plus a session list index, a type list
+    index, session and (session, type) time-index sorted sets, and a per-session
+    snapshot hash of the newest value per type. A batch is one MULTI/EXEC.
+    """
+    
+    supports_pubsub = True
+    
+    # Index caps; older entries are trimmed on write and dangling ones by compact()
+    MAX_SESSION_INDEX_ENTRIES = 500
+    MAX_TYPE_INDEX_ENTRIES = 10000
+    TYPE_INDEX_TTL_SECONDS = 30 * 24 * 60 * 60
+    SNAPSHOT_REBUILD_CANDIDATES = 8
+    # Every write refreshes the snapshot hash's TTL, so each type also keeps its own expiry
+    # (unix seconds) in a "<type>@expires" field and is dropped once that passes
+    SNAPSHOT_EXPIRY_SUFFIX = "@expires"
+    LIST_INDEX_PATTERNS = ("session_context_index:*", "context_type_index:*")
+    TIME_INDEX_PATTERNS = ("session_context_time_index:*", "context_time_index:*")
+    
+    def __init__(self, redis_client, index_ttl_seconds: int = 7 * 24 * 60 * 60):
+        self.redis_client = redis_client
+        # TTL for indexes built outside a write (snapshot rebuilds, migration)
+        self.index_ttl_seconds = index_ttl_seconds
+        connection_pool = getattr(redis_client, "connection_pool", None)
+        self.text_values = bool(getattr(connection_pool, "connection_kwargs", {}).get("decode_responses"))
+    
+    @staticmethod
+    def _session_time_index_key(session_id: str) -> str:
+        return f"session_context_time_index:{session_id}"
+    
+    @staticmethod
+    def _type_time_index_key(session_id: str, context_type: str) -> str:
+        return f"context_time_index:{session_id}:{context_type}"
+    
+    @staticmethod
+    def _snapshot_key(session_id: str) -> str:
+        return f"session_context_snapshot:{session_id}"
+    
+    def _queue_record(self, pipe, record: ContextRecord):
+        pipe.setex(record.key, record.ttl_seconds, record.value)
+        
+        # Derived snapshot (newest item per type, for latest_per_type in one read)
+        snapshot_key = self._snapshot_key(record.session_id)
+        pipe.hset(snapshot_key, mapping={
+            record.context_type: record.value,
+            record.context_type + self.SNAPSHOT_EXPIRY_SUFFIX: time.time() + record.ttl_seconds
+        })
+        pipe.expire(snapshot_key, record.ttl_seconds)
+        
+        # Session index (for "show me everything from this session")
+        session_index_key = f"session_context_index:{record.session_id}"
+        pipe.lpush(session_index_key, record.key)
+        pipe.ltrim(session_index_key, 0, self.MAX_SESSION_INDEX_ENTRIES - 1)
+        pipe.expire(session_index_key, record.ttl_seconds)
+        
+        # Type index (for "show me all my lead generation work")
+        type_index_key = f"context_type_index:{record.context_type}"
+        pipe.lpush(type_index_key, record.key)
+        pipe.ltrim(type_index_key, 0, self.MAX_TYPE_INDEX_ENTRIES - 1)
+        pipe.expire(type_index_key, self.TYPE_INDEX_TTL_SECONDS)
+        
+        # Time indexes (for "latest within N hours" without scanning the keyspace)
+        for time_index_key in (
+            self._session_time_index_key(record.session_id),
+            self._type_time_index_key(record.session_id, record.context_type)
+        ):
+            pipe.zadd(time_index_key, {record.key: record.score})
+            # Members older than the primary key TTL can only point at expired keys
+            pipe.zremrangebyscore(time_index_key, "-inf", f"({record.score - record.ttl_seconds}")
+            pipe.zremrangebyrank(time_index_key, 0, -(self.MAX_SESSION_INDEX_ENTRIES + 1))
+            pipe.expire(time_index_key, record.ttl_seconds)
+    
+    def _queue_batch(self, pipe, batch: ContextWriteBatch):
+        """Queue a batch on a pipeline (or anything with the same command methods)."""
+        for record in batch.records:
+            self._queue_record(pipe, record)
+        for key, value, ttl_seconds in batch.blobs:
+            pipe.setex(key, ttl_seconds, value)
+        for stream, fields, max_length, ttl_seconds in batch.stream_entries:
+            pipe.xadd(stream, fields, maxlen=max_length, approximate=True)
+            pipe.expire(stream, ttl_seconds)
+        for channel, message in batch.events:
+            pipe.publish(channel, message)
+    
+    async def write(self, batch: ContextWriteBatch):
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            self._queue_batch(pipe, batch)
+            await pipe.execute()
+    
+    async def latest(self, session_id: str, context_type: str, min_score: float, limit: int) -> List[Optional[Value]]:
+        keys = await self.redis_client.zrevrangebyscore(
+            self._type_time_index_key(session_id, context_type), "+inf", min_score, start=0, num=limit
+        )
+        # Members whose primary key already expired come back as None
+        return await self.redis_client.mget(keys) if keys else []
+    
+    async def latest_per_type(self, session_id: str, context_types: List[str]) -> Dict[str, Value]:
+        fields = await self.redis_client.hgetall(self._snapshot_key(session_id))
+        if not fields:
+            return await self._rebuild_snapshot(session_id, context_types)
+        
+        fields = {_text(key): value for key, value in fields.items()}
+        now = time.time()
+        snapshot = {}
+        for context_type in context_types:
+            if context_type not in fields:
+                continue
+            expires_at = fields.get(context_type + self.SNAPSHOT_EXPIRY_SUFFIX)
+            if expires_at is None or float(_text(expires_at)) <= now:
+                # The newest item expired (or predates per-type expiries); an older one may still be live
+                return await self._rebuild_snapshot(session_id, context_types)
+            snapshot[context_type] = fields[context_type]
+        return snapshot
+    
+    async def _rebuild_snapshot(self, session_id: str, context_types: List[str]) -> Dict[str, Value]:
+        """Newest live value per type from the time indexes (pipelined), written back to the snapshot hash."""
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for context_type in context_types:
+                pipe.zrevrange(self._type_time_index_key(session_id, context_type), 0, self.SNAPSHOT_REBUILD_CANDIDATES - 1)
+            candidates = await pipe.execute()
+        
+        keys = [key for type_keys in candidates for key in type_keys]
+        values = dict(zip(keys, await self.redis_client.mget(keys))) if keys else {}
+        
+        newest_keys = {}
+        for context_type, type_keys in zip(context_types, candidates):
+            newest_key = next((key for key in type_keys if values.get(key)), None)
+            if newest_key:
+                newest_keys[context_type] = newest_key
+        
+        # Remaining lifetime of each chosen item, for its expiry field
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for key in newest_keys.values():
+                pipe.pttl(key)
+            ttls = await pipe.execute() if newest_keys else []
+        
+        now = time.time()
+        snapshot = {}
+        fields = {}
+        for (context_type, key), ttl_ms in zip(newest_keys.items(), ttls):
+            if ttl_ms == -2:
+                continue  # expired since the MGET
+            snapshot[context_type] = values[key]
+            fields[context_type] = values[key]
+            fields[context_type + self.SNAPSHOT_EXPIRY_SUFFIX] = now + (ttl_ms / 1000 if ttl_ms > 0 else self.index_ttl_seconds)
+        
+        stale = [context_type for context_type in context_types if context_type not in snapshot]
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            if stale:
+                pipe.hdel(self._snapshot_key(session_id), *stale, *[t + self.SNAPSHOT_EXPIRY_SUFFIX for t in stale])
+            if fields:
+                pipe.hset(self._snapshot_key(session_id), mapping=fields)
+                pipe.expire(self._snapshot_key(session_id), self.index_ttl_seconds)
+            await pipe.execute()
+        return snapshot
+    
+    async def get(self, key: str) -> Optional[Value]:
+        return await self.redis_client.get(key)
+    
+    async def mget(self, keys: List[str]) -> List[Optional[Value]]:
+        return await self.redis_client.mget(keys) if keys else []
+    
+    async def compact(self, batch_size: int = 500, dry_run: bool = False) -> Dict[str, int]:
+        """Walk every index with SCAN and drop members whose primary key no longer exists."""
+        indexes = entries = dangling = 0
+        for pattern in self.LIST_INDEX_PATTERNS + self.TIME_INDEX_PATTERNS:
+            is_list = pattern in self.LIST_INDEX_PATTERNS
+            async for index_key in self.redis_client.scan_iter(match=pattern, count=batch_size):
+                indexes += 1
+                members = (
+                    await self.redis_client.lrange(index_key, 0, -1) if is_list
+                    else await self.redis_client.zrange(index_key, 0, -1)
+                )
+                entries += len(members)
+                for start in range(0, len(members), batch_size):
+                    chunk = members[start:start + batch_size]
+                    async with self.redis_client.pipeline(transaction=False) as pipe:
+                        for member in chunk:
+                            pipe.exists(member)
+                        exists = await pipe.execute()
+                    missing = [member for member, found in zip(chunk, exists) if not found]
+                    dangling += len(missing)
+                    if missing and not dry_run:
+                        async with self.redis_client.pipeline(transaction=False) as pipe:
+                            for member in missing:
+                                if is_list:
+                                    pipe.lrem(index_key, 0, member)
+                                else:
+                                    pipe.zrem(index_key, member)
+                            await pipe.execute()
+        return {"indexes": indexes, "entries": entries, "dangling_entries": dangling}
+    
+    async def subscribe(self, channel: str) -> AsyncIterator[str]:
+        pubsub = self.redis_client.pubsub()
+        try:
+            await pubsub.subscribe(channel)
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    data = message["data"]
+                    yield data.decode() if isinstance(data, bytes) else data
+        finally:
+            await pubsub.aclose()
+    
+    async def migrate(self, batch_size: int = 1000) -> int:
+        """
+        Backfill the time indexes for context keys stored before they existed.
+
+        Walks the keyspace with SCAN (non-blocking, unlike KEYS) and scores each
+        key by its timestamp suffix. Safe to re-run.
+        """
+        indexed = 0
+        async for key in self.redis_client.scan_iter(match="agent_context:*", count=batch_size):
+            if isinstance(key, bytes):
+                key = key.decode()
+            try:
+                session_id, context_type, timestamp_key = key[len("agent_context:"):].rsplit(":", 2)
+                # "<seconds>" (older keys) or "<seconds.micros>-<suffix>"
+                score = float(timestamp_key.split("-")[0])
+            except ValueError:
+                logger.debug(f"Skipping unrecognised context key {key}")
+                continue
+            
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for time_index_key in (
+                    self._session_time_index_key(session_id),
+                    self._type_time_index_key(session_id, context_type)
+                ):
+                    pipe.zadd(time_index_key, {key: score})
+                    pipe.expire(time_index_key, self.index_ttl_seconds)
+                await pipe.execute()
+            indexed += 1
+        return indexed
+    
+    @staticmethod
+    def _stream_entries(entries) -> List[StreamEntry]:
+        # Entries trimmed away while pending come back without fields
+        return [
+            (_text(entry_id), {_text(k): _text(v) for k, v in fields.items()})
+            for entry_id, fields in entries or [] if fields
+        ]
+    
+    async def stream_range(self, stream: str, after_id: str = "0", count: int = 100) -> List[StreamEntry]:
+        minimum = "-" if after_id in ("0", "0-0") else f"({after_id}"
+        return self._stream_entries(await self.redis_client.xrange(stream, min=minimum, count=count))
+    
+    async def create_stream_group(self, stream: str, group: str, start_id: str = "0") -> bool:
+        try:
+            await self.redis_client.xgroup_create(stream, group, id=start_id, mkstream=True)
+            return True
+        except Exception as e:
+            if "BUSYGROUP" in str(e):
+                return False
+            raise
+    
+    async def read_stream_group(
+        self,
+        stream: str,
+        group: str,
+        consumer: str,
+        count: int = 10,
+        block_ms: Optional[int] = None,
+        pending: bool = False
+    ) -> List[StreamEntry]:
+        response = await self.redis_client.xreadgroup(
+            group, consumer, {stream: "0" if pending else ">"}, count=count, block=None if pending else block_ms
+        )
+        return self._stream_entries(response[0][1]) if response else []
+    
+    async def ack_stream(self, stream: str, group: str, entry_ids: List[str]) -> int:
+        return await self.redis_client.xack(stream, group, *entry_ids) if entry_ids else 0
+    
+    async def close(self):
+        await self.redis_client.aclose()
+
+
+class _LocalPubSub:
+    """In-process publish/subscribe and stream wake-ups, reaching stores that share one backend instance."""
+    
+    supports_pubsub = True
+    # Blocking stream reads also re-check this often, for writers in other processes
+    STREAM_POLL_SECONDS = 0.1
+    
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._stream_signals: Dict[str, asyncio.Event] = {}
+    
+    def _notify_streams(self, streams: List[str]):
+        for stream in streams:
+            signal = self._stream_signals.pop(stream, None)
+            if signal:
+                signal.set()
+    
+    async def _read_blocking(self, stream: str, block_ms: Optional[int], read) -> List[StreamEntry]:
+        """Call read() until it returns entries or block_ms passes (0 = wait forever, like Redis)."""
+        deadline = float("inf") if block_ms == 0 else time.monotonic() + (block_ms or 0) / 1000
+        while True:
+            signal = self._stream_signals.setdefault(stream, asyncio.Event())
+            entries = await read()
+            remaining = deadline - time.monotonic()
+            if entries or remaining <= 0:
+                return entries
+            try:
+                await asyncio.wait_for(signal.wait(), min(remaining, self.STREAM_POLL_SECONDS))
+            except asyncio.TimeoutError:
+                pass
+    
+    def _publish_events(self, events: List[Tuple[str, str]]):
+        for channel, message in events:
+            for queue in self._subscribers.get(channel, ()):
+                queue.put_nowait(message)
+    
+    async def subscribe(self, channel: str) -> AsyncIterator[str]:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(channel, set()).add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers[channel].discard(queue)
+
+
+class InMemoryContextBackend(_LocalPubSub, ContextStorageBackend):
+    """
+    Process-local backend with Redis-like TTL semantics.
+
+    Stores sharing one instance see each other's writes and pub/sub events,
+    which makes it a stand-in for several workers in tests.
+    """
+    
+    def __init__(self, clock=time.time):
+        super().__init__()
+        self._clock = clock
+        self._values: Dict[str, Tuple[Value, float]] = {}  # key -> (value, expires_at)
+        # session -> type -> [(score, key)] kept sorted by score
+        self._index: Dict[str, Dict[str, List[Tuple[float, str]]]] = {}
+        # stream -> [(id, fields)] in id order, with its expiry and consumer groups
+        self._streams: Dict[str, List[Tuple[Tuple[int, int], Dict[str, str]]]] = {}
+        self._stream_expiry: Dict[str, float] = {}
+        self._stream_groups: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    
+    def _live(self, key: str) -> Optional[Value]:
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= self._clock():
+            del self._values[key]
+            return None
+        return entry[0]
+    
+    async def write(self, batch: ContextWriteBatch):
+        # No await between writes, so the batch is atomic for every other coroutine
+        now = self._clock()
+        for record in batch.records:
+            self._values[record.key] = (record.value, now + record.ttl_seconds)
+            entries = self._index.setdefault(record.session_id, {}).setdefault(record.context_type, [])
+            if (record.score, record.key) not in entries:
+                bisect.insort(entries, (record.score, record.key))
+        for key, value, ttl_seconds in batch.blobs:
+            self._values[key] = (value, now + ttl_seconds)
+        for stream, fields, max_length, ttl_seconds in batch.stream_entries:
+            entries = self._live_stream(stream)
+            last_id = entries[-1][0] if entries else (0, 0)
+            entries.append((next_stream_id(last_id, int(now * 1000)), dict(fields)))
+            del entries[:-max_length]
+            self._stream_expiry[stream] = now + ttl_seconds
+        self._notify_streams([stream for stream, *_ in batch.stream_entries])
+        self._publish_events(batch.events)
+    
+    async def latest(self, session_id: str, context_type: str, min_score: float, limit: int) -> List[Optional[Value]]:
+        entries = self._index.get(session_id, {}).get(context_type, [])
+        values = []
+        for score, key in reversed(entries):
+            if score < min_score or len(values) >= limit:
+                break
+            values.append(self._live(key))
+        return values
+    
+    async def latest_per_type(self, session_id: str, context_types: List[str]) -> Dict[str, Value]:
+        snapshot = {}
+        types = self._index.get(session_id, {})
+        for context_type in context_types:
+            for _, key in reversed(types.get(context_type, [])):
+                value = self._live(key)
+                if value is not None:
+                    snapshot[context_type] = value
+                    break
+        return snapshot
+    
+    async def get(self, key: str) -> Optional[Value]:
+        return self._live(key)
+    
+    async def mget(self, keys: List[str]) -> List[Optional[Value]]:
+        return [self._live(key) for key in keys]
+    
+    async def compact(self, batch_size: int = 500, dry_run: bool = False) -> Dict[str, int]:
+        indexes = entries = dangling = 0
+        for session_id, types in list(self._index.items()):
+            for context_type, index_entries in list(types.items()):
+                indexes += 1
+                entries += len(index_entries)
+                live = [(score, key) for score, key in index_entries if self._live(key) is not None]
+                dangling += len(index_entries) - len(live)
+                if not dry_run:
+                    if live:
+                        types[context_type] = live
+                    else:
+                        del types[context_type]
+            if not dry_run and not types:
+                del self._index[session_id]
+        if not dry_run:
+            for key in list(self._values):
+                self._live(key)
+            for stream in list(self._stream_expiry):
+                self._expire_stream(stream)
+        return {"indexes": indexes, "entries": entries, "dangling_entries": dangling}
+
+    def _expire_stream(self, stream: str):
+        """Drop an expired stream together with its groups, as Redis does."""
+        if self._stream_expiry.get(stream, float("inf")) <= self._clock():
+            self._streams.pop(stream, None)
+            self._stream_expiry.pop(stream, None)
+            self._stream_groups.pop(stream, None)
+    
+    def _live_stream(self, stream: str) -> List[Tuple[Tuple[int, int], Dict[str, str]]]:
+        self._expire_stream(stream)
+        return self._streams.setdefault(stream, [])
+    
+    @staticmethod
+    def _format_entries(entries) -> List[StreamEntry]:
+        return [(f"{entry_id[0]}-{entry_id[1]}", dict(fields)) for entry_id, fields in entries]
+    
+    async def stream_range(self, stream: str, after_id: str = "0", count: int = 100) -> List[StreamEntry]:
+        after = parse_stream_id(after_id)
+        return self._format_entries([entry for entry in self._live_stream(stream) if entry[0] > after][:count])
+    
+    async def create_stream_group(self, stream: str, group: str, start_id: str = "0") -> bool:
+        entries = self._live_stream(stream)
+        groups = self._stream_groups.setdefault(stream, {})
+        if group in groups:
+            return False
+        last_id = (entries[-1][0] if entries else (0, 0)) if start_id == "$" else parse_stream_id(start_id)
+        groups[group] = {"last_id": last_id, "pending": {}}
+        return True
+    
+    async def read_stream_group(
+        self,
+        stream: str,
+        group: str,
+        consumer: str,
+        count: int = 10,
+        block_ms: Optional[int] = None,
+        pending: bool = False
+    ) -> List[StreamEntry]:
+        async def read():
+            entries = self._live_stream(stream)
+            state = self._stream_groups.get(stream, {}).get(group)
+            if state is None:
+                raise ValueError(f"No consumer group {group} for stream {stream}")
+            if pending:
+                return self._format_entries([
+                    entry for entry in entries if state["pending"].get(entry[0]) == consumer
+                ][:count])
+            delivered = [entry for entry in entries if entry[0] > state["last_id"]][:count]
+            for entry_id, _ in delivered:
+                state["pending"][entry_id] = consumer
+            if delivered:
+                state["last_id"] = delivered[-1][0]
+            return self._format_entries(delivered)
+        
+        if pending:
+            return await read()
+        return await self._read_blocking(stream, block_ms, read)
+    
+    async def ack_stream(self, stream: str, group: str, entry_ids: List[str]) -> int:
+        state = self._stream_groups.get(stream, {}).get(group)
+        if state is None:
+            return 0
+        return sum(state["pending"].pop(parse_stream_id(entry_id), None) is not None for entry_id in entry_ids)
+
+
+class SQLiteContextBackend(_LocalPubSub, ContextStorageBackend):
+    """
+    Single-file backend in WAL mode, for installs without a Redis server.
+
+    Records live in one table indexed on (session_id, context_type, score);
+    blobs (summaries, manifests, collection chunks) in another; streams use
+    entry, group and pending-entry tables. Expired rows are invisible to reads
+    and deleted by compact(). Queries run in a worker
+    thread so the event loop is never blocked on disk I/O. Change events only
+    reach stores sharing this instance, not other processes using the file.
+    """
+    
+    def __init__(self, path: str = "context_store.db", clock=time.time):
+        super().__init__()
+        self.path = path
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS context_records (
+                key TEXT PRIMARY KEY,
+                session_id TEXT NOT NULL,
+                context_type TEXT NOT NULL,
+                score REAL NOT NULL,
+                value BLOB NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_context_records_session_type_score
+                ON context_records (session_id, context_type, score);
+            CREATE TABLE IF NOT EXISTS context_blobs (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS context_stream_entries (
+                stream TEXT NOT NULL,
+                ms INTEGER NOT NULL,
+                seq INTEGER NOT NULL,
+                fields TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (stream, ms, seq)
+            );
+            CREATE TABLE IF NOT EXISTS context_stream_groups (
+                stream TEXT NOT NULL,
+                group_name TEXT NOT NULL,
+                last_ms INTEGER NOT NULL,
+                last_seq INTEGER NOT NULL,
+                PRIMARY KEY (stream, group_name)
+            );
+            CREATE TABLE IF NOT EXISTS context_stream_pending (
+                stream TEXT NOT NULL,
+                group_name TEXT NOT NULL,
+                ms INTEGER NOT NULL,
+                seq INTEGER NOT NULL,
+                consumer TEXT NOT NULL,
+                PRIMARY KEY (stream, group_name, ms, seq)
+            );
+        """)
+    
+    async def _run(self, function, *args):
+        def locked():
+            with self._lock:
+                return function(*args)
+        return await asyncio.to_thread(locked)
+    
+    def _write(self, batch: ContextWriteBatch):
+        now = self._clock()
+        connection = self._connection
+        # IMMEDIATE: stream ids are read then written, which must not interleave with other processes
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(
+                "INSERT OR REPLACE INTO context_records VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (record.key, record.session_id, record.context_type, record.score, record.value, now + record.ttl_seconds)
+                    for record in batch.records
+                ]
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO context_blobs VALUES (?, ?, ?)",
+                [(key, value, now + ttl_seconds) for key, value, ttl_seconds in batch.blobs]
+            )
+            for stream, fields, max_length, ttl_seconds in batch.stream_entries:
+                last_id = self._last_stream_id(stream) or (0, 0)
+                connection.execute(
+                    "INSERT INTO context_stream_entries VALUES (?, ?, ?, ?, ?)",
+                    (stream, *next_stream_id(last_id, int(now * 1000)), json.dumps(fields), now + ttl_seconds)
+                )
+                connection.execute(
+                    "DELETE FROM context_stream_entries WHERE stream = ? AND (ms, seq) < ("
+                    "  SELECT ms, seq FROM context_stream_entries WHERE stream = ? ORDER BY ms DESC, seq DESC LIMIT 1 OFFSET ?"
+                    ")",
+                    (stream, stream, max_length - 1)
+                )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+    
+    async def write(self, batch: ContextWriteBatch):
+        await self._run(self._write, batch)
+        self._notify_streams([stream for stream, *_ in batch.stream_entries])
+        self._publish_events(batch.events)
+    
+    async def latest(self, session_id: str, context_type: str, min_score: float, limit: int) -> List[Optional[Value]]:
+        rows = await self._run(lambda: self._connection.execute(
+            "SELECT value FROM context_records WHERE session_id = ? AND context_type = ? AND score >= ? AND expires_at > ? "
+            "ORDER BY score DESC LIMIT ?",
+            (session_id, context_type, min_score, self._clock(), limit)
+        ).fetchall())
+        return [row[0] for row in rows]
+    
+    async def latest_per_type(self, session_id: str, context_types: List[str]) -> Dict[str, Value]:
+        placeholders = ", ".join("?" for _ in context_types)
+        rows = await self._run(lambda: self._connection.execute(
+            "SELECT context_type, value FROM ("
+            "  SELECT context_type, value, ROW_NUMBER() OVER (PARTITION BY context_type ORDER BY score DESC) AS position"
+            f"  FROM context_records WHERE session_id = ? AND context_type IN ({placeholders}) AND expires_at > ?"
+            ") WHERE position = 1",
+            (session_id, *context_types, self._clock())
+        ).fetchall())
+        return dict(rows)
+    
+    async def get(self, key: str) -> Optional[Value]:
+        return (await self.mget([key]))[0]
+    
+    async def mget(self, keys: List[str]) -> List[Optional[Value]]:
+        if not keys:
+            return []
+        placeholders = ", ".join("?" for _ in keys)
+        now = self._clock()
+        rows = await self._run(lambda: self._connection.execute(
+            f"SELECT key, value FROM context_blobs WHERE key IN ({placeholders}) AND expires_at > ? "
+            f"UNION ALL SELECT key, value FROM context_records WHERE key IN ({placeholders}) AND expires_at > ?",
+            (*keys, now, *keys, now)
+        ).fetchall())
+        values = dict(rows)
+        return [values.get(key) for key in keys]
+    
+    def _compact(self, dry_run: bool) -> Dict[str, int]:
+        now = self._clock()
+        connection = self._connection
+        indexes, entries = connection.execute(
+            "SELECT COUNT(DISTINCT session_id || ':' || context_type), COUNT(*) FROM context_records"
+        ).fetchone()
+        dangling = connection.execute("SELECT COUNT(*) FROM context_records WHERE expires_at <= ?", (now,)).fetchone()[0]
+        if not dry_run:
+            connection.execute("DELETE FROM context_records WHERE expires_at <= ?", (now,))
+            connection.execute("DELETE FROM context_blobs WHERE expires_at <= ?", (now,))
+            connection.execute("DELETE FROM context_stream_entries WHERE expires_at <= ?", (now,))
+            connection.execute(
+                "DELETE FROM context_stream_pending WHERE NOT EXISTS ("
+                "  SELECT 1 FROM context_stream_entries e WHERE e.stream = context_stream_pending.stream"
+                "  AND e.ms = context_stream_pending.ms AND e.seq = context_stream_pending.seq"
+                ")"
+            )
+        return {"indexes": indexes, "entries": entries, "dangling_entries": dangling}
+    
+    async def compact(self, batch_size: int = 500, dry_run: bool = False) -> Dict[str, int]:
+        return await self._run(self._compact, dry_run)
+    
+    def _last_stream_id(self, stream: str) -> Optional[Tuple[int, int]]:
+        return self._connection.execute(
+            "SELECT ms, seq FROM context_stream_entries WHERE stream = ? ORDER BY ms DESC, seq DESC LIMIT 1", (stream,)
+        ).fetchone()
+    
+    @staticmethod
+    def _stream_rows(rows) -> List[StreamEntry]:
+        return [(f"{ms}-{seq}", json.loads(fields)) for ms, seq, fields in rows]
+    
+    async def stream_range(self, stream: str, after_id: str = "0", count: int = 100) -> List[StreamEntry]:
+        rows = await self._run(lambda: self._connection.execute(
+            "SELECT ms, seq, fields FROM context_stream_entries WHERE stream = ? AND (ms, seq) > (?, ?) AND expires_at > ? "
+            "ORDER BY ms, seq LIMIT ?",
+            (stream, *parse_stream_id(after_id), self._clock(), count)
+        ).fetchall())
+        return self._stream_rows(rows)
+    
+    async def create_stream_group(self, stream: str, group: str, start_id: str = "0") -> bool:
+        def create():
+            last_id = (self._last_stream_id(stream) or (0, 0)) if start_id == "$" else parse_stream_id(start_id)
+            return self._connection.execute(
+                "INSERT OR IGNORE INTO context_stream_groups VALUES (?, ?, ?, ?)", (stream, group, *last_id)
+            ).rowcount == 1
+        return await self._run(create)
+    
+    def _read_group(self, stream: str, group: str, consumer: str, count: int, pending: bool) -> List[StreamEntry]:
+        connection = self._connection
+        now = self._clock()
+        if pending:
+            return self._stream_rows(connection.execute(
+                "SELECT e.ms, e.seq, e.fields FROM context_stream_pending p JOIN context_stream_entries e "
+                "ON e.stream = p.stream AND e.ms = p.ms AND e.seq = p.seq "
+                "WHERE p.stream = ? AND p.group_name = ? AND p.consumer = ? AND e.expires_at > ? ORDER BY e.ms, e.seq LIMIT ?",
+                (stream, group, consumer, now, count)
+            ).fetchall())
+        
+        # IMMEDIATE takes the write lock up front, so processes sharing the file never deliver an entry twice
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            last_id = connection.execute(
+                "SELECT last_ms, last_seq FROM context_stream_groups WHERE stream = ? AND group_name = ?", (stream, group)
+            ).fetchone()
+            if last_id is None:
+                raise ValueError(f"No consumer group {group} for stream {stream}")
+            rows = connection.execute(
+                "SELECT ms, seq, fields FROM context_stream_entries WHERE stream = ? AND (ms, seq) > (?, ?) AND expires_at > ? "
+                "ORDER BY ms, seq LIMIT ?",
+                (stream, *last_id, now, count)
+            ).fetchall()
+            if rows:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO context_stream_pending VALUES (?, ?, ?, ?, ?)",
+                    [(stream, group, ms, seq, consumer) for ms, seq, _ in rows]
+                )
+                connection.execute(
+                    "UPDATE context_stream_groups SET last_ms = ?, last_seq = ? WHERE stream = ? AND group_name = ?",
+                    (rows[-1][0], rows[-1][1], stream, group)
+                )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return self._stream_rows(rows)
+    
+    async def read_stream_group(
+        self,
+        stream: str,
+        group: str,
+        consumer: str,
+        count: int = 10,
+        block_ms: Optional[int] = None,
+        pending: bool = False
+    ) -> List[StreamEntry]:
+        async def read():
+            return await self._run(self._read_group, stream, group, consumer, count, pending)
+        
+        if pending:
+            return await read()
+        return await self._read_blocking(stream, block_ms, read)
+    
+    async def ack_stream(self, stream: str, group: str, entry_ids: List[str]) -> int:
+        if not entry_ids:
+            return 0
+        return await self._run(lambda: self._connection.executemany(
+            "DELETE FROM context_stream_pending WHERE stream = ? AND group_name = ? AND ms = ? AND seq = ?",
+            [(stream, group, *parse_stream_id(entry_id)) for entry_id in entry_ids]
+        ).rowcount)
+    
+    async def close(self):
+        await self._run(self._connection.close)
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    
+    class FakeClock:
+        """Manually advanced clock, so TTL checks take no wall time."""
+        def __init__(self):
+            self.now = time.time()
+        
+        def __call__(self) -> float:
+            return self.now
+    
+    def record(key: str, session_id: str, context_type: str, score: float, ttl_seconds: int = 60) -> ContextRecord:
+        return ContextRecord(key, session_id, context_type, score, json.dumps({"key": key}), ttl_seconds)
+    
+    def as_bytes(value: Optional[Value]) -> Optional[bytes]:
+        return value.encode() if isinstance(value, str) else value
+    
+    async def check_contract(name: str, backend: ContextStorageBackend, clock: Optional[FakeClock], blocking_reads: bool = True):
+        """The behaviour UniversalContextStore relies on, asserted against one backend."""
+        now = time.time()
+        batch = ContextWriteBatch()
+        for n, score in enumerate((now - 30, now - 20, now - 10)):
+            batch.put_record(record(f"agent_context:s1:branding:{n}", "s1", "branding", score))
+        batch.put_record(record("agent_context:s1:website:0", "s1", "website", now - 5))
+        batch.put_record(record("agent_context:s2:branding:0", "s2", "branding", now))
+        batch.put_blob("conversation_summary:s1", "summary", 60)
+        batch.put_blob("context_collection:c:0", b"\x01chunk", 60)
+        await backend.write(batch)
+        
+        latest = await backend.latest("s1", "branding", now - 25, 8)
+        assert [json.loads(v)["key"] for v in latest] == ["agent_context:s1:branding:2", "agent_context:s1:branding:1"], latest
+        assert len(await backend.latest("s1", "branding", 0, 1)) == 1
+        assert await backend.latest("s1", "lead_mining", 0, 8) == []
+        
+        snapshot = await backend.latest_per_type("s1", ["branding", "website", "lead_mining"])
+        assert {k: json.loads(v)["key"] for k, v in snapshot.items()} == {
+            "branding": "agent_context:s1:branding:2", "website": "agent_context:s1:website:0"
+        }, snapshot
+        assert as_bytes(await backend.get("conversation_summary:s1")) == b"summary"
+        assert [as_bytes(v) for v in await backend.mget(["context_collection:c:0", "missing"])] == [b"\x01chunk", None]
+        
+        # TTL: a short-lived record disappears from reads and counts as dangling until compacted
+        short = ContextWriteBatch()
+        short.put_record(record("agent_context:s3:branding:0", "s3", "branding", now, ttl_seconds=1))
+        # Mixed TTLs: a longer-lived type written later must not keep the expired one in latest_per_type
+        short.put_record(record("agent_context:s3:website:0", "s3", "website", now, ttl_seconds=60))
+        await backend.write(short)
+        assert any(await backend.latest("s3", "branding", 0, 8))
+        if clock:
+            clock.now += 2
+        else:
+            await asyncio.sleep(2.1)
+        assert not any(await backend.latest("s3", "branding", 0, 8))
+        assert await backend.latest_per_type("s3", ["branding"]) == {}
+        mixed = await backend.latest_per_type("s3", ["branding", "website"])
+        assert list(mixed) == ["website"], mixed
+        assert list(await backend.latest_per_type("s3", ["branding", "website"])) == ["website"]
+        assert (await backend.compact(dry_run=True))["dangling_entries"] >= 1
+        await backend.compact()
+        assert (await backend.compact(dry_run=True))["dangling_entries"] == 0
+        
+        if backend.supports_pubsub:
+            received = []
+            
+            async def consume():
+                async for message in backend.subscribe("context_invalidation"):
+                    received.append(message)
+                    return
+            consumer = asyncio.ensure_future(consume())
+            await asyncio.sleep(0.05)
+            event = ContextWriteBatch()
+            event.publish("context_invalidation", "s1")
+            await backend.write(event)
+            await asyncio.wait_for(consumer, timeout=2)
+            assert received == ["s1"], received
+        
+        # Streams: monotonic ids, replay after an id, consumer groups with acks, blocking reads
+        stream = "context_stream:s1"
+        entries = ContextWriteBatch()
+        for n in range(3):
+            entries.append_to_stream(stream, {"n": str(n)}, 100, 60)
+        await backend.write(entries)
+        logged = await backend.stream_range(stream)
+        ids = [parse_stream_id(entry_id) for entry_id, _ in logged]
+        assert [fields["n"] for _, fields in logged] == ["0", "1", "2"] and ids == sorted(set(ids)), logged
+        assert [fields["n"] for _, fields in await backend.stream_range(stream, logged[0][0])] == ["1", "2"]
+        assert await backend.create_stream_group(stream, "ui") and not await backend.create_stream_group(stream, "ui")
+        first = await backend.read_stream_group(stream, "ui", "c1", count=2)
+        second = await backend.read_stream_group(stream, "ui", "c2", count=10)
+        assert [fields["n"] for _, fields in first] == ["0", "1"] and [fields["n"] for _, fields in second] == ["2"]
+        assert await backend.read_stream_group(stream, "ui", "c1", block_ms=50) == []
+        assert await backend.ack_stream(stream, "ui", [first[0][0]]) == 1
+        assert [fields["n"] for _, fields in await backend.read_stream_group(stream, "ui", "c1", pending=True)] == ["1"]
+        if blocking_reads:
+            reader = asyncio.ensure_future(backend.read_stream_group(stream, "ui", "c1", block_ms=2000))
+            await asyncio.sleep(0.05)
+            entries = ContextWriteBatch()
+            entries.append_to_stream(stream, {"n": "3"}, 100, 60)
+            await backend.write(entries)
+            assert [fields["n"] for _, fields in await asyncio.wait_for(reader, timeout=3)] == ["3"]
+        print(f"  {name}: contract OK")
+    
+    async def measure_throughput(name: str, backend: ContextStorageBackend, writes: int = 2000, reads: int = 2000):
+        now = time.time()
+        start = time.perf_counter()
+        for n in range(writes):
+            batch = ContextWriteBatch()
+            batch.put_record(record(f"agent_context:bench{n % 50}:branding:{n}", f"bench{n % 50}", "branding", now + n))
+            await backend.write(batch)
+        write_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        for n in range(reads):
+            await backend.latest(f"bench{n % 50}", "branding", 0, 1)
+        read_seconds = time.perf_counter() - start
+        print(f"  {name:8} {writes / write_seconds:9.0f} writes/s  {reads / read_seconds:9.0f} latest-reads/s")
+    
+    async def main():
+        backends = []
+        memory_clock = FakeClock()
+        backends.append(("memory", InMemoryContextBackend(clock=memory_clock), memory_clock))
+        sqlite_clock = FakeClock()
+        sqlite_path = os.path.join(tempfile.mkdtemp(), "context.db")
+        backends.append(("sqlite", SQLiteContextBackend(sqlite_path, clock=sqlite_clock), sqlite_clock))
+        try:
+            import redis.asyncio as redis
+            client = redis.from_url(os.environ.get("REDIS_URL", "redis://localhost:6379/15"))
+            await client.ping()
+            await client.flushdb()
+            backends.append(("redis", RedisContextBackend(client), None))
+        except Exception as e:
+            try:
+                # No server: check the Redis layout against fakeredis (throughput is not representative)
+                import fakeredis
+                backends.append(("fakeredis", RedisContextBackend(fakeredis.FakeAsyncRedis()), None))
+            except ImportError:
+                print(f"  redis: skipped ({e})")
+        
+        print("Contract checks:")
+        for name, backend, clock in backends:
+            # fakeredis returns from blocking reads immediately
+            await check_contract(name, backend, clock, blocking_reads=name != "fakeredis")
+        print("Throughput:")
+        for name, backend, _ in backends:
+            await measure_throughput(name, backend)
+        for name, backend, _ in backends:
+            if isinstance(backend, RedisContextBackend):
+                await backend.redis_client.flushdb()
+            await backend.close()
+    
+    asyncio.run(main())
@@ -0,0 +1,211 @@
+"""
+Context Codec - Compact, versioned encoding for stored context values
+
+Context payloads (market analyses, sitemaps, lead chunks) were stored as plain
+JSON, which makes Redis memory the biggest cost line. Encoded values are:
+1. One header byte naming the serializer and compressor, then the payload
+2. msgpack when installed (else compact JSON), compressed above a size
+   threshold with zstd when installed (else zlib)
+3. Base64-armoured behind a "!" prefix for clients that decode responses to str
+
+Values without a header byte are legacy and still decode: plain JSON text,
+or zlib-compressed JSON (the first collection chunk format).
+"""
+
+import base64
+import json
+import logging
+import zlib
+from typing import Any, Dict, Optional, Type, Union
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Header bytes: high nibble = serializer, low nibble = compressor.
+# None of them can start a JSON document, so legacy values are unambiguous.
+SERIALIZER_JSON = 0x00
+SERIALIZER_MSGPACK = 0x10
+COMPRESSOR_NONE = 0x01
+COMPRESSOR_ZLIB = 0x02
+COMPRESSOR_ZSTD = 0x03
+
+ARMOUR_PREFIX = "!"
+ZLIB_MAGIC = 0x78
+
+
+class ContextCodecError(ValueError):
+    """Raised when a stored value cannot be decoded."""
+
+
+class ContextCodec:
+    """
+    Encode/decode JSON-compatible values with a one-byte format header.
+
+    Decoding never depends on the optional libraries being installed at
+    encode time, except for values that were actually written with them.
+    """
+    
+    DEFAULT_COMPRESS_THRESHOLD = 512  # bytes of serialized payload
+    ZLIB_LEVEL = 6
+    ZSTD_LEVEL = 3
+    
+    def __init__(
+        self,
+        use_msgpack: bool = MSGPACK_AVAILABLE,
+        use_zstd: bool = ZSTD_AVAILABLE,
+        compress_threshold: int = DEFAULT_COMPRESS_THRESHOLD,
+        json_encoder: Type[json.JSONEncoder] = json.JSONEncoder
+    ):
+        if use_msgpack and not MSGPACK_AVAILABLE:
+            raise ValueError("msgpack is not installed")
+        if use_zstd and not ZSTD_AVAILABLE:
+            raise ValueError("zstandard is not installed")
+        self.use_msgpack = use_msgpack
+        self.use_zstd = use_zstd
+        self.compress_threshold = compress_threshold
+        self.json_encoder = json_encoder
+        self._encoder_instance = json_encoder()
+        self._zstd_compressor = zstandard.ZstdCompressor(level=self.ZSTD_LEVEL) if use_zstd else None
+        self._zstd_decompressor = zstandard.ZstdDecompressor() if ZSTD_AVAILABLE else None
+    
+    def _serialize(self, value: Any) -> bytes:
+        if self.use_msgpack:
+            # Objects msgpack cannot handle go through the JSON encoder's default()
+            return msgpack.packb(value, default=self._encoder_instance.default, use_bin_type=True)
+        return json.dumps(value, cls=self.json_encoder, separators=(",", ":")).encode()
+    
+    def _compress(self, payload: bytes) -> tuple:
+        if len(payload) < self.compress_threshold:
+            return COMPRESSOR_NONE, payload
+        if self.use_zstd:
+            compressed, compressor = self._zstd_compressor.compress(payload), COMPRESSOR_ZSTD
+        else:
+            compressed, compressor = zlib.compress(payload, self.ZLIB_LEVEL), COMPRESSOR_ZLIB
+        # Incompressible payloads are stored as-is
+        return (compressor, compressed) if len(compressed) < len(payload) else (COMPRESSOR_NONE, payload)
+    
+    def encode(self, value: Any, text: bool = False) -> Union[bytes, str]:
+        """Encode a value; text=True returns an armoured str for decode_responses clients."""
+        serializer = SERIALIZER_MSGPACK if self.use_msgpack else SERIALIZER_JSON
+        compressor, payload = self._compress(self._serialize(value))
+        encoded = bytes([serializer | compressor]) + payload
+        if text:
+            return ARMOUR_PREFIX + base64.b64encode(encoded).decode("ascii")
+        return encoded
+    
+    def decode(self, value: Optional[Union[bytes, str]]) -> Any:
+        """Decode an encoded or legacy value (None passes through)."""
+        if value is None:
+            return None
+        if isinstance(value, str):
+            if not value.startswith(ARMOUR_PREFIX):
+                return json.loads(value)
+            value = base64.b64decode(value[len(ARMOUR_PREFIX):])
+        if not value:
+            raise ContextCodecError("Empty value")
+        
+        header = value[0]
+        if header == ZLIB_MAGIC:
+            return json.loads(zlib.decompress(value))
+        if header in b"{[\" \t\r\n":
+            return json.loads(value)
+        
+        serializer, compressor = header & 0xF0, header & 0x0F
+        payload = value[1:]
+        if compressor == COMPRESSOR_ZLIB:
+            payload = zlib.decompress(payload)
+        elif compressor == COMPRESSOR_ZSTD:
+            if not self._zstd_decompressor:
+                raise ContextCodecError("Value is zstd-compressed but zstandard is not installed")
+            payload = self._zstd_decompressor.decompress(payload)
+        elif compressor != COMPRESSOR_NONE:
+            raise ContextCodecError(f"Unknown compressor in header 0x{header:02x}")
+        
+        if serializer == SERIALIZER_MSGPACK:
+            if not MSGPACK_AVAILABLE:
+                raise ContextCodecError("Value is msgpack-encoded but msgpack is not installed")
+            return msgpack.unpackb(payload, raw=False)
+        if serializer == SERIALIZER_JSON:
+            return json.loads(payload)
+        raise ContextCodecError(f"Unknown serializer in header 0x{header:02x}")
+    
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "serializer": "msgpack" if self.use_msgpack else "json",
+            "compressor": "zstd" if self.use_zstd else "zlib",
+            "compress_threshold": self.compress_threshold
+        }
+
+
+if __name__ == "__main__":
+    def sample_payloads() -> Dict[str, Any]:
+        """Payloads shaped like real stored contexts."""
+        market_analysis = {
+            "data": {
+                "opportunity_score": 0.78,
+                "key_findings": [f"Finding {i}: demand for artisan products grew in segment {i}" for i in range(25)],
+                "market_analysis": {
+                    region: {"size_usd": 1.2e9 + i, "growth": 0.04 + i / 100, "competitors": [f"Competitor {j}" for j in range(12)]}
+                    for i, region in enumerate(["north", "south", "east", "west", "central", "coastal"])
+                },
+                "target_personas": [{"name": f"Persona {i}", "pains": ["price", "quality", "speed"], "age": 25 + i} for i in range(6)]
+            },
+            "timestamp": "2025-01-01T12:00:00", "workflow_id": "wf-123", "business_goal": "Research bakery market",
+            "agent_id": "market_research_agent"
+        }
+        sitemap = {
+            "data": {
+                "sitemap": {f"/page-{i}": {"title": f"Page {i}", "sections": [f"Section {j}" for j in range(8)]} for i in range(40)},
+                "seo_recommendations": [f"Use keyword {i} in headings" for i in range(30)]
+            },
+            "timestamp": "2025-01-01T12:00:00", "workflow_id": "wf-123", "business_goal": "Build bakery website",
+            "agent_id": "website_generator_agent"
+        }
+        leads = [
+            {"company_name": f"Company {i}", "job_title": ["CTO", "VP Sales", "Founder"][i % 3],
+             "email": f"person{i}@company{i}.com", "linkedin": f"https://linkedin.com/in/person{i}", "score": i / 100}
+            for i in range(100)
+        ]
+        small = {"data": {"brand_name": "Crumb & Co"}, "timestamp": "2025-01-01T12:00:00", "workflow_id": "wf", "business_goal": "", "agent_id": "branding_agent"}
+        return {"market_analysis": market_analysis, "sitemap": sitemap, "lead_chunk": leads, "small_branding": small}
+    
+    def benchmark_codecs(iterations: int = 300):
+        """Size ratio and encode/decode time per codec configuration against the legacy JSON format."""
+        import timeit
+        
+        configurations = {"json+zlib": ContextCodec(use_msgpack=False, use_zstd=False)}
+        if MSGPACK_AVAILABLE:
+            configurations["msgpack+zlib"] = ContextCodec(use_msgpack=True, use_zstd=False)
+        if ZSTD_AVAILABLE:
+            configurations["json+zstd"] = ContextCodec(use_msgpack=False, use_zstd=True)
+        if MSGPACK_AVAILABLE and ZSTD_AVAILABLE:
+            configurations["msgpack+zstd"] = ContextCodec(use_msgpack=True, use_zstd=True)
+        
+        print(f"msgpack available: {MSGPACK_AVAILABLE}, zstandard available: {ZSTD_AVAILABLE}")
+        for name, payload in sample_payloads().items():
+            legacy = json.dumps(payload)
+            legacy_encode = timeit.timeit(lambda: json.dumps(payload), number=iterations) / iterations
+            legacy_decode = timeit.timeit(lambda: json.loads(legacy), number=iterations) / iterations
+            print(f"\n{name}: legacy JSON {len(legacy)} bytes, encode {legacy_encode * 1e6:.0f} us, decode {legacy_decode * 1e6:.0f} us")
+            for label, codec in configurations.items():
+                encoded = codec.encode(payload)
+                assert codec.decode(encoded) == json.loads(legacy)
+                encode_time = timeit.timeit(lambda: codec.encode(payload), number=iterations) / iterations
+                decode_time = timeit.timeit(lambda: codec.decode(encoded), number=iterations) / iterations
+                print(
+                    f"  {label:13} {len(encoded):7} bytes  ratio {len(legacy) / len(encoded):5.2f}x  "
+                    f"encode {encode_time * 1e6:6.0f} us  decode {decode_time * 1e6:6.0f} us"
+                )
+    
+    benchmark_codecs()
@@ -0,0 +1,205 @@
+"""
+Context Search - Relevance-ranked snippets from a session's stored context
+
+Prompts used to carry generic recent history whether or not it answered the
+question ("what colors did you use?" does not need the market analysis). Each
+session instead keeps a small in-process inverted index:
+1. Every extracted context field becomes one snippet ("branding.color_palette: ...")
+2. Terms map to the snippets containing them (with term frequencies)
+3. Queries are scored with BM25, so only the top-k relevant snippets reach the prompt
+
+The newest item of a context type replaces the previous one's snippets, the
+same "latest per type" view the session snapshot gives.
+"""
+
+import json
+import math
+import re
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "did", "do", "does", "for", "from", "how", "i", "in",
+    "is", "it", "me", "my", "of", "on", "or", "our", "that", "the", "this", "to", "us", "was", "we", "were",
+    "what", "which", "who", "why", "with", "you", "your"
+}
+
+
+def _normalize_term(token: str) -> str:
+    """Light plural folding so "colors" matches "color_palette"."""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase terms without stopwords; snake_case and camelCase field names are split."""
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", str(text)).lower()
+    return [_normalize_term(token) for token in _TOKEN.findall(text) if token not in _STOPWORDS]
+
+
+@dataclass
+class ContextSnippet:
+    """One searchable field of a stored context item."""
+    context_type: str
+    field: str
+    text: str
+    timestamp: str
+    score: float = 0.0
+    
+    def render(self) -> str:
+        return f"{self.context_type}.{self.field}: {self.text}"
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class _SessionIndex:
+    """Postings for one session: term -> {snippet id: term frequency}."""
+    
+    def __init__(self):
+        self.snippets: Dict[int, ContextSnippet] = {}
+        self.lengths: Dict[int, int] = {}
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.terms: Dict[int, List[str]] = {}
+        self.by_type: Dict[str, List[int]] = {}
+        self.total_length = 0
+        self._next_id = 0
+        self.built_at = time.monotonic()
+    
+    def remove_type(self, context_type: str):
+        for snippet_id in self.by_type.pop(context_type, []):
+            self.snippets.pop(snippet_id)
+            self.total_length -= self.lengths.pop(snippet_id)
+            for term in self.terms.pop(snippet_id):
+                postings = self.postings[term]
+                del postings[snippet_id]
+                if not postings:
+                    del self.postings[term]
+    
+    def add(self, snippet: ContextSnippet, terms: List[str]):
+        snippet_id = self._next_id
+        self._next_id += 1
+        self.snippets[snippet_id] = snippet
+        self.lengths[snippet_id] = len(terms)
+        self.total_length += len(terms)
+        self.by_type.setdefault(snippet.context_type, []).append(snippet_id)
+        frequencies: Dict[str, int] = {}
+        for term in terms:
+            frequencies[term] = frequencies.get(term, 0) + 1
+        self.terms[snippet_id] = list(frequencies)
+        for term, frequency in frequencies.items():
+            self.postings.setdefault(term, {})[snippet_id] = frequency
+
+
+class ContextSearchIndex:
+    """
+    BM25 search over the extracted context fields of each session.
+
+    Kept in-process and bounded (LRU over sessions); it is derived data, so a
+    dropped session is rebuilt from the store on its next search. With
+    ttl_seconds set, a session index older than that counts as missing, which
+    bounds staleness when writes by other workers go unnoticed.
+    """
+    
+    K1 = 1.2
+    B = 0.75
+    MAX_SNIPPET_CHARS = 300
+    MAX_LIST_ITEMS = 10  # list fields are indexed and shown up to this many items
+    
+    def __init__(self, max_sessions: int = 1024, ttl_seconds: Optional[float] = None):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, _SessionIndex]" = OrderedDict()
+    
+    def has_session(self, session_id: str) -> bool:
+        """Whether the session is indexed and its index was built within ttl_seconds."""
+        index = self._sessions.get(session_id)
+        if index is None:
+            return False
+        if self.ttl_seconds is not None and time.monotonic() - index.built_at > self.ttl_seconds:
+            del self._sessions[session_id]
+            return False
+        return True
+    
+    def ensure_session(self, session_id: str):
+        """Mark a session as indexed (possibly with nothing in it)."""
+        self._session(session_id)
+    
+    def drop_session(self, session_id: str):
+        self._sessions.pop(session_id, None)
+    
+    def clear(self):
+        self._sessions.clear()
+    
+    def _session(self, session_id: str) -> _SessionIndex:
+        index = self._sessions.get(session_id)
+        if index is None:
+            index = self._sessions[session_id] = _SessionIndex()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(session_id)
+        return index
+    
+    @classmethod
+    def _fields(cls, data: Dict[str, Any], prefix: str = "") -> Iterator[Tuple[str, str]]:
+        """(field path, display text) for each leaf-ish field of an extracted context."""
+        for key, value in data.items():
+            if key == "collections" or value in (None, "", [], {}):
+                continue
+            path = f"{prefix}{key}"
+            if isinstance(value, dict) and not prefix:
+                yield from cls._fields(value, f"{path}.")
+                continue
+            if isinstance(value, list):
+                value = value[:cls.MAX_LIST_ITEMS]
+            text = value if isinstance(value, str) else json.dumps(value, default=str, separators=(", ", ": "))
+            yield path, (text[:cls.MAX_SNIPPET_CHARS] + "..." if len(text) > cls.MAX_SNIPPET_CHARS else text)
+    
+    def index_item(self, session_id: str, context_type: str, data: Dict[str, Any], timestamp: str = ""):
+        """Index an extracted context, replacing the session's previous item of that type."""
+        index = self._session(session_id)
+        index.remove_type(context_type)
+        for field, text in self._fields(data or {}):
+            terms = tokenize(f"{context_type} {field}") + tokenize(text)
+            index.add(ContextSnippet(context_type=context_type, field=field, text=text, timestamp=timestamp), terms)
+    
+    def search(self, session_id: str, query: str, k: int = 5) -> List[ContextSnippet]:
+        """Top-k snippets for a query by BM25 (empty when nothing matches)."""
+        index = self._sessions.get(session_id)
+        if index is None or not index.snippets:
+            return []
+        self._sessions.move_to_end(session_id)
+        
+        count = len(index.snippets)
+        average_length = index.total_length / count or 1
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = index.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for snippet_id, frequency in postings.items():
+                length_norm = 1 - self.B + self.B * index.lengths[snippet_id] / average_length
+                scores[snippet_id] = scores.get(snippet_id, 0.0) + idf * frequency * (self.K1 + 1) / (frequency + self.K1 * length_norm)
+        
+        ranked = sorted(scores.items(), key=lambda pair: pair[1], reverse=True)[:k]
+        return [
+            ContextSnippet(**{**asdict(index.snippets[snippet_id]), "score": round(score, 4)})
+            for snippet_id, score in ranked
+        ]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "snippets": sum(len(index.snippets) for index in self._sessions.values()),
+            "terms": sum(len(index.postings) for index in self._sessions.values())
+        }
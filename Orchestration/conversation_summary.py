@@ -0,0 +1,164 @@
+"""
+Rolling Conversation Summary - Incrementally maintained per-session prompt context
+
+Rebuilding the analyzer's context summary on every call re-slices the whole
+history and forgets everything older than the last few messages. Instead each
+session keeps one summary that is updated as messages and deliverables arrive:
+1. Entries are scored by importance (deliverables > requests > chit-chat) and recency
+2. The lowest-scoring entries are evicted to stay within a fixed token budget
+3. The rendered text is rebuilt on write, so prompt building is an O(1) read
+"""
+
+import re
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Words that mark a message as a request for work (worth keeping longer)
+_ACTION_WORDS = re.compile(
+    r'\b(create|build|make|design|generate|develop|write|find|research|analy[sz]e|monitor|set up|icp|leads?)\b'
+)
+_ACKNOWLEDGEMENTS = {"ok", "okay", "thanks", "thank you", "cool", "great", "nice", "yes", "no", "sure"}
+
+
+@dataclass
+class SummaryEntry:
+    """One message or deliverable kept in the rolling summary."""
+    kind: str  # "message" or "deliverable"
+    label: str  # role for messages, agent type for deliverables
+    text: str
+    details: List[str]
+    importance: float
+    sequence: int
+    tokens: int
+
+
+class RollingConversationSummary:
+    """
+    Token-bounded summary of one session's conversation and completed work.
+
+    Score = importance * RECENCY_DECAY ** age, where age counts the entries
+    added since. When over budget, the lowest-scoring entry is evicted.
+    """
+    
+    DEFAULT_TOKEN_BUDGET = 600
+    RECENCY_DECAY = 0.85
+    MAX_ENTRY_CHARS = 240
+    MAX_DELIVERABLE_DETAILS = 3
+    
+    def __init__(self, session_id: str, token_budget: int = DEFAULT_TOKEN_BUDGET):
+        self.session_id = session_id
+        self.token_budget = token_budget
+        self.entries: List[SummaryEntry] = []
+        self.total_tokens = 0
+        self.evicted_entries = 0
+        self._sequence = 0
+        self._rendered = ""
+        # Id of the last entry folded in from the store's append-only log ("0" = none)
+        self.folded_through = "0"
+    
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """Rough token estimate (~4 characters per token)."""
+        return max(1, len(text) // 4)
+    
+    @classmethod
+    def _truncate(cls, text: str) -> str:
+        text = " ".join(str(text).split())
+        return text[:cls.MAX_ENTRY_CHARS] + "..." if len(text) > cls.MAX_ENTRY_CHARS else text
+    
+    @staticmethod
+    def _message_importance(role: str, content: str) -> float:
+        normalized = content.lower().strip(" .!?")
+        if normalized in _ACKNOWLEDGEMENTS:
+            return 0.1
+        if role == "user":
+            return 0.8 if _ACTION_WORDS.search(normalized) else 0.6
+        return 0.4
+    
+    def add_message(self, role: str, content: str):
+        """Record a conversation message."""
+        if not content:
+            return
+        text = self._truncate(content)
+        self._add(SummaryEntry(
+            kind="message",
+            label=role or "unknown",
+            text=text,
+            details=[],
+            importance=self._message_importance(role, text),
+            sequence=self._sequence,
+            tokens=self._estimate_tokens(f"{role}: {text}")
+        ))
+    
+    def add_deliverable(self, agent_type: str, business_goal: str, deliverables: Optional[List[Any]] = None):
+        """Record completed agent work; deliverables outlive conversation messages."""
+        details = [self._truncate(item) for item in (deliverables or [])[:self.MAX_DELIVERABLE_DETAILS]]
+        text = self._truncate(business_goal or "")
+        self._add(SummaryEntry(
+            kind="deliverable",
+            label=agent_type or "unknown",
+            text=text,
+            details=details,
+            importance=1.0,
+            sequence=self._sequence,
+            tokens=self._estimate_tokens(f"{agent_type}: {text} " + " ".join(details))
+        ))
+    
+    def _add(self, entry: SummaryEntry):
+        self._sequence += 1
+        self.entries.append(entry)
+        self.total_tokens += entry.tokens
+        self._evict_to_budget()
+        self._render()
+    
+    def _score(self, entry: SummaryEntry) -> float:
+        return entry.importance * self.RECENCY_DECAY ** (self._sequence - entry.sequence)
+    
+    def _evict_to_budget(self):
+        # Never evict the newest entry; a single oversized entry is allowed through
+        while self.total_tokens > self.token_budget and len(self.entries) > 1:
+            victim = min(range(len(self.entries) - 1), key=lambda i: self._score(self.entries[i]))
+            self.total_tokens -= self.entries.pop(victim).tokens
+            self.evicted_entries += 1
+    
+    def _render(self):
+        messages = [e for e in self.entries if e.kind == "message"]
+        deliverables = [e for e in self.entries if e.kind == "deliverable"]
+        parts = []
+        if messages:
+            parts.append("RECENT CONVERSATION:")
+            parts.extend(f"  {e.label}: {e.text}" for e in messages)
+        if deliverables:
+            parts.append("\nRECENT WORK COMPLETED:" if parts else "RECENT WORK COMPLETED:")
+            for e in deliverables:
+                parts.append(f"  {e.label}: {e.text}")
+                parts.extend(f"    - {detail}" for detail in e.details)
+        self._rendered = "\n".join(parts)
+    
+    def render(self) -> str:
+        """The current summary text (empty when nothing has been recorded)."""
+        return self._rendered
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "token_budget": self.token_budget,
+            "sequence": self._sequence,
+            "evicted_entries": self.evicted_entries,
+            "folded_through": self.folded_through,
+            "entries": [asdict(entry) for entry in self.entries]
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RollingConversationSummary":
+        summary = cls(data["session_id"], data.get("token_budget", cls.DEFAULT_TOKEN_BUDGET))
+        summary.entries = [SummaryEntry(**entry) for entry in data.get("entries", [])]
+        summary.total_tokens = sum(entry.tokens for entry in summary.entries)
+        summary.evicted_entries = data.get("evicted_entries", 0)
+        summary._sequence = data.get("sequence", len(summary.entries))
+        summary.folded_through = data.get("folded_through", "0")
+        summary._render()
+        return summary
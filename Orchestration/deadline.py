@@ -0,0 +1,125 @@
+"""
+Request Deadlines - One latency budget shared by every layer that serves a request
+
+A Slack reply has a hard latency budget. Instead of each layer applying its own
+timeout, the entry point opens a deadline scope and every layer below it
+(analyzer, parser, AI engine) reads the remaining time from a contextvar, so:
+1. Engine retries and backoff are capped to the time that is left
+2. Optional second LLM calls are skipped when time is short
+3. Callers return their local heuristic result before the deadline passes
+4. Deadline misses are counted per layer
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Absolute time.monotonic() deadline of the current request, if any
+_request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """Raised when a layer cannot finish within the request deadline."""
+
+
+class DeadlineMissCounter:
+    """Thread-safe count of deadline misses per layer."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._misses: Dict[str, int] = {}
+    
+    def record(self, layer: str):
+        with self._lock:
+            self._misses[layer] = self._misses.get(layer, 0) + 1
+    
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._misses)
+    
+    def reset(self):
+        with self._lock:
+            self._misses.clear()
+
+
+deadline_misses = DeadlineMissCounter()
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """
+    Run the enclosed code under a deadline `seconds` from now.
+
+    Nested scopes can only tighten the deadline, never extend it. A None
+    budget leaves any outer deadline in place.
+    """
+    if seconds is None:
+        yield _request_deadline.get()
+        return
+    
+    deadline = time.monotonic() + max(0.0, seconds)
+    outer_deadline = _request_deadline.get()
+    if outer_deadline is not None:
+        deadline = min(deadline, outer_deadline)
+    
+    token = _request_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _request_deadline.reset(token)
+
+
+def time_remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None without one."""
+    deadline = _request_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def has_time_for(seconds: float) -> bool:
+    """True when there is no deadline or at least `seconds` are left."""
+    remaining = time_remaining()
+    return remaining is None or remaining >= seconds
+
+
+async def run_within_deadline(awaitable: Awaitable[Any], layer: str, reserve: float = 0.0) -> Any:
+    """
+    Await something, giving up `reserve` seconds before the deadline.
+
+    The reserve leaves the caller time to produce a local fallback. Raises
+    DeadlineExceeded (and records a miss for `layer`) when time runs out; a
+    TimeoutError raised by the awaitable itself propagates unchanged, so
+    callers can still tell a slow provider from an exhausted budget.
+    """
+    remaining = time_remaining()
+    if remaining is None:
+        return await awaitable
+    
+    budget = remaining - reserve
+    if budget <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        deadline_misses.record(layer)
+        raise DeadlineExceeded(f"{layer}: no time left before deadline")
+    
+    # A separate timer rather than wait_for, whose TimeoutError looks like the awaitable's own
+    task = asyncio.ensure_future(awaitable)
+    try:
+        done, _ = await asyncio.wait({task}, timeout=budget)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    if task in done:
+        return task.result()
+    
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    deadline_misses.record(layer)
+    raise DeadlineExceeded(f"{layer}: exceeded deadline after {budget:.2f}s")
@@ -0,0 +1,132 @@
+"""
+Incremental JSON - Decode top-level fields of a JSON object while it is still streaming
+
+Models generate JSON fields in schema order, so early fields (capabilities,
+recommended agents) are complete long before the closing brace. This parser
+consumes text deltas and reports each top-level field the moment its value
+is complete, without re-scanning the buffer on every delta.
+"""
+
+import json
+import logging
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalJSONObjectParser:
+    """
+    Streaming decoder for the top-level fields of one JSON object.
+
+    Text before the opening brace (such as a ```json fence) and after the
+    closing brace is ignored. Each call to feed() returns the (key, value)
+    pairs completed by that delta; all completed fields stay in self.fields.
+    """
+    
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self.complete = False
+        
+        # Unconsumed deltas from the start of the pending key or value; _offset is their stream position
+        self._chunks: List[str] = []
+        self._offset = 0
+        self._position = 0  # characters scanned so far
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._started = False
+        
+        # Top-level key/value tracking
+        self._expecting_key = True
+        self._key_start = None
+        self._current_key = None
+        self._value_start = None
+    
+    def _joined(self) -> str:
+        # Joined lazily, so each pending value is copied once when it completes
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+    
+    def _text(self, start: int, end: int) -> str:
+        return self._joined()[start - self._offset:end - self._offset]
+    
+    def _compact(self):
+        """Drop text no pending key or value can still need."""
+        pending = [start for start in (self._key_start, self._value_start) if start is not None]
+        if not pending:
+            self._chunks = []
+            self._offset = self._position
+        elif min(pending) > self._offset:
+            self._chunks = [self._joined()[min(pending) - self._offset:]]
+            self._offset = min(pending)
+    
+    def _finish_value(self, end: int, completed: List[Tuple[str, Any]]):
+        """Decode the top-level value that ends just before position end."""
+        if self._current_key is None or self._value_start is None:
+            return
+        raw_value = self._text(self._value_start, end).strip()
+        try:
+            value = json.loads(raw_value)
+        except json.JSONDecodeError as e:
+            logger.debug(f"Could not decode streamed field {self._current_key}: {e}")
+        else:
+            self.fields[self._current_key] = value
+            completed.append((self._current_key, value))
+        self._current_key = None
+        self._value_start = None
+        self._expecting_key = True
+    
+    def feed(self, delta: str) -> List[Tuple[str, Any]]:
+        """Consume a text delta and return the top-level fields it completed."""
+        completed: List[Tuple[str, Any]] = []
+        if self.complete or not delta:
+            return completed
+        
+        self._chunks.append(delta)
+        
+        for char in delta:
+            position = self._position
+            self._position += 1
+            
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                    self._depth = 1
+                continue
+            
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expecting_key and self._key_start is not None:
+                        self._current_key = json.loads(self._text(self._key_start, position + 1))
+                        self._key_start = None
+                continue
+            
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expecting_key:
+                    self._key_start = position
+            elif char == ":" and self._depth == 1 and self._expecting_key and self._current_key is not None:
+                self._expecting_key = False
+                self._value_start = position + 1
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finish_value(position, completed)
+                    self.complete = True
+                    break
+            elif char == "," and self._depth == 1:
+                self._finish_value(position, completed)
+        
+        self._compact()
+        return completed
+    
+    def has_fields(self, *keys: str) -> bool:
+        return all(key in self.fields for key in keys)
@@ -0,0 +1,183 @@
+"""
+Intent Cache - Reuse response decisions and semantic understandings for recurring messages
+
+The same messages recur constantly ("what colors did you use", "generate leads"),
+but the engine's prompt cache misses whenever any part of the conversation
+context in the prompt changes. This cache sits above the prompt layer:
+1. Keys are the normalized message plus a fingerprint of only the context
+   fields the result depends on (completed work and recent turns, business context)
+2. Entries are per session; storing new agent results invalidates the session
+3. One instance is shared by the response analyzer and the semantic parser
+"""
+
+import copy
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_SESSION = "_global"
+
+_WHITESPACE = re.compile(r'\s+')
+_EDGE_PUNCTUATION = re.compile(r'^[\W_]+|[\W_]+$')
+
+
+def normalize_message(message: str) -> str:
+    """Lowercase, collapse whitespace and drop leading/trailing punctuation."""
+    return _EDGE_PUNCTUATION.sub('', _WHITESPACE.sub(' ', message.lower())).strip()
+
+
+def _digest(value: Any) -> str:
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+# The response analyzer shows the model this many recent messages, 100 characters each
+DECISION_HISTORY_MESSAGES = 3
+DECISION_HISTORY_CHARS = 100
+
+
+def _recent_turns(context: Dict[str, Any]) -> List[Tuple[Any, str]]:
+    """The last few conversation turns, truncated as the analyzer prompt shows them."""
+    return [
+        (message.get("role"), str(message.get("content", ""))[:DECISION_HISTORY_CHARS])
+        for message in (context.get("conversation_history") or [])[-DECISION_HISTORY_MESSAGES:]
+        if isinstance(message, dict)
+    ]
+
+
+def decision_context_fingerprint(context: Optional[Dict[str, Any]]) -> str:
+    """
+    What the response decision depends on: the work already completed in the
+    session and the recent turns ("yes", "the second one" mean something else
+    after every assistant reply).
+    """
+    if not context:
+        return ""
+    last_result = (context.get("session_context") or {}).get("last_result") or {}
+    return _digest({
+        "history": _recent_turns(context),
+        "deliverables": [d.get("agent_type") for d in (context.get("recent_deliverables") or [])[-3:] if isinstance(d, dict)],
+        "workflows": [
+            w.get("workflow_id") or w.get("id") for w in (context.get("completed_workflows") or [])[-3:] if isinstance(w, dict)
+        ],
+        "last_goal": last_result.get("business_goal"),
+        "last_agents": last_result.get("agents_used")
+    })
+
+
+def understanding_context_fingerprint(context: Optional[Dict[str, Any]]) -> str:
+    """
+    What the semantic understanding depends on: the business the request is
+    for and the recent turns, which the parser prompt also includes.
+    """
+    if not context:
+        return ""
+    return _digest({
+        "history": _recent_turns(context),
+        "business_context": context.get("business_context"),
+        "user_preferences": context.get("user_preferences"),
+        "company_profile": context.get("company_profile")
+    })
+
+
+class IntentCache:
+    """
+    LRU + TTL cache for intent-layer results, shared by analyzer and parser.
+
+    Session invalidation is O(1): each session has a generation number that is
+    part of every key, so bumping it orphans the session's entries, which then
+    age out of the LRU.
+    """
+    
+    DEFAULT_MAX_ENTRIES = 2048
+    DEFAULT_TTL_SECONDS = 900
+    
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        fingerprints: Optional[Dict[str, Callable[[Optional[Dict[str, Any]]], str]]] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.fingerprints = fingerprints or {
+            "decision": decision_context_fingerprint,
+            "understanding": understanding_context_fingerprint
+        }
+        
+        self._entries: "OrderedDict[Tuple[str, str, int, str, str], Tuple[float, Any]]" = OrderedDict()
+        self._generations: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        
+        self.hits: Dict[str, int] = defaultdict(int)
+        self.misses: Dict[str, int] = defaultdict(int)
+        self.invalidations = 0
+    
+    @staticmethod
+    def session_of(context: Optional[Dict[str, Any]]) -> str:
+        """Session id carried in a conversation context, if any."""
+        if context:
+            session_id = context.get("session_id") or (context.get("session_context") or {}).get("session_id")
+            if session_id:
+                return str(session_id)
+        return GLOBAL_SESSION
+    
+    def _key(self, kind: str, message: str, context: Optional[Dict[str, Any]]) -> Tuple[str, str, int, str, str]:
+        session_id = self.session_of(context)
+        fingerprint = self.fingerprints[kind](context)
+        return (kind, session_id, self._generations[session_id], normalize_message(message), fingerprint)
+    
+    def get(self, kind: str, message: str, context: Optional[Dict[str, Any]] = None) -> Optional[Any]:
+        """Return a private copy of the cached result, or None."""
+        key = self._key(kind, message, context)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses[kind] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits[kind] += 1
+            value = entry[1]
+        # Callers mutate results (execution_plan updates), so never hand out the cached object
+        return copy.deepcopy(value)
+    
+    def put(self, kind: str, message: str, context: Optional[Dict[str, Any]], value: Any):
+        key = self._key(kind, message, context)
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate_session(self, session_id: str):
+        """Drop every cached result for a session, e.g. when new agent results are stored."""
+        with self._lock:
+            self._generations[session_id] += 1
+            self.invalidations += 1
+        logger.debug(f"Invalidated intent cache for session {session_id}")
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        kinds = set(self.hits) | set(self.misses)
+        return {
+            "entries": len(self._entries),
+            "invalidations": self.invalidations,
+            "hit_rate": {
+                kind: self.hits[kind] / (self.hits[kind] + self.misses[kind])
+                for kind in kinds if self.hits[kind] + self.misses[kind]
+            },
+            "hits": dict(self.hits),
+            "misses": dict(self.misses)
+        }
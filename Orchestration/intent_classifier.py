@@ -0,0 +1,420 @@
+"""
+Fast-Path Intent Classifier - Local capability classification in front of the LLM parse
+
+Clear requests like "generate leads for fintech" don't need an LLM round trip.
+This classifier combines:
+1. Compiled keyword rules per CapabilityCategory (mirroring the parser's routing rules)
+2. A small multinomial logistic regression over word n-grams, trained from logged parses
+
+and returns a full SemanticUnderstanding when both agree with enough confidence.
+Anything ambiguous falls through to SemanticRequestParser's LLM call.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import random
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from .semantic_request_parser import (
+    CapabilityAgentRegistry,
+    CapabilityCategory,
+    ExecutionStrategy,
+    SemanticUnderstanding,
+    get_default_registry,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Keyword rules mirror the CRITICAL ROUTING RULES in the semantic analysis prompt
+KEYWORD_RULES: Dict[CapabilityCategory, List[str]] = {
+    CapabilityCategory.ICP_GENERATION: [
+        r"\bicps?\b", r"ideal customer", r"customer profiles?", r"analy[sz]e my customers",
+    ],
+    CapabilityCategory.LEAD_GENERATION: [
+        r"\b(generate|find|mine|get|need|source)\b.*\b(leads?|prospects?)\b", r"\blead (generation|mining)\b",
+        r"\bprospect search\b", r"\bfind (new )?customers\b",
+    ],
+    CapabilityCategory.LINKEDIN_AUTOMATION: [
+        r"\blinkedin\b", r"\bviral posts?\b",
+    ],
+    CapabilityCategory.CONTENT_MARKETING: [
+        r"\bmarketing (campaigns?|strategy|automation)\b", r"\bcontent (marketing|strategy|calendar|distribution)\b",
+        r"\bseo\b",
+    ],
+    CapabilityCategory.EMAIL_ORCHESTRATION: [
+        r"\bemail (sequences?|campaigns?|warming)\b", r"\bgmail\b", r"\bfollow[- ]ups?\b",
+    ],
+    CapabilityCategory.CRM_OPERATIONS: [
+        r"\bcrm\b", r"\b(hubspot|salesforce|pipedrive) sync\b", r"\bsync (my )?(hubspot|salesforce|pipedrive)\b",
+    ],
+    CapabilityCategory.LOGO_GENERATION: [
+        r"\blogos?\b",
+    ],
+    CapabilityCategory.BRAND_CREATION: [
+        r"\bbrand(ing| identity| strategy| messaging)?\b",
+    ],
+    CapabilityCategory.WEBSITE_BUILDING: [
+        r"\bwebsites?\b", r"\blanding pages?\b",
+    ],
+    CapabilityCategory.MARKET_ANALYSIS: [
+        r"\bmarket (research|analysis|sizing)\b", r"\bcompetitor analysis\b", r"\bresearch the market\b",
+    ],
+    CapabilityCategory.SOCIAL_MONITORING: [
+        r"\bsocial (listening|monitoring)\b", r"\bbrand mentions?\b", r"\bsentiment\b",
+    ],
+    CapabilityCategory.CONTENT_CREATION: [
+        r"\bblog posts?\b", r"\bwrite (some )?copy\b", r"\bsocial media posts?\b",
+    ],
+}
+
+_COMPILED_RULES: List[Tuple[CapabilityCategory, "re.Pattern"]] = [
+    (capability, re.compile("|".join(patterns), re.IGNORECASE))
+    for capability, patterns in KEYWORD_RULES.items()
+]
+
+# Lead generation prompts often mention brands ("leads for my brand"), so a
+# lead/ICP match suppresses branding - matching the prompt's priority rules
+_SUPPRESSED_BY = {
+    CapabilityCategory.BRAND_CREATION: {CapabilityCategory.LEAD_GENERATION, CapabilityCategory.ICP_GENERATION,
+                                        CapabilityCategory.SOCIAL_MONITORING, CapabilityCategory.LOGO_GENERATION},
+    CapabilityCategory.CRM_OPERATIONS: {CapabilityCategory.ICP_GENERATION},
+}
+
+# Questions and status requests mention capabilities without asking for work
+# ("what colors did you use for the brand?", "why is my CRM sync failing?")
+_QUESTION_OR_STATUS_PATTERN = re.compile(
+    r"\?\s*$|^\s*(what|why|how|when|where|who|which|whose|is|are|was|were|do|does|did|can|could|should|"
+    r"would|will|has|have|tell me|show|explain|describe|status)\b",
+    re.IGNORECASE
+)
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_TARGET_PATTERN = re.compile(r"\b(?:for|in|targeting)\s+(?:the\s+|my\s+|a\s+)?([a-z0-9][a-z0-9 &-]{1,40}?)(?:\s+(?:companies|industry|startups?|businesses)|[.,!?]|$)", re.IGNORECASE)
+
+
+def _featurize(text: str) -> Counter:
+    """Unigram + bigram bag-of-words features."""
+    tokens = _TOKEN_PATTERN.findall(text.lower())
+    features = Counter(tokens)
+    features.update(f"{a}_{b}" for a, b in zip(tokens, tokens[1:]))
+    return features
+
+
+def match_keyword_rules(text: str) -> List[CapabilityCategory]:
+    """Return the capabilities whose compiled keyword rules match the text."""
+    matched = [capability for capability, pattern in _COMPILED_RULES if pattern.search(text)]
+    return [
+        capability for capability in matched
+        if not _SUPPRESSED_BY.get(capability, set()) & set(matched)
+    ]
+
+
+class LinearIntentModel:
+    """Multinomial logistic regression over sparse n-gram features, trained with SGD."""
+
+    def __init__(self, l2: float = 1e-4):
+        self.l2 = l2
+        self.weights: Dict[CapabilityCategory, Dict[str, float]] = defaultdict(dict)
+        self.bias: Dict[CapabilityCategory, float] = {}
+        self.labels: List[CapabilityCategory] = []
+
+    @property
+    def is_trained(self) -> bool:
+        return len(self.labels) > 1
+
+    def _scores(self, features: Counter) -> Dict[CapabilityCategory, float]:
+        return {
+            label: self.bias.get(label, 0.0) + sum(
+                self.weights[label].get(feature, 0.0) * value for feature, value in features.items()
+            )
+            for label in self.labels
+        }
+
+    def predict_proba(self, text: str) -> Dict[CapabilityCategory, float]:
+        """Softmax probabilities over the trained labels."""
+        if not self.is_trained:
+            return {}
+        scores = self._scores(_featurize(text))
+        top = max(scores.values())
+        exp_scores = {label: math.exp(score - top) for label, score in scores.items()}
+        total = sum(exp_scores.values())
+        return {label: value / total for label, value in exp_scores.items()}
+
+    def fit(self, examples: List[Tuple[str, CapabilityCategory]], epochs: int = 20,
+            learning_rate: float = 0.5, seed: int = 42):
+        """Train on (text, capability) examples."""
+        self.labels = sorted({label for _, label in examples}, key=lambda label: label.value)
+        self.weights = defaultdict(dict)
+        self.bias = {label: 0.0 for label in self.labels}
+        if not self.is_trained:
+            return
+
+        featurized = [(_featurize(text), label) for text, label in examples]
+        rng = random.Random(seed)
+
+        for epoch in range(epochs):
+            rng.shuffle(featurized)
+            rate = learning_rate / (1 + epoch * 0.1)
+            for features, label in featurized:
+                scores = self._scores(features)
+                top = max(scores.values())
+                exp_scores = {candidate: math.exp(score - top) for candidate, score in scores.items()}
+                total = sum(exp_scores.values())
+
+                for candidate in self.labels:
+                    gradient = exp_scores[candidate] / total - (1.0 if candidate == label else 0.0)
+                    if abs(gradient) < 1e-6:
+                        continue
+                    candidate_weights = self.weights[candidate]
+                    for feature, value in features.items():
+                        weight = candidate_weights.get(feature, 0.0)
+                        candidate_weights[feature] = weight - rate * (gradient * value + self.l2 * weight)
+                    self.bias[candidate] -= rate * gradient
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "l2": self.l2,
+            "labels": [label.value for label in self.labels],
+            "bias": {label.value: value for label, value in self.bias.items()},
+            "weights": {label.value: weights for label, weights in self.weights.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LinearIntentModel":
+        model = cls(l2=data.get("l2", 1e-4))
+        model.labels = [CapabilityCategory(label) for label in data.get("labels", [])]
+        model.bias = {CapabilityCategory(label): value for label, value in data.get("bias", {}).items()}
+        for label, weights in data.get("weights", {}).items():
+            model.weights[CapabilityCategory(label)] = dict(weights)
+        return model
+
+
+@dataclass
+class FastPathPrediction:
+    """Outcome of a fast-path classification attempt."""
+    capability: Optional[CapabilityCategory]
+    confidence: float
+    rule_matches: List[CapabilityCategory]
+    model_probability: float
+    accepted: bool
+    reason: str
+
+
+class FastPathIntentClassifier:
+    """
+    Local classifier that answers clear single-capability requests without an LLM call.
+
+    A request is accepted only when it is not a question or status request,
+    exactly one keyword rule matches, and the trained linear model agrees with
+    at least `confidence_threshold`. Until the model is trained (from a parse
+    log, or automatically every `retrain_every` observed LLM parses) nothing
+    is accepted.
+    """
+
+    def __init__(
+        self,
+        registry: Optional[CapabilityAgentRegistry] = None,
+        model: Optional[LinearIntentModel] = None,
+        confidence_threshold: float = 0.85,
+        min_observed_confidence: float = 0.8,
+        retrain_every: int = 50
+    ):
+        self.registry = registry or get_default_registry()
+        self.model = model or LinearIntentModel()
+        self.confidence_threshold = confidence_threshold
+        self.min_observed_confidence = min_observed_confidence
+        self.retrain_every = retrain_every
+
+        # Examples from the last explicit train() call (e.g. a parse log), kept for every retrain
+        self.base_examples: List[Tuple[str, CapabilityCategory]] = []
+        self._fit_kwargs: Dict[str, Any] = {}
+
+        # Training examples accumulated from logged LLM parses
+        self.observed_examples: List[Tuple[str, CapabilityCategory]] = []
+        self._retrain_task: Optional[asyncio.Task] = None
+
+        self.attempts = 0
+        self.hits = 0
+
+    def predict(self, user_request: str) -> FastPathPrediction:
+        """Classify a request and decide whether it is safe to skip the LLM."""
+        rule_matches = match_keyword_rules(user_request)
+        probabilities = self.model.predict_proba(user_request)
+
+        if _QUESTION_OR_STATUS_PATTERN.search(user_request):
+            best_model = max(probabilities, key=probabilities.get) if probabilities else None
+            best_probability = probabilities.get(best_model, 0.0)
+            return FastPathPrediction(best_model, best_probability, rule_matches, best_probability, False,
+                                      "question or status request")
+
+        if len(rule_matches) != 1:
+            reason = "no keyword rule matched" if not rule_matches else "multiple capabilities requested"
+            best_model = max(probabilities, key=probabilities.get) if probabilities else None
+            best_probability = probabilities.get(best_model, 0.0)
+            return FastPathPrediction(best_model, best_probability, rule_matches, best_probability, False, reason)
+
+        capability = rule_matches[0]
+        if not self.model.is_trained:
+            # A single keyword hit is not enough evidence on its own
+            return FastPathPrediction(capability, 0.5, rule_matches, 0.0, False, "model not trained yet")
+
+        model_probability = probabilities.get(capability, 0.0)
+        confidence = 0.5 + 0.5 * model_probability
+        accepted = confidence >= self.confidence_threshold
+        reason = "rule and model agree" if accepted else "model disagrees with keyword rule"
+        return FastPathPrediction(capability, confidence, rule_matches, model_probability, accepted, reason)
+
+    def classify(self, user_request: str) -> Optional[SemanticUnderstanding]:
+        """Return a full SemanticUnderstanding, or None to fall through to the LLM."""
+        self.attempts += 1
+        prediction = self.predict(user_request)
+        if not prediction.accepted:
+            logger.debug(f"Fast path declined ({prediction.reason}): {user_request[:60]}")
+            return None
+
+        self.hits += 1
+        return self._build_understanding(user_request, prediction)
+
+    def _build_understanding(self, user_request: str, prediction: FastPathPrediction) -> SemanticUnderstanding:
+        """Build a SemanticUnderstanding equivalent to a single-agent LLM parse."""
+        capability = prediction.capability
+        best_agent = self.registry.get_best_agent_for_capability(capability)
+        agent_id = best_agent.agent_id if best_agent else "general_agent"
+
+        business_context: Dict[str, Any] = {}
+        target = _TARGET_PATTERN.search(user_request)
+        if target:
+            business_context["target_market"] = target.group(1).strip()
+
+        return SemanticUnderstanding(
+            business_goal=user_request.strip(),
+            user_intent_summary=user_request.strip()[:100],
+            primary_capabilities=[capability],
+            secondary_capabilities=[],
+            recommended_agents=[agent_id],
+            execution_strategy=ExecutionStrategy.SINGLE_AGENT,
+            execution_plan={
+                "description": f"Fast path: route directly to {agent_id}",
+                "fast_path": True
+            },
+            extracted_parameters=dict(business_context),
+            business_context=business_context,
+            user_preferences={},
+            confidence_score=round(prediction.confidence, 3),
+            reasoning=f"Local fast path: {prediction.reason} on {capability.value}"
+        )
+
+    def observe(self, user_request: str, understanding: SemanticUnderstanding):
+        """Log a confident single-capability LLM parse as a training example, retraining periodically."""
+        if understanding.confidence_score < self.min_observed_confidence:
+            return
+        if len(understanding.primary_capabilities) != 1 or understanding.execution_plan.get("fast_path"):
+            return
+        self.observed_examples.append((user_request, understanding.primary_capabilities[0]))
+        if self.retrain_every and len(self.observed_examples) % self.retrain_every == 0:
+            self._schedule_retrain()
+
+    def _schedule_retrain(self):
+        """Retrain off the event loop when one is running, swapping the model in when done."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self.train()
+            return
+        if self._retrain_task and not self._retrain_task.done():
+            # The next retrain_every observations will pick these examples up
+            return
+        self._retrain_task = asyncio.ensure_future(self._retrain_in_background())
+
+    async def _retrain_in_background(self):
+        training_set = self.base_examples + self.observed_examples
+        model = LinearIntentModel(l2=self.model.l2)
+        try:
+            await asyncio.to_thread(model.fit, training_set, **self._fit_kwargs)
+        except Exception as e:
+            logger.warning(f"Fast-path background retrain failed: {e}")
+            return
+        self.model = model
+        logger.info(f"Fast-path model retrained on {len(training_set)} examples ({len(model.labels)} capabilities)")
+
+    def train(self, examples: Optional[Iterable[Tuple[str, CapabilityCategory]]] = None, **fit_kwargs):
+        """
+        Train the linear model on the given examples plus everything observed.
+
+        Given examples and fit settings become the base for later automatic
+        retrains, so observed parses add to a log-trained model instead of
+        replacing it.
+        """
+        if examples is not None:
+            self.base_examples = list(examples)
+        if fit_kwargs:
+            self._fit_kwargs = dict(fit_kwargs)
+        training_set = self.base_examples + self.observed_examples
+        model = LinearIntentModel(l2=self.model.l2)
+        model.fit(training_set, **self._fit_kwargs)
+        self.model = model
+        logger.info(f"Fast-path model trained on {len(training_set)} examples ({len(self.model.labels)} capabilities)")
+
+    def train_from_parse_log(self, log_path: str, **fit_kwargs):
+        """
+        Train from a JSON-lines parse log.
+
+        Each line needs "request" and "primary_capabilities"; lines with more
+        than one capability or below min_observed_confidence are skipped.
+        """
+        examples = []
+        with open(log_path, "r", encoding="utf-8") as log_file:
+            for line in log_file:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    capabilities = record.get("primary_capabilities", [])
+                    if len(capabilities) != 1:
+                        continue
+                    if record.get("confidence_score", 1.0) < self.min_observed_confidence:
+                        continue
+                    examples.append((record["request"], CapabilityCategory(capabilities[0])))
+                except (json.JSONDecodeError, KeyError, ValueError) as e:
+                    logger.debug(f"Skipping parse log line: {e}")
+        self.train(examples, **fit_kwargs)
+
+    def evaluate(self, labeled: Iterable[Tuple[str, CapabilityCategory]]) -> Dict[str, Any]:
+        """
+        Report fast-path hit rate and accuracy against a labeled set.
+
+        Accuracy only counts requests the fast path accepted, since everything
+        else is answered by the LLM.
+        """
+        total = 0
+        hits = 0
+        correct = 0
+        for text, expected in labeled:
+            total += 1
+            prediction = self.predict(text)
+            if prediction.accepted:
+                hits += 1
+                correct += prediction.capability == expected
+        return {
+            "total": total,
+            "fast_path_hits": hits,
+            "hit_rate": hits / total if total else 0.0,
+            "fast_path_accuracy": correct / hits if hits else 0.0,
+            "confidence_threshold": self.confidence_threshold,
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Live hit-rate statistics for this process."""
+        return {
+            "attempts": self.attempts,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.attempts if self.attempts else 0.0,
+            "base_examples": len(self.base_examples),
+            "observed_examples": len(self.observed_examples),
+            "model_trained": self.model.is_trained,
+        }
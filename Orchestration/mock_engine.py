@@ -2,21 +2,27 @@
 Mock AI Engine - For testing and development without API calls
 """
 import asyncio
+import hashlib
+import math
 import random
 import uuid
+from collections import Counter
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import logging
 
 from .base_engine import BaseAIEngine, AIResponse, AIEngineConfig
+from .mock_prompt_families import detect_prompt_family, generate_family_response
 
 logger = logging.getLogger(__name__)
 
 class MockAIEngine(BaseAIEngine):
     """
     Mock AI engine for testing and development that:
-    - Simulates realistic response times
+    - Simulates realistic response times (uniform or lognormal with tails)
     - Generates deterministic or random responses
+    - Returns schema-valid JSON for every production prompt family
+    - Replays scripted failure sequences for error-path testing
     - Tracks usage without making real API calls
     - Supports all base engine features (caching, rate limiting, etc.)
     - Useful for testing and development
@@ -41,6 +47,24 @@ class MockAIEngine(BaseAIEngine):
         self.deterministic = kwargs.get('deterministic', False)
         self.failure_rate = kwargs.get('failure_rate', 0.0)  # 0.0 = never fail, 1.0 = always fail
         
+        # Latency distribution: "uniform" uses the min/max range, "lognormal" a median
+        # with multiplicative spread plus an occasional slow tail
+        self.latency_distribution = kwargs.get('latency_distribution', 'uniform')
+        self.latency_median = kwargs.get('latency_median', 1.0)
+        self.latency_sigma = kwargs.get('latency_sigma', 0.5)
+        self.tail_probability = kwargs.get('tail_probability', 0.0)
+        self.tail_multiplier = kwargs.get('tail_multiplier', 5.0)
+        
+        # Return schema-valid JSON for recognised production prompts
+        self.schema_aware = kwargs.get('schema_aware', True)
+        
+        # Scripted failures, consumed one per call: None/"ok" succeeds, otherwise one of FAILURE_MODES
+        self.failure_script: List[Optional[str]] = list(kwargs.get('failure_script', []))
+        self.repeat_failure_script = kwargs.get('repeat_failure_script', False)
+        self._failure_script_position = 0
+        
+        self.family_counts: Counter = Counter()
+        
         # Pre-defined response templates
         self.response_templates = kwargs.get('response_templates', self._get_default_templates())
         
@@ -48,6 +72,14 @@ class MockAIEngine(BaseAIEngine):
         if self.deterministic:
             random.seed(42)
     
+    FAILURE_MODES = {
+        'timeout': (ConnectionError, "Simulated network timeout"),
+        'rate_limit': (ValueError, "Rate limit exceeded: simulated"),
+        'server_error': (ConnectionError, "Server error: simulated service unavailable"),
+        'auth_error': (ValueError, "Authentication failed: simulated"),
+        'malformed_json': (None, None),  # Succeeds with truncated JSON content
+    }
+    
     def get_engine_type(self) -> str:
         """Return the engine type identifier"""
         return "mock"
@@ -67,6 +99,11 @@ class MockAIEngine(BaseAIEngine):
             "I'm happy to assist with this request. Here's a comprehensive overview of the key points: {overview_response}"
         ]
     
+    @staticmethod
+    def _stable_hash(value: str) -> int:
+        """Hash that is identical across processes (builtin hash() is salted per process)"""
+        return int(hashlib.md5(value.encode()).hexdigest()[:8], 16)
+    
     def _analyze_prompt(self, prompt: str) -> Dict[str, Any]:
         """Analyze the prompt to generate contextually appropriate responses"""
         prompt_lower = prompt.lower()
@@ -103,7 +140,7 @@ class MockAIEngine(BaseAIEngine):
         """Generate appropriate response content based on prompt analysis"""
         if self.deterministic:
             # Deterministic response based on prompt hash
-            prompt_hash = hash(prompt) % len(self.response_templates)
+            prompt_hash = self._stable_hash(prompt) % len(self.response_templates)
             template = self.response_templates[prompt_hash]
         else:
             # Random template selection
@@ -187,7 +224,7 @@ class MockAIEngine(BaseAIEngine):
         
         if self.deterministic and key_terms:
             # Use first key term to select content deterministically
-            index = hash(key_terms[0]) % len(domain_content)
+            index = self._stable_hash(key_terms[0]) % len(domain_content)
             return domain_content[index]
         else:
             return random.choice(domain_content)
@@ -220,18 +257,66 @@ class MockAIEngine(BaseAIEngine):
             'total_tokens': input_tokens + output_tokens
         }
     
+    def _get_rng(self, prompt: str):
+        """Random source for a call - seeded by the prompt when deterministic"""
+        if self.deterministic:
+            return random.Random(self._stable_hash(prompt))
+        return random
+    
+    def _sample_delay(self, rng: random.Random) -> float:
+        """Sample a simulated network delay from the configured distribution"""
+        if self.latency_distribution == 'lognormal':
+            delay = rng.lognormvariate(math.log(self.latency_median), self.latency_sigma)
+            if rng.random() < self.tail_probability:
+                delay *= self.tail_multiplier
+            return delay
+        
+        if self.deterministic:
+            return (self.response_delay_min + self.response_delay_max) / 2
+        return rng.uniform(self.response_delay_min, self.response_delay_max)
+    
+    def _next_scripted_failure(self) -> Optional[str]:
+        """Consume the next entry of the failure script, if any"""
+        if not self.failure_script:
+            return None
+        if self._failure_script_position >= len(self.failure_script):
+            if not self.repeat_failure_script:
+                return None
+            self._failure_script_position = 0
+        
+        mode = self.failure_script[self._failure_script_position]
+        self._failure_script_position += 1
+        return None if mode in (None, 'ok') else mode
+    
+    STREAM_FIRST_TOKEN_FRACTION = 0.2  # share of the simulated delay spent before the first delta
+    STREAM_CHUNK_CHARS = 24
+    
     async def _make_api_call(self, prompt: str, **kwargs) -> AIResponse:
         """Simulate an API call with realistic behavior"""
+        return await self._simulate_api_call(prompt, None, **kwargs)
+    
+    async def _make_streaming_api_call(self, prompt: str, on_delta, **kwargs) -> AIResponse:
+        """Simulate a streaming API call: first delta after a fraction of the delay, the rest spread over the remainder"""
+        return await self._simulate_api_call(prompt, on_delta, **kwargs)
+    
+    async def _simulate_api_call(self, prompt: str, on_delta, **kwargs) -> AIResponse:
+        rng = self._get_rng(prompt)
+        
         # Simulate network delay
-        if self.deterministic:
-            delay = (self.response_delay_min + self.response_delay_max) / 2
-        else:
-            delay = random.uniform(self.response_delay_min, self.response_delay_max)
+        delay = self._sample_delay(rng)
+        await asyncio.sleep(delay if on_delta is None else delay * self.STREAM_FIRST_TOKEN_FRACTION)
         
-        await asyncio.sleep(delay)
+        # Scripted failures take precedence over the random failure rate
+        failure_mode = self._next_scripted_failure()
+        if failure_mode:
+            if failure_mode not in self.FAILURE_MODES:
+                raise ValueError(f"Unknown scripted failure mode '{failure_mode}'")
+            error_class, error_message = self.FAILURE_MODES[failure_mode]
+            if error_class:
+                raise error_class(error_message)
         
         # Simulate occasional failures
-        if not self.deterministic and random.random() < self.failure_rate:
+        elif not self.deterministic and random.random() < self.failure_rate:
             error_types = [
                 "Simulated network timeout",
                 "Simulated rate limit exceeded", 
@@ -242,7 +327,24 @@ class MockAIEngine(BaseAIEngine):
         
         # Analyze prompt and generate response
         analysis = self._analyze_prompt(prompt)
-        response_content = self._generate_response_content(prompt, analysis, **kwargs)
+        family = detect_prompt_family(prompt) if self.schema_aware else None
+        if family:
+            response_content = generate_family_response(family, prompt, rng)
+            self.family_counts[family.name] += 1
+        else:
+            response_content = self._generate_response_content(prompt, analysis, **kwargs)
+        
+        if failure_mode == 'malformed_json':
+            response_content = response_content[:max(1, len(response_content) // 2)]
+        
+        if on_delta is not None:
+            chunks = [response_content[i:i + self.STREAM_CHUNK_CHARS]
+                      for i in range(0, len(response_content), self.STREAM_CHUNK_CHARS)]
+            chunk_delay = delay * (1 - self.STREAM_FIRST_TOKEN_FRACTION) / max(1, len(chunks))
+            for index, chunk in enumerate(chunks):
+                if index:
+                    await asyncio.sleep(chunk_delay)
+                await self._emit_delta(on_delta, chunk)
         
         # Simulate token usage
         usage = self._simulate_token_usage(prompt, response_content)
@@ -250,7 +352,9 @@ class MockAIEngine(BaseAIEngine):
         # Create metadata
         metadata = {
             'prompt_analysis': analysis,
+            'prompt_family': family.name if family else None,
             'simulated_delay': delay,
+            'scripted_failure': failure_mode,
             'deterministic': self.deterministic,
             'template_used': 'deterministic' if self.deterministic else 'random'
         }
@@ -276,6 +380,26 @@ class MockAIEngine(BaseAIEngine):
         """Set the rate of simulated failures (0.0 to 1.0)"""
         self.failure_rate = max(0.0, min(1.0, failure_rate))
     
+    def set_latency_distribution(self, distribution: str, median: float = 1.0, sigma: float = 0.5,
+                                 tail_probability: float = 0.0, tail_multiplier: float = 5.0):
+        """Set the simulated latency distribution ("uniform" or "lognormal")"""
+        if distribution not in ('uniform', 'lognormal'):
+            raise ValueError(f"Unknown latency distribution '{distribution}'")
+        self.latency_distribution = distribution
+        self.latency_median = median
+        self.latency_sigma = sigma
+        self.tail_probability = max(0.0, min(1.0, tail_probability))
+        self.tail_multiplier = tail_multiplier
+    
+    def set_failure_script(self, script: List[Optional[str]], repeat: bool = False):
+        """Script the outcome of upcoming calls, e.g. [None, 'timeout', 'malformed_json']"""
+        unknown = [mode for mode in script if mode not in (None, 'ok') and mode not in self.FAILURE_MODES]
+        if unknown:
+            raise ValueError(f"Unknown scripted failure modes: {unknown}")
+        self.failure_script = list(script)
+        self.repeat_failure_script = repeat
+        self._failure_script_position = 0
+    
     def add_response_template(self, template: str):
         """Add a custom response template"""
         self.response_templates.append(template)
@@ -292,6 +416,10 @@ class MockAIEngine(BaseAIEngine):
             'deterministic': self.deterministic,
             'failure_rate': self.failure_rate,
             'response_delay_range': (self.response_delay_min, self.response_delay_max),
+            'latency_distribution': self.latency_distribution,
+            'schema_aware': self.schema_aware,
+            'prompt_family_counts': dict(self.family_counts),
+            'failure_script_remaining': max(0, len(self.failure_script) - self._failure_script_position),
             'template_count': len(self.response_templates),
             'budget_info': self.get_budget_info().dict(),
             'rate_limit_info': self.get_rate_limit_info().dict()
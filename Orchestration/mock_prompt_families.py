@@ -0,0 +1,413 @@
+"""
+Mock Prompt Families - Schema-valid JSON responses for every production prompt family
+
+The mock engine uses these to recognise which production prompt it received
+(semantic parser, response analyzer, ICP and company-intelligence analyzers)
+and to answer with JSON that the real caller can parse, so load tests
+exercise the happy path instead of each caller's fallback.
+"""
+import json
+import random
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# (keywords, capability, agent) - first match wins, checked in order
+_CAPABILITY_RULES: List[Tuple[Tuple[str, ...], str, str]] = [
+    (("icp", "ideal customer", "customer profile", "analyze my customers"), "icp_generation", "icp_generator_agent"),
+    (("lead", "prospect", "find customers"), "lead_generation", "lead_mining_agent"),
+    (("linkedin", "viral post"), "linkedin_automation", "linkedin_scraping_agent"),
+    (("marketing", "content calendar", "seo", "content strategy"), "content_marketing", "content_marketing_agent"),
+    (("email", "sequence", "gmail"), "email_orchestration", "advanced_email_orchestration_agent"),
+    (("crm", "hubspot", "salesforce", "pipedrive"), "crm_operations", "crm_operations_agent"),
+    (("logo",), "logo_generation", "logo_generation_agent"),
+    (("brand",), "brand_creation", "branding_agent"),
+    (("website", "landing page", "web site"), "website_building", "website_generator_agent"),
+    (("market research", "competitor", "market for", "trend"), "market_analysis", "market_research_agent"),
+    (("mention", "sentiment", "social listening"), "social_monitoring", "social_listening_agent"),
+    (("data", "report", "metrics"), "data_analysis", "data_analysis_agent"),
+    (("blog", "copy", "post", "write"), "content_creation", "content_creator_agent"),
+]
+
+_INDUSTRIES = ["Fintech", "Healthcare", "SaaS", "E-commerce", "Manufacturing", "Education", "Logistics", "Hospitality"]
+_TITLES = ["VP Sales", "Head of Growth", "CMO", "CTO", "Director of Operations", "RevOps Manager", "Founder"]
+_LOCATIONS = ["United States", "Canada", "United Kingdom", "Germany", "Australia"]
+_TECHNOLOGIES = ["HubSpot", "Salesforce", "Slack", "Zoom", "Asana", "Google Workspace", "Stripe", "Segment"]
+_PAIN_POINTS = [
+    "Manual lead qualification", "Fragmented customer data", "Slow sales cycles",
+    "Low email engagement", "Poor pipeline visibility", "Rising acquisition costs"
+]
+_SIGNALS = [
+    "Hiring sales roles", "Recent funding round", "New product launch",
+    "CRM migration", "Expansion into new markets", "Leadership change"
+]
+
+_ACTION_KEYWORDS = ("create", "build", "make", "design", "generate", "find", "get", "mine",
+                    "monitor", "set up", "analyze", "research", "develop", "write")
+_QUESTION_KEYWORDS = ("what", "how", "why", "which", "when", "where", "tell me")
+_REFERENCE_KEYWORDS = ("you used", "you made", "you created", "you built", "did you", "the website", "the logo")
+
+
+def _extract_quoted(prompt: str, label: str) -> str:
+    """Pull the quoted user text that follows a label such as USER REQUEST."""
+    match = re.search(rf'{label}:\s*"(.*?)"', prompt, re.DOTALL)
+    return match.group(1) if match else ""
+
+
+def _sample(rng: random.Random, population: List[str], low: int = 1, high: int = 3) -> List[str]:
+    return rng.sample(population, rng.randint(low, min(high, len(population))))
+
+
+def _match_capabilities(text: str) -> List[Tuple[str, str]]:
+    """Map free text to (capability, agent) pairs using the keyword rules."""
+    text_lower = text.lower()
+    matches = []
+    for keywords, capability, agent in _CAPABILITY_RULES:
+        if any(keyword in text_lower for keyword in keywords):
+            matches.append((capability, agent))
+    return matches
+
+
+def semantic_understanding_response(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    """Response for SemanticRequestParser._build_semantic_analysis_prompt"""
+    request = _extract_quoted(prompt, "USER REQUEST")
+    matches = _match_capabilities(request)
+    off_key = not matches
+    if off_key:
+        matches = [("content_creation", "content_creator_agent")]
+
+    primary = matches[:2] if " and " in request.lower() else matches[:1]
+    if len(primary) > 1:
+        strategy = rng.choice(["parallel_multi", "sequential_multi"])
+    else:
+        strategy = "single_agent"
+
+    industry = rng.choice(_INDUSTRIES)
+    execution_plan: Dict[str, Any] = {
+        "description": f"Route to {', '.join(agent for _, agent in primary)}",
+        "sequence": " -> ".join(agent for _, agent in primary),
+        "parallel_groups": [[agent for _, agent in primary]] if strategy == "parallel_multi" else []
+    }
+    if off_key:
+        execution_plan["off_key_request"] = True
+
+    return {
+        "business_goal": f"Deliver {primary[0][0].replace('_', ' ')} for the user's {industry.lower()} business",
+        "user_intent_summary": request[:100] or "Unspecified request",
+        "business_domain": industry,
+        "urgency_level": rng.choice(["low", "medium", "medium", "high"]),
+        "primary_capabilities": [capability for capability, _ in primary],
+        "secondary_capabilities": [capability for capability, _ in matches[len(primary):len(primary) + 1]],
+        "recommended_agents": [agent for _, agent in primary],
+        "execution_strategy": strategy,
+        "execution_plan": execution_plan,
+        "extracted_parameters": {"industry": industry, "target_count": rng.choice([10, 25, 50, 100])},
+        "business_context": {
+            "industry": industry,
+            "company_size": rng.choice(["startup", "smb", "mid_market", "enterprise"]),
+            "target_market": rng.choice(["SMB", "Mid-market", "Enterprise"]),
+            "business_model": rng.choice(["B2B SaaS", "B2C", "Marketplace", "Services"]),
+            "relevant_context": "Generated by mock engine"
+        },
+        "user_preferences": {},
+        "confidence_score": round(rng.uniform(0.3, 0.45) if off_key else rng.uniform(0.75, 0.98), 2),
+        "reasoning": f"Keywords in the request map to {', '.join(capability for capability, _ in primary)}",
+        "potential_challenges": _sample(rng, ["Limited context", "Ambiguous scope", "Data availability"], 0, 2)
+    }
+
+
+def batch_semantic_understanding_response(prompt: str, rng: random.Random) -> List[Dict[str, Any]]:
+    """Response for SemanticPromptTemplate.render_batch (SemanticRequestParser.parse_requests)"""
+    items = []
+    for index, request in re.findall(r'\[(\d+)\] USER REQUEST:\s*"(.*?)"', prompt, re.DOTALL):
+        item = semantic_understanding_response(f'USER REQUEST: "{request}"', rng)
+        item["request_index"] = int(index)
+        items.append(item)
+    return items
+
+
+def semantic_fallback_response(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    """Response for SemanticRequestParser._create_intelligent_fallback"""
+    request = _extract_quoted(prompt, "The user made this request")
+    alternatives = [capability for capability, _ in _match_capabilities(request)] or ["content_creation", "market_analysis"]
+    return {
+        "business_goal": f"Help with: {request[:60]}",
+        "user_intent_summary": request[:100],
+        "primary_capabilities": [],
+        "secondary_capabilities": [],
+        "recommended_agents": [],
+        "execution_strategy": "single_agent",
+        "execution_plan": {
+            "off_key_request": True,
+            "suggestion": f"Try asking for {alternatives[0].replace('_', ' ')}",
+            "available_alternatives": alternatives
+        },
+        "extracted_parameters": {},
+        "business_context": {},
+        "user_preferences": {},
+        "confidence_score": round(rng.uniform(0.2, 0.35), 2),
+        "reasoning": "This request doesn't map to available capabilities"
+    }
+
+
+def response_decision_response(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    """Response for ContextAwareResponseAnalyzer._build_response_analysis_prompt"""
+    message = _extract_quoted(prompt, "USER MESSAGE").lower()
+    matches = _match_capabilities(message)
+
+    if any(keyword in message for keyword in _REFERENCE_KEYWORDS):
+        response_type, sources, strategy = "direct_answer", ["conversation_history", "recent_workflows"], "answer_from_context"
+    elif matches and any(keyword in message for keyword in _ACTION_KEYWORDS):
+        response_type, sources, strategy = "agent_execution", [], "execute_agents"
+    elif any(message.startswith(keyword) for keyword in _QUESTION_KEYWORDS):
+        response_type, sources, strategy = "direct_answer", ["general_knowledge"], "answer_from_knowledge"
+    elif matches:
+        response_type, sources, strategy = "hybrid", ["general_knowledge"], "answer_and_offer_agents"
+    else:
+        response_type, sources, strategy = "clarification", [], "ask_for_details"
+
+    return {
+        "response_type": response_type,
+        "confidence": round(rng.uniform(0.7, 0.97), 2),
+        "reasoning": f"Mock decision: {response_type.replace('_', ' ')}",
+        "context_sources": sources,
+        "suggested_agents": [agent for _, agent in matches[:1]] if response_type in ("agent_execution", "hybrid") else [],
+        "answer_strategy": strategy,
+        "requires_context_extraction": response_type == "direct_answer" and "conversation_history" in sources,
+        "context_query": message[:80] if response_type == "direct_answer" else None
+    }
+
+
+def fused_analysis_response(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    """Response for ContextAwareResponseAnalyzer._build_fused_analysis_prompt"""
+    decision = response_decision_response(prompt, rng)
+    understanding = None
+    if decision["response_type"] in ("agent_execution", "hybrid"):
+        understanding = semantic_understanding_response(prompt, rng)
+    return {"response_decision": decision, "semantic_understanding": understanding}
+
+
+def customer_patterns_response(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    """Response for EnhancedCustomerAnalyzer/CustomerAnalyzer pattern prompts"""
+    employee_min = rng.choice([10, 50, 100, 200])
+    revenue_min = rng.choice([1, 5, 10, 20]) * 1_000_000
+    analyzed = re.search(r'"customers_analyzed":\s*(\d+)', prompt)
+    return {
+        "industry_patterns": {
+            "primary_industries": _sample(rng, _INDUSTRIES, 1, 3),
+            "sub_verticals": _sample(rng, ["Payments", "Telehealth", "DevTools", "Retail Tech", "Supply Chain"], 1, 2),
+            "industry_confidence": round(rng.uniform(0.6, 0.9), 2)
+        },
+        "size_patterns": {
+            "employee_range_min": employee_min,
+            "employee_range_max": employee_min * rng.choice([5, 10, 20]),
+            "revenue_range_min": revenue_min,
+            "revenue_range_max": revenue_min * rng.choice([5, 10]),
+            "size_confidence": round(rng.uniform(0.5, 0.85), 2)
+        },
+        "geographic_patterns": {
+            "primary_locations": _sample(rng, _LOCATIONS, 1, 3),
+            "geographic_confidence": round(rng.uniform(0.5, 0.8), 2)
+        },
+        "technology_patterns": {
+            "common_technologies": _sample(rng, _TECHNOLOGIES, 2, 4),
+            "technology_confidence": round(rng.uniform(0.4, 0.8), 2)
+        },
+        "decision_maker_patterns": {
+            "key_titles": _sample(rng, _TITLES, 2, 3),
+            "departments": _sample(rng, ["Sales", "Marketing", "Operations", "Engineering"], 1, 2),
+            "seniority_levels": _sample(rng, ["Senior", "Director", "Executive"], 1, 2),
+            "decision_maker_confidence": round(rng.uniform(0.6, 0.9), 2)
+        },
+        "business_characteristics": {
+            "business_models": _sample(rng, ["B2B", "SaaS", "B2C", "Marketplace"], 1, 2),
+            "growth_stages": _sample(rng, ["Early", "Growth", "Expansion", "Mature"], 1, 2),
+            "market_positions": _sample(rng, ["Market Leader", "Challenger", "Niche"], 1, 2)
+        },
+        "pain_points": _sample(rng, _PAIN_POINTS, 2, 3),
+        "buying_signals": _sample(rng, _SIGNALS, 2, 3),
+        "purchase_triggers": _sample(rng, _SIGNALS, 1, 2),
+        "pattern_strength": rng.choice(["Strong", "Medium"]),
+        "overall_confidence": round(rng.uniform(0.6, 0.9), 2),
+        "customers_analyzed": int(analyzed.group(1)) if analyzed else rng.randint(5, 50)
+    }
+
+
+def customer_names_response(prompt: str, rng: random.Random) -> List[str]:
+    """Response for ICPGeneratorAgent._extract_customers_from_text"""
+    request = _extract_quoted(prompt, "Extract company names from this user request")
+    # Capitalised words are a decent stand-in for company names
+    names = re.findall(r"\b[A-Z][A-Za-z0-9&]+(?:\s[A-Z][A-Za-z0-9&]+)*", request)
+    return list(dict.fromkeys(names))[:5]
+
+
+def customer_profile_response(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    """Response for ICPGeneratorAgent._create_basic_customer_profile"""
+    match = re.search(r"Company:\s*(.+)", prompt)
+    return {
+        "company_name": match.group(1).strip() if match else "Unknown Company",
+        "industry": rng.choice(_INDUSTRIES),
+        "employee_count": rng.choice([45, 120, 350, 800, 2500, 12000]),
+        "annual_revenue": rng.choice([None, 5_000_000, 40_000_000, 250_000_000]),
+        "headquarters_location": rng.choice(["San Francisco, United States", "New York, United States", "London, United Kingdom", "Toronto, Canada"]),
+        "business_model": rng.choice(["B2B", "B2C", "Marketplace"]),
+        "market_position": rng.choice(["Leader", "Challenger", "Niche"]),
+        "technologies_likely_used": _sample(rng, _TECHNOLOGIES, 2, 3),
+        "typical_decision_makers": _sample(rng, _TITLES, 1, 3)
+    }
+
+
+def icp_criteria_response(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    """Response for the website and chat ICP generation prompts"""
+    size_min = rng.choice([10, 50, 100, 250])
+    revenue_min = rng.choice([None, 1_000_000, 10_000_000])
+    return {
+        "industries": _sample(rng, _INDUSTRIES, 1, 3),
+        "job_titles": _sample(rng, _TITLES, 2, 4),
+        "company_size_min": size_min,
+        "company_size_max": size_min * rng.choice([10, 20, 50]),
+        "locations": _sample(rng, _LOCATIONS, 1, 2),
+        "technologies": _sample(rng, _TECHNOLOGIES, 1, 3),
+        "revenue_min": revenue_min,
+        "revenue_max": revenue_min * 10 if revenue_min else None
+    }
+
+
+def organization_context_response(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    """Response for AIContentAnalyzer._analyze_organization_context"""
+    url = re.search(r"Website URL:\s*(\S+)", prompt)
+    domain = url.group(1).split("//")[-1].split("/")[0] if url else "example.com"
+    return {
+        "company_name": domain.split(".")[-2].title() if domain.count(".") else domain.title(),
+        "industry": rng.choice(_INDUSTRIES),
+        "sub_industry": None,
+        "target_market": rng.choice(["SMB", "Mid-market", "Enterprise", None]),
+        "company_size": rng.choice(["startup", "smb", "mid_market", "enterprise"]),
+        "employee_count_estimate": rng.choice([None, 25, 150, 900]),
+        "sales_team_size": rng.choice([None, 3, 12, 40]),
+        "avg_deal_size": rng.choice([None, 5000, 25000]),
+        "budget_range": None,
+        "revenue_stage": rng.choice(["Early", "Growth", "Mature", None]),
+        "tech_sophistication": rng.choice(["low", "medium", "high"]),
+        "business_model": rng.choice(["B2B SaaS", "B2C", "Services", None]),
+        "sales_complexity": rng.choice(["transactional", "consultative", "enterprise"]),
+        "crm_system": rng.choice([None, "HubSpot", "Salesforce"]),
+        "confidence_note": "Mock engine estimate"
+    }
+
+
+def workflow_intelligence_response(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    """Response for AIContentAnalyzer._analyze_workflow_intelligence"""
+    return {
+        "sales_process_complexity": rng.choice(["transactional", "consultative", "enterprise"]),
+        "sales_cycle_length_estimate": rng.choice([None, 14, 30, 90]),
+        "lead_qualification_process": rng.choice(["automated", "manual", "hybrid", None]),
+        "manual_process_mentions": _sample(rng, ["Spreadsheet tracking", "Manual data entry", "Email follow-ups"], 0, 2),
+        "automation_gaps": _sample(rng, ["Lead routing", "Reporting", "Onboarding"], 0, 2),
+        "coordination_challenges": [],
+        "scheduling_complexity": rng.choice(["simple", "medium", "complex", None]),
+        "document_process_maturity": rng.choice(["basic", "medium", "advanced", None]),
+        "integration_needs": _sample(rng, _TECHNOLOGIES, 0, 2),
+        "team_coordination_mentions": [],
+        "remote_work_indicators": [],
+        "meeting_management_issues": []
+    }
+
+
+def technology_stack_response(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    """Response for AIContentAnalyzer._analyze_technology_stack"""
+    detected = re.search(r"Already Detected by Scraper \(VERIFIED\):\s*(.+)", prompt)
+    detected_tools = [] if not detected or "None detected" in detected.group(1) else \
+        [tool.strip() for tool in detected.group(1).split(",") if tool.strip()]
+    return {
+        "crm_system": None,
+        "marketing_automation": None,
+        "email_platform": None,
+        "communication_tools": detected_tools[:2],
+        "video_conferencing": [],
+        "project_management": [],
+        "scheduling_tools": [],
+        "document_tools": [],
+        "automation_tools": [],
+        "analytics_tools": detected_tools[2:4],
+        "api_sophistication": rng.choice(["low", "medium", "high"]),
+        "integration_mentions": [],
+        "webhook_usage": False,
+        "website_platform": None,
+        "cms_system": None,
+        "ecommerce_platform": None
+    }
+
+
+def process_maturity_response(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    """Response for AIContentAnalyzer._analyze_process_maturity"""
+    return {
+        "process_sophistication": rng.choice(["basic", "medium", "advanced"]),
+        "documentation_quality": rng.choice(["poor", "medium", "excellent"]),
+        "automation_level": rng.choice(["low", "medium", "high"]),
+        "sales_process_documented": rng.random() < 0.5,
+        "onboarding_process_defined": rng.random() < 0.5,
+        "support_process_structured": rng.random() < 0.5,
+        "change_management_capability": rng.choice(["low", "medium", "high"]),
+        "training_infrastructure": rng.choice(["basic", "medium", "advanced"]),
+        "process_optimization_culture": rng.random() < 0.5
+    }
+
+
+def market_intelligence_response(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    """Response for AIContentAnalyzer._analyze_market_intelligence"""
+    return {
+        "market_position": rng.choice(["Leader", "Challenger", "Niche", None]),
+        "competitive_advantages": _sample(rng, ["Ease of use", "Integrations", "Pricing", "Support"], 1, 2),
+        "key_differentiators": _sample(rng, ["AI features", "Vertical focus", "Speed to value"], 1, 2),
+        "ideal_customer_segments": _sample(rng, ["SMB", "Mid-market", "Enterprise"], 1, 2),
+        "customer_pain_points": _sample(rng, _PAIN_POINTS, 1, 3),
+        "value_propositions": _sample(rng, ["Save time", "Grow revenue", "Reduce cost"], 1, 2),
+        "growth_stage": rng.choice(["startup", "growth", "mature", None]),
+        "funding_indicators": [],
+        "expansion_signals": _sample(rng, _SIGNALS, 0, 2)
+    }
+
+
+@dataclass(frozen=True)
+class PromptFamily:
+    """A production prompt family, recognised by lowercase marker substrings."""
+    name: str
+    markers: Tuple[str, ...]
+    generator: Callable[[str, random.Random], Any]
+
+    def matches(self, prompt_lower: str) -> bool:
+        return any(marker in prompt_lower for marker in self.markers)
+
+
+# Order matters: more specific markers must come before generic ones
+PROMPT_FAMILIES: List[PromptFamily] = [
+    PromptFamily("fused_analysis", ("you will perform two analyses",), fused_analysis_response),
+    PromptFamily("batch_semantic_understanding", ("batch mode: analyze each",), batch_semantic_understanding_response),
+    PromptFamily("semantic_fallback", ("couldn't process this request normally",), semantic_fallback_response),
+    PromptFamily("semantic_understanding", ("semantic business request analyzer",), semantic_understanding_response),
+    PromptFamily("response_decision", ("context-aware response analyzer",), response_decision_response),
+    PromptFamily("customer_patterns", ('"industry_patterns"',), customer_patterns_response),
+    PromptFamily("customer_names", ("extract company names from this user request",), customer_names_response),
+    PromptFamily("customer_profile", ("create a customer profile for this company",), customer_profile_response),
+    PromptFamily("icp_criteria", ("you are an icp generator", "json keys: industries"), icp_criteria_response),
+    PromptFamily("organization_context", ("extract organization context",), organization_context_response),
+    PromptFamily("workflow_intelligence", ("workflow and process intelligence",), workflow_intelligence_response),
+    PromptFamily("technology_stack", ("explicitly mentioned technologies",), technology_stack_response),
+    PromptFamily("process_maturity", ("process maturity and change management",), process_maturity_response),
+    PromptFamily("market_intelligence", ("market intelligence and competitive positioning",), market_intelligence_response),
+]
+
+
+def detect_prompt_family(prompt: str) -> Optional[PromptFamily]:
+    """Return the production prompt family a prompt belongs to, if any."""
+    prompt_lower = prompt.lower()
+    for family in PROMPT_FAMILIES:
+        if family.matches(prompt_lower):
+            return family
+    return None
+
+
+def generate_family_response(family: PromptFamily, prompt: str, rng: random.Random) -> str:
+    """Generate the JSON text a real model would return for this family."""
+    return json.dumps(family.generator(prompt, rng), indent=2)
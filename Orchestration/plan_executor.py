@@ -0,0 +1,572 @@
+"""
+Plan Executor - Run SemanticUnderstanding execution plans with real concurrency
+
+Takes the staged plan produced by SemanticRequestParser and:
+1. Starts each agent as soon as its own upstream agents finish, so wall clock
+   follows the critical path rather than the sum of each stage's slowest agent
+2. Bounds concurrency globally across all plans sharing the executor
+3. Applies a timeout to each agent run
+4. Streams each result into the UniversalContextStore as soon as it finishes
+5. Reports a per-agent timing breakdown, so wall clock tracks the critical path
+6. Skips agents whose upstream dependencies failed or timed out
+7. Optionally warms up likely follow-on agents through a SpeculativePreparer
+"""
+
+import asyncio
+import functools
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Union, TYPE_CHECKING
+
+from .semantic_request_parser import (
+    CapabilityAgentRegistry,
+    ExecutionStrategy,
+    SemanticUnderstanding,
+    get_default_registry
+)
+
+if TYPE_CHECKING:
+    from .speculative_preparer import SpeculativePreparer
+    from .universal_context_store import UniversalContextStore
+
+logger = logging.getLogger(__name__)
+
+# An agent runner receives the agent input and returns its results
+AgentRunner = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+AgentLookup = Union[Mapping[str, AgentRunner], Callable[[str], Optional[AgentRunner]]]
+
+
+@dataclass
+class AgentExecutionRecord:
+    """Timing and outcome of one agent run; offsets are seconds from plan start."""
+    agent_id: str
+    stage_index: int
+    status: str = "pending"  # pending, succeeded, failed, timed_out, skipped
+    queued_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    queue_wait_seconds: float = 0.0
+    run_seconds: float = 0.0
+    context_store_seconds: float = 0.0
+    context_stored: bool = False
+    error: Optional[str] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "agent_id": self.agent_id,
+            "stage_index": self.stage_index,
+            "status": self.status,
+            "queued_at": round(self.queued_at, 4),
+            "started_at": round(self.started_at, 4) if self.started_at is not None else None,
+            "finished_at": round(self.finished_at, 4) if self.finished_at is not None else None,
+            "queue_wait_seconds": round(self.queue_wait_seconds, 4),
+            "run_seconds": round(self.run_seconds, 4),
+            "context_store_seconds": round(self.context_store_seconds, 4),
+            "context_stored": self.context_stored,
+            "error": self.error
+        }
+
+
+@dataclass
+class PlanExecutionResult:
+    """Results and timing breakdown of one executed plan."""
+    workflow_id: str
+    session_id: str
+    stages: List[List[str]]
+    results: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    records: Dict[str, AgentExecutionRecord] = field(default_factory=dict)
+    stage_seconds: List[float] = field(default_factory=list)
+    wall_clock_seconds: float = 0.0
+    prepared_agents: List[str] = field(default_factory=list)  # agents that started from speculative preparation
+    speculating_agents: List[str] = field(default_factory=list)  # follow-on agents being prepared now
+    
+    @property
+    def succeeded(self) -> bool:
+        return all(record.status == "succeeded" for record in self.records.values())
+    
+    @property
+    def failed_agents(self) -> List[str]:
+        return [agent_id for agent_id, record in self.records.items() if record.status != "succeeded"]
+    
+    @property
+    def sequential_seconds(self) -> float:
+        """What the same runs would have taken back to back."""
+        return sum(record.run_seconds for record in self.records.values())
+    
+    def get_timing_breakdown(self) -> Dict[str, Any]:
+        sequential = self.sequential_seconds
+        return {
+            "wall_clock_seconds": round(self.wall_clock_seconds, 4),
+            "sequential_seconds": round(sequential, 4),
+            "speedup": round(sequential / self.wall_clock_seconds, 2) if self.wall_clock_seconds else 1.0,
+            "stage_seconds": [round(seconds, 4) for seconds in self.stage_seconds],
+            "prepared_agents": self.prepared_agents,
+            "agents": {agent_id: record.to_dict() for agent_id, record in self.records.items()}
+        }
+
+
+class PlanExecutor:
+    """
+    Executes SemanticUnderstanding plans stage by stage with bounded concurrency.
+
+    Stages come from execution_plan["parallel_stages"] (see
+    CapabilityAgentRegistry.plan_execution) and dependencies from
+    execution_plan["agent_dependencies"]. Each agent starts once its own
+    upstream agents have finished, without waiting for the rest of their
+    stage, and receives the successful results of everything upstream of it.
+    Sequential plans and plans without declared dependencies keep stage
+    barriers. An agent whose upstream dependency failed, timed out or was
+    skipped is itself skipped, unless the executor allows partial results.
+    """
+    
+    DEFAULT_AGENT_TIMEOUT_SECONDS = 300.0
+    DEFAULT_MAX_CONCURRENCY = 8
+    
+    def __init__(
+        self,
+        agents: AgentLookup,
+        context_store: Optional["UniversalContextStore"] = None,
+        registry: Optional[CapabilityAgentRegistry] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        default_timeout: float = DEFAULT_AGENT_TIMEOUT_SECONDS,
+        agent_timeouts: Optional[Dict[str, float]] = None,
+        respect_sequential_strategy: bool = True,
+        speculator: Optional["SpeculativePreparer"] = None,
+        allow_partial_results: bool = False
+    ):
+        self.agents = agents
+        self.context_store = context_store
+        self.registry = registry or get_default_registry()
+        self.max_concurrency = max(1, max_concurrency)
+        self.default_timeout = default_timeout
+        self.agent_timeouts = dict(agent_timeouts or {})
+        # SEQUENTIAL_MULTI may encode data dependencies the registry does not know about
+        self.respect_sequential_strategy = respect_sequential_strategy
+        # Optional: prepares likely follow-on agents between plans
+        self.speculator = speculator
+        # Run dependents of a failed agent anyway, with whatever upstream results succeeded
+        self.allow_partial_results = allow_partial_results
+        
+        # Shared by every plan run through this executor; created lazily inside the running loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.plans_executed = 0
+        self.agents_executed = 0
+    
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+    
+    def _get_runner(self, agent_id: str) -> Optional[AgentRunner]:
+        if isinstance(self.agents, Mapping):
+            return self.agents.get(agent_id)
+        return self.agents(agent_id)
+    
+    def _get_timeout(self, agent_id: str) -> float:
+        return self.agent_timeouts.get(agent_id, self.default_timeout)
+    
+    def build_stages(self, understanding: SemanticUnderstanding) -> List[List[str]]:
+        """Derive agent stages from the understanding's execution plan."""
+        plan = understanding.execution_plan or {}
+        stages = plan.get("parallel_stages")
+        if not stages:
+            # Plans from older parsers: one agent per stage, in recommended order
+            stages = [[agent_id] for agent_id in understanding.recommended_agents]
+        
+        if self.respect_sequential_strategy and understanding.execution_strategy in (
+            ExecutionStrategy.SINGLE_AGENT, ExecutionStrategy.SEQUENTIAL_MULTI
+        ):
+            stages = [[agent_id] for stage in stages for agent_id in stage]
+        
+        return [list(stage) for stage in stages if stage]
+    
+    def build_dependencies(self, understanding: SemanticUnderstanding, stages: List[List[str]]) -> Dict[str, List[str]]:
+        """Upstream agents each staged agent waits for and needs to have succeeded."""
+        if self.respect_sequential_strategy and understanding.execution_strategy in (
+            ExecutionStrategy.SINGLE_AGENT, ExecutionStrategy.SEQUENTIAL_MULTI
+        ):
+            # Every earlier agent, since the sequence itself may be the dependency
+            ordered = [agent_id for stage in stages for agent_id in stage]
+            return {agent_id: ordered[:index] for index, agent_id in enumerate(ordered)}
+        
+        declared = (understanding.execution_plan or {}).get("agent_dependencies")
+        if declared is None:
+            # Plans from older parsers: every agent of every earlier stage, i.e. stage barriers
+            return {
+                agent_id: [upstream for earlier in stages[:stage_index] for upstream in earlier]
+                for stage_index, stage in enumerate(stages) for agent_id in stage
+            }
+        
+        # Only earlier stages count; an agent staged early for another capability never waits on a later one
+        stage_of = {agent_id: stage_index for stage_index, stage in enumerate(stages) for agent_id in stage}
+        return {
+            agent_id: [
+                upstream for upstream in declared.get(agent_id, [])
+                if stage_of.get(upstream, stage_index) < stage_index
+            ]
+            for stage_index, stage in enumerate(stages) for agent_id in stage
+        }
+    
+    @staticmethod
+    def _transitive_upstream(stages: List[List[str]], dependencies: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """Every agent upstream of each agent, direct or not, in stage order."""
+        upstream_of: Dict[str, List[str]] = {}
+        for stage in stages:
+            for agent_id in stage:
+                upstream = {}
+                for dependency in dependencies.get(agent_id, []):
+                    upstream.update(dict.fromkeys(upstream_of.get(dependency, [])))
+                    upstream[dependency] = None
+                upstream_of[agent_id] = list(upstream)
+        return upstream_of
+    
+    def _build_agent_input(
+        self,
+        agent_id: str,
+        understanding: SemanticUnderstanding,
+        session_id: str,
+        workflow_id: str,
+        upstream_results: Dict[str, Dict[str, Any]],
+        prepared: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        mapping = understanding.execution_plan.get("agent_mappings", {}).get(agent_id, {})
+        return {
+            "agent_id": agent_id,
+            "session_id": session_id,
+            "workflow_id": workflow_id,
+            "business_goal": understanding.business_goal,
+            "capability": mapping.get("capability"),
+            "requirements": mapping.get("requirements", {}),
+            "parameters": understanding.extracted_parameters,
+            "business_context": understanding.business_context,
+            "user_preferences": understanding.user_preferences,
+            "upstream_results": dict(upstream_results),
+            "prepared": prepared
+        }
+    
+    async def _stream_to_context_store(
+        self,
+        record: AgentExecutionRecord,
+        session_id: str,
+        workflow_id: str,
+        business_goal: str,
+        results: Dict[str, Any]
+    ):
+        """Store one agent's results as context; never fails the plan."""
+        if self.context_store is None:
+            return
+        
+        store_start = time.perf_counter()
+        try:
+            context_results = {"workflow_id": workflow_id, "business_goal": business_goal, **results}
+            record.context_stored = await self.context_store.store_agent_context(
+                session_id, record.agent_id, context_results
+            )
+        except Exception as e:
+            logger.error(f"Failed to stream {record.agent_id} results to context store: {e}")
+        record.context_store_seconds = time.perf_counter() - store_start
+    
+    async def _run_agent(
+        self,
+        agent_id: str,
+        stage_index: int,
+        understanding: SemanticUnderstanding,
+        session_id: str,
+        workflow_id: str,
+        upstream_results: Dict[str, Dict[str, Any]],
+        plan_start: float,
+        result: PlanExecutionResult,
+        prepared: Optional[Dict[str, Any]] = None,
+        blocked_by: Optional[List[str]] = None
+    ):
+        record = AgentExecutionRecord(
+            agent_id=agent_id,
+            stage_index=stage_index,
+            queued_at=time.perf_counter() - plan_start
+        )
+        result.records[agent_id] = record
+        
+        if blocked_by:
+            record.status = "skipped"
+            record.error = f"Upstream agents did not succeed: {', '.join(blocked_by)}"
+            logger.warning(f"Skipping {agent_id}: upstream {', '.join(blocked_by)} did not succeed")
+            return
+        
+        runner = self._get_runner(agent_id)
+        if runner is None:
+            record.status = "skipped"
+            record.error = "No runner registered for agent"
+            logger.warning(f"Skipping {agent_id}: no runner registered")
+            return
+        
+        agent_input = self._build_agent_input(agent_id, understanding, session_id, workflow_id, upstream_results, prepared)
+        timeout = self._get_timeout(agent_id)
+        
+        async with self._get_semaphore():
+            record.started_at = time.perf_counter() - plan_start
+            record.queue_wait_seconds = record.started_at - record.queued_at
+            self.registry.record_agent_start(agent_id)
+            run_start = time.perf_counter()
+            agent_results = None
+            try:
+                agent_results = await asyncio.wait_for(runner(agent_input), timeout=timeout)
+                record.status = "succeeded"
+            except asyncio.TimeoutError:
+                record.status = "timed_out"
+                record.error = f"Timed out after {timeout}s"
+                logger.warning(f"{agent_id} timed out after {timeout}s")
+            except Exception as e:
+                record.status = "failed"
+                record.error = str(e)
+                logger.error(f"{agent_id} failed: {e}")
+            finally:
+                record.run_seconds = time.perf_counter() - run_start
+                self.registry.record_agent_finish(agent_id, record.run_seconds, record.status == "succeeded")
+                self.agents_executed += 1
+        
+        record.finished_at = time.perf_counter() - plan_start
+        if record.status != "succeeded":
+            return
+        
+        agent_results = agent_results if isinstance(agent_results, dict) else {"result": agent_results}
+        result.results[agent_id] = agent_results
+        # Stream immediately instead of waiting for the rest of the stage
+        await self._stream_to_context_store(record, session_id, workflow_id, understanding.business_goal, agent_results)
+    
+    async def _run_when_ready(
+        self,
+        agent_id: str,
+        stage_index: int,
+        upstream_tasks: List["asyncio.Future"],
+        dependencies: List[str],
+        upstream: List[str],
+        understanding: SemanticUnderstanding,
+        session_id: str,
+        workflow_id: str,
+        plan_start: float,
+        result: PlanExecutionResult
+    ):
+        """Wait for this agent's own upstream agents only, then claim its preparation and run it."""
+        if upstream_tasks:
+            await asyncio.gather(*upstream_tasks, return_exceptions=True)
+        blocked_by = self._blocked_by(dependencies, result)
+        
+        prepared = None
+        if self.speculator is not None and not blocked_by:
+            claimed = await self.speculator.claim(session_id, [agent_id])
+            if agent_id in claimed:
+                prepared = claimed[agent_id]
+                result.prepared_agents.append(agent_id)
+        
+        upstream_results = {upstream_id: result.results[upstream_id] for upstream_id in upstream if upstream_id in result.results}
+        await self._run_agent(
+            agent_id, stage_index, understanding, session_id, workflow_id,
+            upstream_results, plan_start, result, prepared, blocked_by
+        )
+    
+    def _blocked_by(self, upstream: List[str], result: PlanExecutionResult) -> List[str]:
+        """Upstream agents of this plan that did not succeed (none when partial results are allowed)."""
+        if self.allow_partial_results:
+            return []
+        return [
+            agent_id for agent_id in upstream
+            if agent_id in result.records and result.records[agent_id].status != "succeeded"
+        ]
+    
+    def warm_up(self, understanding: SemanticUnderstanding, session_id: str) -> List[str]:
+        """
+        Start the preparatory step of every agent in an understanding's plan.
+        
+        The next execute() for the session claims the prepared data. Requires
+        a speculator. See capability_listener for use while a request streams.
+        """
+        if self.speculator is None:
+            return []
+        agent_ids = [agent_id for stage in self.build_stages(understanding) for agent_id in stage]
+        return self.speculator.prepare(session_id, agent_ids, {
+            "session_id": session_id,
+            "business_goal": understanding.business_goal,
+            "parameters": understanding.extracted_parameters,
+            "business_context": understanding.business_context,
+            "upstream_results": {}
+        })
+    
+    def capability_listener(self, session_id: str) -> Callable[[SemanticUnderstanding], List[str]]:
+        """
+        warm_up bound to a session, as the on_capabilities listener of
+        SemanticRequestParser.parse_request_streaming, so agent warm-up overlaps
+        the rest of the generation.
+        """
+        return functools.partial(self.warm_up, session_id=session_id)
+    
+    async def execute(
+        self,
+        understanding: SemanticUnderstanding,
+        session_id: str,
+        workflow_id: Optional[str] = None
+    ) -> PlanExecutionResult:
+        """Execute an understanding's plan and return results with a timing breakdown."""
+        workflow_id = workflow_id or f"wf_{uuid.uuid4().hex[:12]}"
+        stages = self.build_stages(understanding)
+        dependencies = self.build_dependencies(understanding, stages)
+        result = PlanExecutionResult(workflow_id=workflow_id, session_id=session_id, stages=stages)
+        
+        logger.info(f"Executing plan {workflow_id}: {len(stages)} stages, {sum(len(stage) for stage in stages)} agents")
+        plan_start = time.perf_counter()
+        
+        if self.speculator is not None:
+            self.speculator.start_plan(session_id, [agent_id for stage in stages for agent_id in stage])
+        
+        # One task per agent, awaiting only its own upstream tasks; stage order guarantees they exist
+        upstream_of = self._transitive_upstream(stages, dependencies)
+        tasks: Dict[str, asyncio.Future] = {}
+        for stage_index, stage in enumerate(stages):
+            for agent_id in stage:
+                tasks[agent_id] = asyncio.ensure_future(self._run_when_ready(
+                    agent_id, stage_index, [tasks[upstream] for upstream in dependencies[agent_id]],
+                    dependencies[agent_id], upstream_of[agent_id], understanding, session_id, workflow_id,
+                    plan_start, result
+                ))
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            for task in tasks.values():
+                task.cancel()
+        
+        result.wall_clock_seconds = time.perf_counter() - plan_start
+        # Each stage spans from its first agent being queued to its last agent finishing
+        for stage in stages:
+            records = [result.records[agent_id] for agent_id in stage if agent_id in result.records]
+            finished = [record.finished_at for record in records if record.finished_at is not None]
+            result.stage_seconds.append(
+                max(finished) - min(record.queued_at for record in records) if finished else 0.0
+            )
+        self.plans_executed += 1
+        
+        if self.speculator is not None and result.results:
+            result.speculating_agents = self.speculator.speculate(session_id, list(result.results), {
+                "session_id": session_id,
+                "workflow_id": workflow_id,
+                "business_goal": understanding.business_goal,
+                "parameters": understanding.extracted_parameters,
+                "business_context": understanding.business_context,
+                "upstream_results": dict(result.results)
+            })
+        
+        breakdown = result.get_timing_breakdown()
+        logger.info(
+            f"Plan {workflow_id} finished in {breakdown['wall_clock_seconds']}s "
+            f"(sequential {breakdown['sequential_seconds']}s, failed: {result.failed_agents or 'none'})"
+        )
+        return result
+    
+    def get_executor_stats(self) -> Dict[str, Any]:
+        """Get executor statistics"""
+        return {
+            "plans_executed": self.plans_executed,
+            "agents_executed": self.agents_executed,
+            "max_concurrency": self.max_concurrency,
+            "default_timeout": self.default_timeout,
+            "agent_stats": self.registry.get_agent_stats(),
+            "speculation": self.speculator.get_speculation_stats() if self.speculator else None
+        }
+
+
+if __name__ == "__main__":
+    def check_streaming_warm_up():
+        """Wire parse_request_streaming to capability_listener and check execute() claims the warm-ups."""
+        import json
+        
+        from .semantic_request_parser import SemanticRequestParser
+        from .speculative_preparer import SpeculativePreparer
+        
+        response = json.dumps({
+            "business_goal": "Launch a bakery brand",
+            "user_intent_summary": "Brand and website for a bakery",
+            "primary_capabilities": ["brand_creation", "website_building"],
+            "secondary_capabilities": [],
+            "recommended_agents": [],
+            "execution_strategy": "parallel_multi",
+            "execution_plan": {},
+            "extracted_parameters": {},
+            "business_context": {"industry": "food"},
+            "user_preferences": {},
+            "confidence_score": 0.9,
+            "reasoning": "Brand and site requested"
+        })
+        
+        class _StreamingEngine:
+            async def generate(self, prompt, **kwargs):
+                return response
+            
+            async def generate_streaming(self, prompt, callback=None, **kwargs):
+                for start in range(0, len(response), 40):
+                    callback(response[start:start + 40])
+                    await asyncio.sleep(0.01)
+                return response
+        
+        async def prepare(agent_input):
+            return {"warmed": agent_input["agent_id"]}
+        
+        async def run(agent_input):
+            return {"prepared": agent_input["prepared"]}
+        
+        async def main():
+            registry = get_default_registry()
+            agent_ids = {agent.agent_id for agents in registry.capability_map.values() for agent in agents}
+            speculator = SpeculativePreparer({agent_id: prepare for agent_id in agent_ids})
+            executor = PlanExecutor({agent_id: run for agent_id in agent_ids}, registry=registry, speculator=speculator)
+            parser = SemanticRequestParser(_StreamingEngine(), registry=registry)
+            
+            understanding = await parser.parse_request_streaming(
+                "Build a brand and website for my bakery", on_capabilities=executor.capability_listener("s1")
+            )
+            result = await executor.execute(understanding, "s1")
+            stats = speculator.get_speculation_stats()
+            
+            assert understanding.recommended_agents, "no agents mapped"
+            assert stats["warm_ups_started"] == len(understanding.recommended_agents), stats
+            assert sorted(result.prepared_agents) == sorted(understanding.recommended_agents), result.prepared_agents
+            assert all(output["prepared"] for output in result.results.values()), result.results
+            print(f"Warmed and claimed while streaming: {result.prepared_agents}")
+        
+        logging.disable(logging.INFO)
+        asyncio.run(main())
+    
+    def check_critical_path():
+        """An agent starts when its own upstream finishes, not when its whole stage does."""
+        def sleeper(seconds: float) -> AgentRunner:
+            async def run(agent_input):
+                await asyncio.sleep(seconds)
+                return {"upstream": sorted(agent_input["upstream_results"])}
+            return run
+        
+        understanding = SemanticUnderstanding(
+            business_goal="Critical path check",
+            user_intent_summary="Critical path check",
+            primary_capabilities=[],
+            secondary_capabilities=[],
+            recommended_agents=["slow", "fast", "dependent"],
+            execution_strategy=ExecutionStrategy.PARALLEL_MULTI,
+            execution_plan={
+                "parallel_stages": [["slow", "fast"], ["dependent"]],
+                "agent_dependencies": {"dependent": ["fast"]}
+            },
+            extracted_parameters={},
+            business_context={},
+            user_preferences={},
+            confidence_score=1.0,
+            reasoning="check"
+        )
+        executor = PlanExecutor({"slow": sleeper(0.4), "fast": sleeper(0.05), "dependent": sleeper(0.4)})
+        result = asyncio.run(executor.execute(understanding, "s2"))
+        
+        assert result.succeeded, result.failed_agents
+        assert result.wall_clock_seconds < 0.7, result.wall_clock_seconds
+        assert result.results["dependent"]["upstream"] == ["fast"], result.results["dependent"]
+        print(f"Critical path 0.45s ran in {result.wall_clock_seconds:.2f}s (stage barriers: 0.80s)")
+    
+    check_streaming_warm_up()
+    check_critical_path()
@@ -0,0 +1,228 @@
+"""
+Replay AI Engine - Record real AI responses to cassette files and replay them offline
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional
+import logging
+
+from .base_engine import BaseAIEngine, AIResponse, AIEngineConfig
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayMode(str, Enum):
+    """How the replay engine treats its cassette."""
+    RECORD = "record"                  # Always call the inner engine and record the response
+    REPLAY = "replay"                  # Only serve recorded responses, never touch the network
+    RECORD_MISSING = "record_missing"  # Replay when recorded, otherwise call the inner engine and record
+
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode when a prompt has no recorded response."""
+
+
+def stable_prompt_hash(prompt: str, **kwargs) -> str:
+    """
+    Hash a prompt and its generation parameters.
+
+    Unlike the builtin hash(), the result is identical across processes and
+    machines, so cassettes recorded on one host replay on any other.
+    """
+    content = f"{prompt}:{json.dumps(kwargs, sort_keys=True, default=str)}"
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class ReplayEngine(BaseAIEngine):
+    """
+    Record/replay AI engine for deterministic offline benchmarks that:
+    - Records real AIResponses from an inner engine into a cassette file
+    - Keys every recording by a stable prompt hash
+    - Replays responses with their original (or scaled) latencies
+    - Serves repeated prompts in recorded order, cycling when exhausted
+
+    Cassettes are JSON lines, one recording per line, gzip-compressed when
+    the path ends in ``.gz``. Recording appends, so a crash never loses
+    earlier entries.
+    """
+
+    def __init__(
+        self,
+        cassette_path: str,
+        mode: ReplayMode = ReplayMode.REPLAY,
+        inner_engine: Optional[BaseAIEngine] = None,
+        config: AIEngineConfig = None,
+        redis_client=None,
+        latency_scale: float = 1.0
+    ):
+        # Replays must reproduce recorded latencies, so response caching is off by default
+        if config is None:
+            config = AIEngineConfig(
+                model="replay",
+                enable_cache=False,
+                max_retries=0,
+                cost_per_1k_input_tokens=0.0,
+                cost_per_1k_output_tokens=0.0
+            )
+
+        super().__init__(config, redis_client)
+
+        self.cassette_path = cassette_path
+        self.mode = ReplayMode(mode)
+        self.inner_engine = inner_engine
+        self.latency_scale = max(0.0, latency_scale)
+
+        if self.mode != ReplayMode.REPLAY and inner_engine is None:
+            raise ValueError(f"Replay mode '{self.mode.value}' requires an inner engine to record from")
+
+        # A cache hit in the inner engine would be recorded with near-zero latency
+        if inner_engine is not None and inner_engine.config.enable_cache:
+            inner_engine.config = inner_engine.config.copy(update={"enable_cache": False})
+
+        # prompt hash -> recorded entries, served in order
+        self._recordings: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._replay_positions: Dict[str, int] = defaultdict(int)
+
+        self.replay_hits = 0
+        self.replay_misses = 0
+        self.recorded_count = 0
+
+        self._load_cassette()
+
+    def get_engine_type(self) -> str:
+        """Return the engine type identifier"""
+        return "replay"
+
+    async def _check_rate_limit(self) -> bool:
+        """Never throttle: replays touch no provider, and the inner engine enforces its own limits"""
+        return True
+
+    def _open_cassette(self, mode: str):
+        """Open the cassette file, transparently handling gzip."""
+        if self.cassette_path.endswith(".gz"):
+            return gzip.open(self.cassette_path, mode + "t", encoding="utf-8")
+        return open(self.cassette_path, mode, encoding="utf-8")
+
+    def _load_cassette(self):
+        """Load all recordings from the cassette file if it exists."""
+        if not os.path.exists(self.cassette_path):
+            if self.mode == ReplayMode.REPLAY:
+                logger.warning(f"Cassette {self.cassette_path} does not exist, every prompt will miss")
+            return
+
+        loaded = 0
+        with self._open_cassette("r") as cassette:
+            for line_number, line in enumerate(cassette, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                    self._recordings[entry["key"]].append(entry)
+                    loaded += 1
+                except (json.JSONDecodeError, KeyError) as e:
+                    logger.warning(f"Skipping corrupt cassette line {line_number}: {e}")
+
+        logger.info(f"Loaded {loaded} recordings ({len(self._recordings)} prompts) from {self.cassette_path}")
+
+    def _append_to_cassette(self, entry: Dict[str, Any]):
+        """Append a single recording to the cassette file."""
+        directory = os.path.dirname(self.cassette_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._open_cassette("a") as cassette:
+            cassette.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+    def _next_recording(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get the next recording for a prompt, cycling through repeats."""
+        entries = self._recordings.get(key)
+        if not entries:
+            return None
+
+        position = self._replay_positions[key]
+        self._replay_positions[key] = position + 1
+        return entries[position % len(entries)]
+
+    async def _replay(self, entry: Dict[str, Any]) -> AIResponse:
+        """Rebuild a recorded response after waiting out its scaled latency."""
+        latency = entry.get("latency_seconds", 0.0) * self.latency_scale
+        if latency > 0:
+            await asyncio.sleep(latency)
+
+        response = AIResponse.parse_obj(entry["response"])
+        response.cached = False
+        response.timestamp = datetime.now()
+        response.metadata = {
+            **response.metadata,
+            "replayed": True,
+            "recorded_latency_seconds": entry.get("latency_seconds", 0.0),
+            "replay_latency_seconds": latency
+        }
+        return response
+
+    async def _record(self, key: str, prompt: str, **kwargs) -> AIResponse:
+        """Call the inner engine and record its response and latency."""
+        start_time = time.perf_counter()
+        response = await self.inner_engine.generate(prompt, **kwargs)
+        latency = time.perf_counter() - start_time
+
+        entry = {
+            "key": key,
+            "latency_seconds": round(latency, 4),
+            "recorded_at": datetime.now().isoformat(),
+            "response": json.loads(response.json())
+        }
+        self._recordings[key].append(entry)
+        self._append_to_cassette(entry)
+        self.recorded_count += 1
+
+        logger.debug(f"Recorded {key[:8]}... ({latency:.2f}s)")
+        return response
+
+    async def _make_api_call(self, prompt: str, **kwargs) -> AIResponse:
+        """Serve from the cassette or record from the inner engine, depending on mode"""
+        key = stable_prompt_hash(prompt, **kwargs)
+
+        if self.mode != ReplayMode.RECORD:
+            entry = self._next_recording(key)
+            if entry:
+                self.replay_hits += 1
+                return await self._replay(entry)
+
+            self.replay_misses += 1
+            if self.mode == ReplayMode.REPLAY:
+                raise CassetteMissError(f"No recording for prompt {key[:8]}... in {self.cassette_path}")
+
+        return await self._record(key, prompt, **kwargs)
+
+    def set_latency_scale(self, latency_scale: float):
+        """Scale replayed latencies (0.0 = instant, 1.0 = as recorded)"""
+        self.latency_scale = max(0.0, latency_scale)
+
+    def rewind(self):
+        """Restart replay from the first recording of every prompt"""
+        self._replay_positions.clear()
+
+    def get_engine_stats(self) -> Dict[str, Any]:
+        """Get replay engine statistics"""
+        total = self.replay_hits + self.replay_misses
+        return {
+            'engine_type': self.get_engine_type(),
+            'mode': self.mode.value,
+            'cassette_path': self.cassette_path,
+            'recorded_prompts': len(self._recordings),
+            'recorded_responses': sum(len(entries) for entries in self._recordings.values()),
+            'recorded_this_session': self.recorded_count,
+            'replay_hits': self.replay_hits,
+            'replay_misses': self.replay_misses,
+            'replay_hit_rate': self.replay_hits / total if total else 0.0,
+            'latency_scale': self.latency_scale
+        }
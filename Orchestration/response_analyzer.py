@@ -10,10 +10,14 @@ import json
 import logging
 from enum import Enum
 from dataclasses import dataclass
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, Union
 from datetime import datetime
 
 from ai_engines.anthropic_engine import AnthropicEngine
+from .conversation_summary import RollingConversationSummary
+from .deadline import DeadlineExceeded, deadline_scope, run_within_deadline
+from .intent_cache import IntentCache
+from .semantic_request_parser import SemanticRequestParser, SemanticUnderstanding
 
 logger = logging.getLogger(__name__)
 
@@ -40,18 +44,78 @@ class ResponseDecision:
 
 
 class ContextAwareResponseAnalyzer:
-    """Analyzes messages to determine appropriate response strategy."""
+    """Analyzes messages to determine appropriate response strategy.
     
-    def __init__(self, ai_engine: AnthropicEngine):
+    When constructed with a SemanticRequestParser the analyzer runs in combined
+    mode: one LLM call returns both the ResponseDecision and the
+    SemanticUnderstanding. analyze_with_understanding() returns both;
+    analyze_response_needed() returns only the decision and, for action
+    decisions, primes the understanding into the parser so the following
+    parse_request() for the same message, session and context needs no
+    second call.
+    
+    Decisions for recurring messages come from an IntentCache (by default the
+    parser's), keyed on the normalized message and the completed-work context.
+    """
+    
+    # Response types that go on to a semantic parse
+    ACTION_RESPONSE_TYPES = (ResponseType.AGENT_EXECUTION, ResponseType.HYBRID)
+    
+    # Time kept back from the deadline to build the local heuristic decision
+    LOCAL_FALLBACK_RESERVE_SECONDS = 0.05
+    
+    def __init__(
+        self,
+        ai_engine: AnthropicEngine,
+        semantic_parser: Optional[SemanticRequestParser] = None,
+        deadline_seconds: Optional[float] = None,
+        intent_cache: Optional[IntentCache] = None
+    ):
         self.ai_engine = ai_engine
-        logger.info("Context-Aware Response Analyzer initialized")
+        self.semantic_parser = semantic_parser
+        # Shared with the parser so both layers are invalidated together
+        self.intent_cache = intent_cache or (semantic_parser.intent_cache if semantic_parser else None)
+        # Default latency budget per analysis (None = no deadline unless the caller sets one)
+        self.deadline_seconds = deadline_seconds
+        logger.info(f"Context-Aware Response Analyzer initialized (combined mode: {semantic_parser is not None})")
     
     async def analyze_response_needed(
         self, 
         message: str, 
-        conversation_context: Dict[str, Any]
+        conversation_context: Dict[str, Any],
+        deadline_seconds: Optional[float] = None
     ) -> ResponseDecision:
-        """Determine what type of response is appropriate for this message."""
+        """Determine what type of response is appropriate for this message.
+        
+        Runs under a request deadline (deadline_seconds, else the analyzer default,
+        else any deadline already set by the caller). When the AI cannot answer in
+        time the local heuristic decision is returned before the deadline passes.
+        """
+        
+        if self.semantic_parser:
+            decision, understanding = await self.analyze_with_understanding(message, conversation_context, deadline_seconds)
+            if understanding:
+                # The caller only gets the decision and parses the request next
+                self.semantic_parser.prime_understanding(message, understanding, conversation_context)
+            return decision
+        
+        cached_decision = self._get_cached_decision(message, conversation_context)
+        if cached_decision:
+            return cached_decision
+        
+        with deadline_scope(deadline_seconds if deadline_seconds is not None else self.deadline_seconds):
+            try:
+                return await run_within_deadline(
+                    self._analyze_with_ai(message, conversation_context),
+                    "response_analyzer",
+                    reserve=self.LOCAL_FALLBACK_RESERVE_SECONDS
+                )
+            except DeadlineExceeded as e:
+                logger.warning(f"Response analysis missed its deadline ({e}), using local heuristics")
+                return self._fallback_analysis(message)
+    
+    async def _analyze_with_ai(self, message: str, conversation_context: Dict[str, Any]) -> ResponseDecision:
+        """Single-purpose AI response analysis (non-combined mode)."""
         
         try:
             # Build analysis prompt
@@ -67,8 +131,12 @@ class ContextAwareResponseAnalyzer:
                 response_text = str(response)
             
             # Parse and return decision
-            return self._parse_response_decision(response_text, message)
+            decision = self._parse_response_decision(response_text, message)
+            self._cache_decision(message, conversation_context, decision)
+            return decision
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error analyzing response needed: {e}")
             # Fallback to agent execution for safety
@@ -81,6 +149,137 @@ class ContextAwareResponseAnalyzer:
                 answer_strategy="fallback_execution"
             )
     
+    async def analyze_with_understanding(
+        self,
+        message: str,
+        conversation_context: Dict[str, Any],
+        deadline_seconds: Optional[float] = None
+    ) -> Tuple[ResponseDecision, Optional[SemanticUnderstanding]]:
+        """Decide the response type and, for action messages, parse the request in one LLM call."""
+        
+        if not self.semantic_parser:
+            raise ValueError("Combined analysis requires a semantic parser")
+        
+        cached_decision = self._get_cached_decision(message, conversation_context)
+        if cached_decision:
+            if cached_decision.response_type not in self.ACTION_RESPONSE_TYPES:
+                return cached_decision, None
+            # Action decisions are only reusable together with their understanding
+            understanding = self.semantic_parser._get_cached_understanding(message, conversation_context)
+            if understanding:
+                return cached_decision, understanding
+        
+        with deadline_scope(deadline_seconds if deadline_seconds is not None else self.deadline_seconds):
+            try:
+                return await run_within_deadline(
+                    self._analyze_with_understanding(message, conversation_context),
+                    "response_analyzer",
+                    reserve=self.LOCAL_FALLBACK_RESERVE_SECONDS
+                )
+            except DeadlineExceeded as e:
+                logger.warning(f"Combined analysis missed its deadline ({e}), using local heuristics")
+                return self._fallback_analysis(message), None
+    
+    async def _analyze_with_understanding(
+        self,
+        message: str,
+        conversation_context: Dict[str, Any]
+    ) -> Tuple[ResponseDecision, Optional[SemanticUnderstanding]]:
+        """The fused AI call behind analyze_with_understanding."""
+        
+        try:
+            fused_prompt = self._build_fused_analysis_prompt(message, conversation_context)
+            response = await self.ai_engine.generate(fused_prompt)
+            
+            if hasattr(response, 'content'):
+                response_text = response.content
+            else:
+                response_text = str(response)
+            
+            fused_data = self._extract_json(response_text)
+            decision_data = fused_data.get("response_decision")
+            if not isinstance(decision_data, dict) or not decision_data.get("response_type"):
+                logger.warning("Combined analysis returned no response_decision, using fallback")
+                return self._fallback_analysis(message), None
+            decision = self._parse_response_decision(json.dumps(decision_data), message)
+            
+            understanding = None
+            understanding_data = fused_data.get("semantic_understanding")
+            if decision.response_type in self.ACTION_RESPONSE_TYPES and isinstance(understanding_data, dict):
+                understanding = self.semantic_parser._parse_ai_response(json.dumps(understanding_data), message)
+                understanding = await self.semantic_parser._enhance_with_capability_mapping(understanding)
+                self.semantic_parser.cache_understanding(message, conversation_context, understanding)
+            
+            self._cache_decision(message, conversation_context, decision)
+            return decision, understanding
+            
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"Error in combined analysis: {e}")
+            return self._fallback_analysis(message), None
+    
+    def _get_cached_decision(
+        self,
+        message: str,
+        conversation_context: Dict[str, Any]
+    ) -> Optional[ResponseDecision]:
+        """Cached decision for a recurring message with the same completed-work context."""
+        if not self.intent_cache:
+            return None
+        return self.intent_cache.get("decision", message, conversation_context)
+    
+    def _cache_decision(self, message: str, conversation_context: Dict[str, Any], decision: ResponseDecision):
+        """Remember an AI decision; heuristic fallbacks are never cached."""
+        if not self.intent_cache:
+            return
+        if decision.reasoning.startswith("Fallback:") or decision.answer_strategy == "fallback_execution":
+            return
+        self.intent_cache.put("decision", message, conversation_context, decision)
+    
+    def _build_fused_analysis_prompt(self, message: str, context: Dict[str, Any]) -> str:
+        """Build one prompt that asks for both the response decision and the semantic understanding."""
+        
+        decision_prompt = self._build_response_analysis_prompt(message, context)
+        semantic_prompt = self.semantic_parser._build_semantic_analysis_prompt(message, context)
+        
+        return f"""You will perform TWO analyses of the same user message in a single pass.
+
+=== ANALYSIS 1: RESPONSE DECISION ===
+{decision_prompt}
+
+=== ANALYSIS 2: SEMANTIC UNDERSTANDING ===
+Only perform this analysis when ANALYSIS 1 chose agent_execution or hybrid.
+{semantic_prompt}
+
+=== OUTPUT FORMAT ===
+Ignore the individual output instructions above. Respond ONLY with one valid JSON object (no markdown, no extra text):
+{{
+    "response_decision": {{ ...the ANALYSIS 1 JSON object... }},
+    "semantic_understanding": {{ ...the ANALYSIS 2 JSON object... }} or null
+}}
+
+Set "semantic_understanding" to null when response_type is direct_answer or clarification."""
+    
+    def _extract_json(self, ai_response: str) -> Dict[str, Any]:
+        """Extract the first JSON object from an AI response."""
+        
+        import re
+        response_text = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', ai_response.strip())
+        
+        if "```json" in response_text:
+            start = response_text.find("```json") + 7
+            end = response_text.find("```", start)
+            json_text = response_text[start:end].strip()
+        else:
+            start = response_text.find("{")
+            end = response_text.rfind("}") + 1
+            if start == -1 or end <= start:
+                raise ValueError("No JSON found in response")
+            json_text = response_text[start:end]
+        
+        return json.loads(json_text)
+    
     def _build_response_analysis_prompt(self, message: str, context: Dict[str, Any]) -> str:
         """Build prompt for response type analysis."""
         
@@ -89,10 +288,16 @@ class ContextAwareResponseAnalyzer:
         conversation_history = context.get("conversation_history", [])
         session_context = context.get("session_context", {})
         recent_deliverables = context.get("recent_deliverables", [])
+        if not recent_deliverables and context.get("session_snapshot"):
+            # UniversalContextStore.get_session_snapshot result
+            recent_deliverables = context["session_snapshot"].to_recent_deliverables()
         
         # Build context summary
         context_summary = self._build_context_summary(
-            recent_workflows, conversation_history, session_context, recent_deliverables
+            recent_workflows, conversation_history, session_context, recent_deliverables,
+            rolling_summary=context.get("conversation_summary"),
+            # UniversalContextStore.search_context(session_id, message) result
+            relevant_context=context.get("relevant_context")
         )
         
         return f"""You are a context-aware response analyzer. Determine how to respond to this user message.
@@ -159,12 +364,36 @@ Analyze the message carefully and provide your decision:"""
         recent_workflows: List[Dict[str, Any]], 
         conversation_history: List[Dict[str, Any]],
         session_context: Dict[str, Any],
-        recent_deliverables: List[Dict[str, Any]]
+        recent_deliverables: List[Dict[str, Any]],
+        rolling_summary: Optional[Union[RollingConversationSummary, str]] = None,
+        relevant_context: Optional[List[Any]] = None
     ) -> str:
-        """Build a concise context summary for analysis."""
+        """Build a concise context summary for analysis.
+        
+        When the context carries the session's rolling summary (see
+        UniversalContextStore.get_conversation_summary) its pre-rendered text
+        replaces the per-call slicing of history and deliverables. Snippets
+        from UniversalContextStore.search_context replace the generic list of
+        recent deliverables with the stored fields relevant to the message.
+        """
         
         summary_parts = []
         
+        if isinstance(rolling_summary, RollingConversationSummary):
+            rolling_summary = rolling_summary.render()
+        if rolling_summary:
+            summary_parts.append(rolling_summary)
+            conversation_history = recent_deliverables = None
+        
+        # Stored context relevant to this message
+        if relevant_context:
+            summary_parts.append("\nRELEVANT STORED CONTEXT:" if summary_parts else "RELEVANT STORED CONTEXT:")
+            for snippet in relevant_context:
+                if isinstance(snippet, dict):
+                    snippet = f"{snippet.get('context_type')}.{snippet.get('field')}: {snippet.get('text')}"
+                summary_parts.append(f"  {snippet.render() if hasattr(snippet, 'render') else snippet}")
+            recent_deliverables = None
+        
         # Recent conversation
         if conversation_history:
             last_messages = conversation_history[-3:]  # Last 3 exchanges
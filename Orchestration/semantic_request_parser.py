@@ -8,17 +8,26 @@ This replaces the multi-step IntentParser with a semantic understanding approach
 4. Eliminates unnecessary routing layers
 """
 
+import hashlib
+import inspect
 import json
 import logging
 import asyncio
-from typing import Dict, Any, List, Optional, Tuple, Set
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Any, Callable, List, Optional, Tuple, Set
 from datetime import datetime
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 
 from pydantic import BaseModel
 from ai_engines.anthropic_engine import AnthropicEngine
 from ai_engines.base_engine import AIEngineConfig
+from .capability_resolver import CapabilityAliasResolver, get_alias_revision
+from .intent_cache import IntentCache, understanding_context_fingerprint
+from .deadline import DeadlineExceeded, deadline_misses, deadline_scope, has_time_for, run_within_deadline
+from .incremental_json import IncrementalJSONObjectParser
 
 logger = logging.getLogger(__name__)
 
@@ -67,6 +76,44 @@ class AgentCapability:
             self.dependencies = []
 
 
+@dataclass
+class AgentPerformanceStats:
+    """Live execution statistics for one agent."""
+    agent_id: str
+    successes: int = 0
+    failures: int = 0
+    in_flight: int = 0
+    recent_durations: deque = None  # seconds, most recent runs only
+    
+    def __post_init__(self):
+        if self.recent_durations is None:
+            self.recent_durations = deque(maxlen=200)
+    
+    @property
+    def success_rate(self) -> float:
+        """Success rate with a Laplace prior so new agents start near 0.9, not 0 or 1."""
+        return (self.successes + 9) / (self.successes + self.failures + 10)
+    
+    @property
+    def p95_duration(self) -> Optional[float]:
+        """95th percentile of recent durations, or None without samples."""
+        if not self.recent_durations:
+            return None
+        durations = sorted(self.recent_durations)
+        return durations[min(len(durations) - 1, int(0.95 * len(durations)))]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "agent_id": self.agent_id,
+            "successes": self.successes,
+            "failures": self.failures,
+            "in_flight": self.in_flight,
+            "success_rate": round(self.success_rate, 3),
+            "p95_duration": self.p95_duration,
+            "samples": len(self.recent_durations)
+        }
+
+
 @dataclass
 class SemanticUnderstanding:
     """Complete semantic understanding of a user request."""
@@ -94,13 +141,63 @@ class SemanticUnderstanding:
             self.potential_challenges = []
 
 
+class CapabilityCycleError(ValueError):
+    """Raised when capability dependencies cannot be ordered."""
+
+
+@dataclass(frozen=True)
+class ExecutionDAGPlan:
+    """Topologically staged execution plan; capabilities within a stage can run in parallel."""
+    stages: Tuple[Tuple[CapabilityCategory, ...], ...]
+    critical_path: Tuple[CapabilityCategory, ...]
+    critical_path_seconds: float
+    total_duration_seconds: float
+    unsatisfied_dependencies: Dict[str, List[str]]
+    dependencies: Dict[CapabilityCategory, Tuple[CapabilityCategory, ...]] = field(default_factory=dict)
+    
+    @property
+    def order(self) -> Tuple[CapabilityCategory, ...]:
+        """Flat execution order, stage by stage."""
+        return tuple(capability for stage in self.stages for capability in stage)
+    
+    @property
+    def parallelism_speedup(self) -> float:
+        """Estimated speedup of staged over sequential execution."""
+        if not self.critical_path_seconds:
+            return 1.0
+        return self.total_duration_seconds / self.critical_path_seconds
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "stages": [[capability.value for capability in stage] for stage in self.stages],
+            "critical_path": [capability.value for capability in self.critical_path],
+            "critical_path_seconds": self.critical_path_seconds,
+            "total_duration_seconds": self.total_duration_seconds,
+            "unsatisfied_dependencies": self.unsatisfied_dependencies,
+            "dependencies": {capability.value: [dep.value for dep in deps] for capability, deps in self.dependencies.items()}
+        }
+
+
 class CapabilityAgentRegistry:
     """Registry that maps capabilities to agents without department intermediaries."""
     
     def __init__(self):
         self.capability_map: Dict[CapabilityCategory, List[AgentCapability]] = {}
         self.agent_specs: Dict[str, Dict[str, Any]] = {}
+        self._version: Optional[str] = None
+        
+        # O(1) lookup indexes, maintained by register_capability
+        self._agents_by_id: Dict[str, List[AgentCapability]] = {}
+        self._agents_by_skill: Dict[str, List[AgentCapability]] = {}
+        self._registration_rank: Dict[str, int] = {}
+        
+        # Live per-agent execution stats used for scored selection
+        self.agent_stats: Dict[str, AgentPerformanceStats] = {}
+        
+        # Memoized DAG plans keyed by (registry version, capability set)
+        self._plan_cache: Dict[Tuple[str, Tuple[CapabilityCategory, ...]], ExecutionDAGPlan] = {}
         self._initialize_registry()
+        logger.info(f"Capability registry initialized with {sum(len(agents) for agents in self.capability_map.values())} agents (version {self.version})")
     
     def _initialize_registry(self):
         """Initialize the capability registry with known agents."""
@@ -271,149 +368,256 @@ class CapabilityAgentRegistry:
         if capability.capability_category not in self.capability_map:
             self.capability_map[capability.capability_category] = []
         self.capability_map[capability.capability_category].append(capability)
-        logger.info(f"Registered {capability.agent_id} for {capability.capability_category}")
+        self._agents_by_id.setdefault(capability.agent_id, []).append(capability)
+        for skill in capability.specific_skills:
+            self._agents_by_skill.setdefault(skill, []).append(capability)
+        self._registration_rank.setdefault(capability.agent_id, len(self._registration_rank))
+        self._version = None
+        logger.debug(f"Registered {capability.agent_id} for {capability.capability_category}")
+    
+    @property
+    def version(self) -> str:
+        """Content hash of the registered capabilities, for keying prompt templates and caches."""
+        if self._version is None:
+            registry_state = [
+                [agent.agent_id, agent.capability_category.value, agent.specific_skills,
+                 agent.estimated_duration, agent.dependencies]
+                for agents in self.capability_map.values()
+                for agent in agents
+            ]
+            self._version = hashlib.sha256(json.dumps(registry_state, sort_keys=True).encode()).hexdigest()[:12]
+        return self._version
+    
+    def get_agent_descriptions(self) -> Dict[str, Dict[str, Any]]:
+        """Get prompt-facing descriptions of every registered agent."""
+        descriptions = {}
+        for capabilities in self.capability_map.values():
+            for agent_cap in capabilities:
+                descriptions[agent_cap.agent_id] = {
+                    "capability": agent_cap.capability_category.value,
+                    "skills": agent_cap.specific_skills
+                }
+        return descriptions
     
     def get_agents_for_capability(self, capability: CapabilityCategory) -> List[AgentCapability]:
         """Get all agents that can handle a specific capability."""
         return self.capability_map.get(capability, [])
     
+    def has_agent(self, agent_id: str) -> bool:
+        """Check whether an agent is registered."""
+        return agent_id in self._agents_by_id
+    
+    def get_agent_capabilities(self, agent_id: str) -> List[AgentCapability]:
+        """Get every capability registered for an agent."""
+        return self._agents_by_id.get(agent_id, [])
+    
+    def get_agents_with_skill(self, skill: str) -> List[AgentCapability]:
+        """Get all agent capabilities that list a specific skill."""
+        return self._agents_by_skill.get(skill, [])
+    
+    # Selection scoring weights
+    PLAN_CACHE_SIZE = 512
+    DEFAULT_EXPECTED_DURATION = 60.0  # seconds, used when an agent has no estimate or samples
+    DURATION_WEIGHT = 0.5
+    LOAD_PENALTY = 0.2
+    RANK_PENALTY = 0.05
+    SKILL_BONUS = 0.1
+    
+    def _get_stats(self, agent_id: str) -> AgentPerformanceStats:
+        if agent_id not in self.agent_stats:
+            self.agent_stats[agent_id] = AgentPerformanceStats(agent_id=agent_id)
+        return self.agent_stats[agent_id]
+    
+    def record_agent_start(self, agent_id: str):
+        """Record that an agent execution started."""
+        self._get_stats(agent_id).in_flight += 1
+    
+    def record_agent_finish(self, agent_id: str, duration_seconds: float, success: bool):
+        """Record the outcome of an agent execution."""
+        stats = self._get_stats(agent_id)
+        stats.in_flight = max(0, stats.in_flight - 1)
+        stats.recent_durations.append(duration_seconds)
+        if success:
+            stats.successes += 1
+        else:
+            stats.failures += 1
+    
+    def get_agent_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get live execution stats for every agent that has run."""
+        return {agent_id: stats.to_dict() for agent_id, stats in self.agent_stats.items()}
+    
+    def expected_duration(self, agent: AgentCapability) -> float:
+        """Expected run time: observed p95 when available, else the declared estimate."""
+        stats = self.agent_stats.get(agent.agent_id)
+        if stats and stats.p95_duration is not None:
+            return stats.p95_duration
+        return float(agent.estimated_duration or self.DEFAULT_EXPECTED_DURATION)
+    
+    def score_agent(self, agent: AgentCapability, context: Dict[str, Any] = None) -> float:
+        """
+        Score a candidate agent: reliability, minus expected duration, current
+        load and registration order (earlier registrations are preferred).
+        """
+        stats = self.agent_stats.get(agent.agent_id) or AgentPerformanceStats(agent_id=agent.agent_id)
+        
+        duration = self.expected_duration(agent)
+        score = stats.success_rate
+        score -= self.DURATION_WEIGHT * duration / (duration + self.DEFAULT_EXPECTED_DURATION)
+        score -= self.LOAD_PENALTY * stats.in_flight
+        score -= self.RANK_PENALTY * self._registration_rank.get(agent.agent_id, 0) / max(1, len(self._registration_rank))
+        
+        required_skills = (context or {}).get("required_skills") or []
+        if required_skills:
+            score += self.SKILL_BONUS * len(set(required_skills) & set(agent.specific_skills))
+        
+        return score
+    
     def get_best_agent_for_capability(self, capability: CapabilityCategory, context: Dict[str, Any] = None) -> Optional[AgentCapability]:
         """Get the best agent for a capability given context."""
         agents = self.get_agents_for_capability(capability)
         if not agents:
             return None
+        if len(agents) == 1:
+            return agents[0]
         
-        # For now, return first agent, but could add scoring logic
-        return agents[0]
+        return max(agents, key=lambda agent: self.score_agent(agent, context))
     
-    def resolve_dependencies(self, capabilities: List[CapabilityCategory]) -> List[CapabilityCategory]:
-        """Resolve capability dependencies to determine execution order."""
-        resolved = []
-        remaining = capabilities.copy()
-        max_iterations = len(capabilities) * 2  # Prevent infinite loops
-        iteration = 0
-        
-        while remaining and iteration < max_iterations:
-            iteration += 1
-            progress_made = False
-            
-            for capability in remaining.copy():
-                agents = self.get_agents_for_capability(capability)
-                if not agents:
-                    remaining.remove(capability)
-                    progress_made = True
-                    continue
-                
-                # Check if dependencies are resolved
-                agent = agents[0]  # Use first agent for dependency check
-                if not hasattr(agent, 'dependencies') or not agent.dependencies:
-                    # No dependencies, can execute immediately
-                    resolved.append(capability)
-                    remaining.remove(capability)
-                    progress_made = True
-                else:
-                    deps_satisfied = all(dep in [c.value for c in resolved] for dep in agent.dependencies)
-                    if deps_satisfied:
-                        resolved.append(capability)
-                        remaining.remove(capability)
-                        progress_made = True
-            
-            # If no progress made, break to avoid infinite loop
-            if not progress_made:
-                # Add remaining capabilities without dependencies resolved
-                resolved.extend(remaining)
-                break
+    def plan_execution(self, capabilities: List[CapabilityCategory]) -> "ExecutionDAGPlan":
+        """
+        Plan capability execution as a DAG of parallel stages.
         
-        return resolved
-
-
-class SemanticRequestParser:
-    """
-    Semantic parser that replaces IntentParser with single AI call approach.
-    
-    Makes ONE comprehensive AI call to understand business context, map to capabilities,
-    and create execution plan - eliminating multiple classification steps.
-    """
-    
-    def __init__(self, ai_engine: Optional[AnthropicEngine] = None):
-        self.ai_engine = ai_engine or AnthropicEngine(AIEngineConfig())
-        self.registry = CapabilityAgentRegistry()
-    
-    async def parse_request(self, user_request: str, conversation_context: Optional[Dict[str, Any]] = None) -> SemanticUnderstanding:
+        A capability depends on another when any agent that can serve it
+        declares that dependency, so the plan stays valid whichever agent is
+        selected later. Dependencies outside the requested set are reported
+        but do not block. Plans are memoized per capability set and registry
+        version. Raises CapabilityCycleError when dependencies form a cycle.
         """
-        Parse user request with single AI call for complete semantic understanding.
+        requested = tuple(dict.fromkeys(capabilities))
+        cache_key = (self.version, requested)
+        plan = self._plan_cache.get(cache_key)
+        if plan is not None:
+            return plan
         
-        Args:
-            user_request: The user's natural language request
-            conversation_context: Previous conversation context if available
+        requested_values = {capability.value: capability for capability in requested}
+        planned = [capability for capability in requested if self.get_agents_for_capability(capability)]
+        depends_on: Dict[CapabilityCategory, Set[CapabilityCategory]] = {}
+        durations: Dict[CapabilityCategory, float] = {}
+        unsatisfied: Dict[str, List[str]] = {}
         
-        Returns:
-            SemanticUnderstanding: Complete understanding and execution plan
-        """
-        try:
-            # Build comprehensive prompt for single AI analysis
-            analysis_prompt = self._build_semantic_analysis_prompt(user_request, conversation_context)
-            
-            # Single AI call for complete understanding
-            response = await self.ai_engine.generate(analysis_prompt)
-            
-            # Extract text content if response is an AIResponse object
-            if hasattr(response, 'content'):
-                response_text = response.content
-            else:
-                response_text = str(response)
-            
-            # Parse the structured response
-            understanding = self._parse_ai_response(response_text, user_request)
-            
-            # Enhance with capability mapping
-            understanding = await self._enhance_with_capability_mapping(understanding)
-            
-            return understanding
-            
-        except Exception as e:
-            logger.error(f"Failed to parse request semantically: {e}")
-            # Return intelligent fallback understanding
-            return await self._create_intelligent_fallback(user_request, str(e))
-    
-    def _build_semantic_analysis_prompt(self, user_request: str, context: Optional[Dict[str, Any]]) -> str:
-        """Build comprehensive prompt for semantic analysis."""
+        for capability in planned:
+            agents = self.get_agents_for_capability(capability)
+            dependencies = {dep for agent in agents for dep in agent.dependencies if dep != capability.value}
+            depends_on[capability] = {requested_values[dep] for dep in dependencies if dep in requested_values and requested_values[dep] in planned}
+            missing = sorted(dep for dep in dependencies if dep not in requested_values)
+            if missing:
+                unsatisfied[capability.value] = missing
+            # Slowest candidate keeps the estimate conservative whichever agent is picked
+            durations[capability] = max(float(agent.estimated_duration or self.DEFAULT_EXPECTED_DURATION) for agent in agents)
         
-        available_capabilities = list(CapabilityCategory)
-        capability_descriptions = {
-            CapabilityCategory.BRAND_CREATION: "Creating brand strategy, messaging, and identity",
-            CapabilityCategory.LOGO_GENERATION: "Designing logos and visual brand assets",
-            CapabilityCategory.MARKET_ANALYSIS: "Market research, competitor analysis, trend identification", 
-            CapabilityCategory.WEBSITE_BUILDING: "Building responsive websites with modern design",
-            CapabilityCategory.SALES_OUTREACH: "Creating sales materials and outreach campaigns",
-            CapabilityCategory.LEAD_GENERATION: "Finding and mining new leads, prospect discovery, Apollo integration for lead generation",
-            CapabilityCategory.CONTENT_CREATION: "Writing basic copy, blog posts, social content",
-            CapabilityCategory.CONTENT_MARKETING: "Comprehensive marketing campaigns, content strategy, SEO optimization, content calendars, marketing automation, and content distribution across channels",
-            CapabilityCategory.DATA_ANALYSIS: "Analyzing data and creating insights",
-            CapabilityCategory.DESIGN_SERVICES: "Visual design and creative services",
-            CapabilityCategory.TECHNICAL_IMPLEMENTATION: "Technical development and implementation",
-            CapabilityCategory.SOCIAL_MONITORING: "Social media monitoring and sentiment analysis",
-            CapabilityCategory.LINKEDIN_AUTOMATION: "LinkedIn scraping, viral post analysis, prospect identification, and engagement tracking",
-            CapabilityCategory.COMMUNICATION_MONITORING: "Email, WhatsApp, LinkedIn message monitoring and filtering",
-            CapabilityCategory.EMAIL_ORCHESTRATION: "Advanced email sequences, AI personalization, send optimization, reply detection, bounce handling, email warming, and comprehensive analytics",
-            CapabilityCategory.CRM_OPERATIONS: "Bi-directional CRM sync (HubSpot, Salesforce, Pipedrive), AI-powered deduplication, field mapping, conflict resolution, and cross-agent collaboration",
-            CapabilityCategory.ICP_GENERATION: "Creating Ideal Customer Profile (ICP) based on existing customer analysis, not for finding new leads"
-        }
+        # Kahn's algorithm, one stage per wave of ready capabilities
+        dependents: Dict[CapabilityCategory, List[CapabilityCategory]] = {capability: [] for capability in planned}
+        for capability, dependencies in depends_on.items():
+            for dependency in dependencies:
+                dependents[dependency].append(capability)
+        pending = {capability: len(depends_on[capability]) for capability in planned}
         
-        context_str = ""
-        if context:
-            context_str = f"\nConversation Context: {json.dumps(context, indent=2)}"
+        stages: List[Tuple[CapabilityCategory, ...]] = []
+        ready = [capability for capability in planned if pending[capability] == 0]
+        while ready:
+            stages.append(tuple(ready))
+            next_ready = set()
+            for capability in ready:
+                for dependent in dependents[capability]:
+                    pending[dependent] -= 1
+                    if pending[dependent] == 0:
+                        next_ready.add(dependent)
+            ready = [capability for capability in planned if capability in next_ready]
         
-        return f"""
-You are a semantic business request analyzer. Analyze this user request and provide a comprehensive understanding in JSON format.
+        scheduled = sum(len(stage) for stage in stages)
+        if scheduled < len(planned):
+            cyclic = [capability.value for capability in planned if pending[capability] > 0]
+            raise CapabilityCycleError(f"Capability dependencies form a cycle among: {', '.join(cyclic)}")
+        
+        # Longest path through the DAG, walked in topological order
+        finish_times: Dict[CapabilityCategory, float] = {}
+        predecessor: Dict[CapabilityCategory, Optional[CapabilityCategory]] = {}
+        for stage in stages:
+            for capability in stage:
+                slowest = max(depends_on[capability], key=lambda dep: finish_times[dep], default=None)
+                predecessor[capability] = slowest
+                finish_times[capability] = durations[capability] + (finish_times[slowest] if slowest else 0.0)
+        
+        critical_path: List[CapabilityCategory] = []
+        tail = max(finish_times, key=finish_times.get, default=None)
+        while tail is not None:
+            critical_path.append(tail)
+            tail = predecessor[tail]
+        critical_path.reverse()
+        
+        plan = ExecutionDAGPlan(
+            stages=tuple(stages),
+            critical_path=tuple(critical_path),
+            critical_path_seconds=finish_times[critical_path[-1]] if critical_path else 0.0,
+            total_duration_seconds=sum(durations.values()),
+            unsatisfied_dependencies=unsatisfied,
+            dependencies={capability: tuple(dep for dep in planned if dep in depends_on[capability]) for capability in planned}
+        )
+        if len(self._plan_cache) >= self.PLAN_CACHE_SIZE:
+            self._plan_cache.pop(next(iter(self._plan_cache)))
+        self._plan_cache[cache_key] = plan
+        return plan
+    
+    def resolve_dependencies(self, capabilities: List[CapabilityCategory]) -> List[CapabilityCategory]:
+        """Resolve capability dependencies to a flat execution order (stages flattened)."""
+        try:
+            return list(self.plan_execution(capabilities).order)
+        except CapabilityCycleError as e:
+            logger.error(f"{e}, falling back to request order")
+            return [capability for capability in dict.fromkeys(capabilities) if self.get_agents_for_capability(capability)]
 
-USER REQUEST: "{user_request}"{context_str}
+
+CAPABILITY_DESCRIPTIONS: Dict[CapabilityCategory, str] = {
+    CapabilityCategory.BRAND_CREATION: "Creating brand strategy, messaging, and identity",
+    CapabilityCategory.LOGO_GENERATION: "Designing logos and visual brand assets",
+    CapabilityCategory.MARKET_ANALYSIS: "Market research, competitor analysis, trend identification", 
+    CapabilityCategory.WEBSITE_BUILDING: "Building responsive websites with modern design",
+    CapabilityCategory.SALES_OUTREACH: "Creating sales materials and outreach campaigns",
+    CapabilityCategory.LEAD_GENERATION: "Finding and mining new leads, prospect discovery, Apollo integration for lead generation",
+    CapabilityCategory.CONTENT_CREATION: "Writing basic copy, blog posts, social content",
+    CapabilityCategory.CONTENT_MARKETING: "Comprehensive marketing campaigns, content strategy, SEO optimization, content calendars, marketing automation, and content distribution across channels",
+    CapabilityCategory.DATA_ANALYSIS: "Analyzing data and creating insights",
+    CapabilityCategory.DESIGN_SERVICES: "Visual design and creative services",
+    CapabilityCategory.TECHNICAL_IMPLEMENTATION: "Technical development and implementation",
+    CapabilityCategory.SOCIAL_MONITORING: "Social media monitoring and sentiment analysis",
+    CapabilityCategory.LINKEDIN_AUTOMATION: "LinkedIn scraping, viral post analysis, prospect identification, and engagement tracking",
+    CapabilityCategory.COMMUNICATION_MONITORING: "Email, WhatsApp, LinkedIn message monitoring and filtering",
+    CapabilityCategory.EMAIL_ORCHESTRATION: "Advanced email sequences, AI personalization, send optimization, reply detection, bounce handling, email warming, and comprehensive analytics",
+    CapabilityCategory.CRM_OPERATIONS: "Bi-directional CRM sync (HubSpot, Salesforce, Pipedrive), AI-powered deduplication, field mapping, conflict resolution, and cross-agent collaboration",
+    CapabilityCategory.ICP_GENERATION: "Creating Ideal Customer Profile (ICP) based on existing customer analysis, not for finding new leads"
+}
+
+
+class SemanticPromptTemplate:
+    """
+    Pre-rendered semantic analysis prompt.
+
+    The instructions, capability table, agent table and JSON schema never
+    change between requests, so they are rendered once per registry version
+    into a static prefix. Per-request content (the user request and
+    conversation context) goes after it, which keeps the prefix byte-identical
+    for provider prompt-prefix caching.
+    """
+    
+    TEMPLATE_REVISION = "2"
+    
+    STATIC_TEMPLATE = """
+You are a semantic business request analyzer. Analyze this user request and provide a comprehensive understanding in JSON format.
 
 Available Capabilities:
-{json.dumps({cap.value: desc for cap, desc in capability_descriptions.items()}, indent=2)}
+{capabilities_json}
 
 Available Agents:
-{json.dumps(self._get_agent_descriptions(), indent=2)}
+{agents_json}
 
 IMPORTANT ROUTING RULES:
 1. "generate ICP", "ideal customer profile", "analyze my customers" → ICP_GENERATION (icp_generator_agent)
@@ -479,16 +683,575 @@ and provide helpful suggestions for what the user might want instead. Include "o
 in the execution_plan and suggest the closest available capabilities.
 """
 
+    def __init__(self, registry: "CapabilityAgentRegistry"):
+        self.registry_version = registry.version
+        capabilities_json = json.dumps({cap.value: desc for cap, desc in CAPABILITY_DESCRIPTIONS.items()}, indent=2)
+        agents_json = json.dumps(registry.get_agent_descriptions(), indent=2)
+        self.static_prefix = self.STATIC_TEMPLATE.format(
+            capabilities_json=capabilities_json,
+            agents_json=agents_json
+        )
+        self.version = hashlib.sha256(
+            f"{self.TEMPLATE_REVISION}:{self.registry_version}:{self.static_prefix}".encode()
+        ).hexdigest()[:12]
+    
+    @staticmethod
+    def _serialize_context(context: Dict[str, Any]) -> str:
+        """JSON for the prompt; rolling summaries and session snapshots render themselves."""
+        def default(value: Any) -> Any:
+            if hasattr(value, "render"):
+                return value.render()
+            if hasattr(value, "to_dict"):
+                return value.to_dict()
+            return str(value)
+        return json.dumps(context, indent=2, default=default)
+    
+    def render(self, user_request: str, context: Optional[Dict[str, Any]] = None) -> str:
+        """Render the full prompt for one request."""
+        context_str = ""
+        if context:
+            context_str = f"\nConversation Context: {self._serialize_context(context)}"
+        return f"""{self.static_prefix}
+USER REQUEST: "{user_request}"{context_str}
+"""
+    
+    def render_batch(self, user_requests: List[str], context: Optional[Dict[str, Any]] = None) -> str:
+        """Render one prompt that analyzes several independent requests."""
+        context_str = ""
+        if context:
+            context_str = f"\nConversation Context (shared by all requests): {self._serialize_context(context)}"
+        numbered_requests = "\n".join(
+            f'[{index}] USER REQUEST: "{user_request}"' for index, user_request in enumerate(user_requests)
+        )
+        return f"""{self.static_prefix}
+BATCH MODE: Analyze each of the {len(user_requests)} user requests below independently.
+Respond with ONLY a JSON array of exactly {len(user_requests)} objects, in the same order.
+Each object has the fields described above plus "request_index" (the number in brackets before its request).
+{context_str}
+{numbered_requests}
+"""
+
+
+_prompt_templates: Dict[str, SemanticPromptTemplate] = {}
+
+
+def get_prompt_template(registry: "CapabilityAgentRegistry") -> SemanticPromptTemplate:
+    """Get the compiled template for a registry, shared by every parser using that registry version."""
+    template = _prompt_templates.get(registry.version)
+    if template is None:
+        template = SemanticPromptTemplate(registry)
+        _prompt_templates[registry.version] = template
+        logger.debug(f"Compiled semantic prompt template {template.version}")
+    return template
+
+
+_default_registry: Optional[CapabilityAgentRegistry] = None
+_default_registry_lock = threading.Lock()
+
+
+_capability_resolvers: Dict[Tuple[str, int], CapabilityAliasResolver] = {}
+
+
+def get_capability_resolver(registry: CapabilityAgentRegistry) -> CapabilityAliasResolver:
+    """Get the capability resolver compiled for this registry version and alias table, compiling it on first use."""
+    resolver_key = (registry.version, get_alias_revision())
+    resolver = _capability_resolvers.get(resolver_key)
+    if resolver is None:
+        skills = {
+            capability.value: [skill for agent in agents for skill in agent.specific_skills]
+            for capability, agents in registry.capability_map.items()
+        }
+        resolver = CapabilityAliasResolver((capability.value for capability in CapabilityCategory), skills=skills)
+        _capability_resolvers[resolver_key] = resolver
+    return resolver
+
+
+def get_default_registry() -> CapabilityAgentRegistry:
+    """Get the process-wide capability registry, building it on first use."""
+    global _default_registry
+    if _default_registry is None:
+        with _default_registry_lock:
+            if _default_registry is None:
+                _default_registry = CapabilityAgentRegistry()
+    return _default_registry
+
+
+class SemanticRequestParser:
+    """
+    Semantic parser that replaces IntentParser with single AI call approach.
+    
+    Makes ONE comprehensive AI call to understand business context, map to capabilities,
+    and create execution plan - eliminating multiple classification steps.
+    """
+    
+    def __init__(
+        self,
+        ai_engine: Optional[AnthropicEngine] = None,
+        fast_path_classifier=None,
+        registry: Optional[CapabilityAgentRegistry] = None,
+        intent_cache: Optional[IntentCache] = None
+    ):
+        self.ai_engine = ai_engine or AnthropicEngine(AIEngineConfig())
+        self.registry = registry or get_default_registry()
+        self._prompt_template: Optional[SemanticPromptTemplate] = None
+        # Optional FastPathIntentClassifier that answers clear requests without an LLM call
+        self.fast_path_classifier = fast_path_classifier
+        # Understandings produced by a combined response-analysis call, keyed by
+        # (session, understanding context fingerprint, request text)
+        self._primed_understandings: "OrderedDict[Tuple[str, str, str], Tuple[float, SemanticUnderstanding]]" = OrderedDict()
+        # Optional IntentCache shared with the response analyzer; skips the LLM for recurring requests
+        self.intent_cache = intent_cache
+        self.batch_stats = {"packs": 0, "batched_requests": 0, "reissued_requests": 0}
+    
+    PRIMED_UNDERSTANDING_TTL_SECONDS = 60
+    PRIMED_UNDERSTANDING_MAX_ENTRIES = 256
+    
+    # Batch parsing: each pack's request text plus expected output must fit the token budget
+    BATCH_TOKEN_BUDGET = 8000
+    BATCH_ESTIMATED_OUTPUT_TOKENS = 450  # per analyzed request
+    BATCH_ITEM_OVERHEAD_TOKENS = 12  # "[n] USER REQUEST:" framing
+    BATCH_MAX_CONCURRENCY = 4
+    
+    @staticmethod
+    def _primed_key(user_request: str, conversation_context: Optional[Dict[str, Any]]) -> Tuple[str, str, str]:
+        """Primes only match the same session and business context, never just the same text."""
+        return (
+            IntentCache.session_of(conversation_context),
+            understanding_context_fingerprint(conversation_context),
+            user_request
+        )
+    
+    def prime_understanding(
+        self,
+        user_request: str,
+        understanding: SemanticUnderstanding,
+        conversation_context: Optional[Dict[str, Any]] = None
+    ):
+        """Hand over an understanding already computed for this request (combined analysis mode)."""
+        now = time.monotonic()
+        # Drop primes nobody parsed in time before adding this one
+        while self._primed_understandings:
+            primed_at, _ = next(iter(self._primed_understandings.values()))
+            if now - primed_at <= self.PRIMED_UNDERSTANDING_TTL_SECONDS:
+                break
+            self._primed_understandings.popitem(last=False)
+        
+        key = self._primed_key(user_request, conversation_context)
+        self._primed_understandings[key] = (now, understanding)
+        self._primed_understandings.move_to_end(key)
+        while len(self._primed_understandings) > self.PRIMED_UNDERSTANDING_MAX_ENTRIES:
+            self._primed_understandings.popitem(last=False)
+    
+    def _take_primed_understanding(
+        self,
+        user_request: str,
+        conversation_context: Optional[Dict[str, Any]]
+    ) -> Optional[SemanticUnderstanding]:
+        """Pop a fresh understanding primed for this request in this session and context, if any."""
+        primed = self._primed_understandings.pop(self._primed_key(user_request, conversation_context), None)
+        if not primed:
+            return None
+        primed_at, understanding = primed
+        if time.monotonic() - primed_at > self.PRIMED_UNDERSTANDING_TTL_SECONDS:
+            return None
+        return understanding
+    
+    def _get_cached_understanding(
+        self,
+        user_request: str,
+        conversation_context: Optional[Dict[str, Any]]
+    ) -> Optional[SemanticUnderstanding]:
+        """Cached understanding for a recurring request, re-planned if the registry changed."""
+        if not self.intent_cache:
+            return None
+        cached = self.intent_cache.get("understanding", user_request, conversation_context)
+        if cached is None:
+            return None
+        understanding, registry_version = cached
+        if registry_version != self.registry.version:
+            return None
+        return understanding
+    
+    def cache_understanding(
+        self,
+        user_request: str,
+        conversation_context: Optional[Dict[str, Any]],
+        understanding: SemanticUnderstanding
+    ):
+        """Remember a successful AI understanding; fallbacks and parse failures are never cached."""
+        if not self.intent_cache or "error" in understanding.execution_plan:
+            return
+        self.intent_cache.put(
+            "understanding", user_request, conversation_context, (understanding, self.registry.version)
+        )
+    
+    # The off-key fallback makes a second AI call; only worth it with this much time left
+    FALLBACK_AI_MIN_SECONDS = 3.0
+    
+    async def parse_request(
+        self,
+        user_request: str,
+        conversation_context: Optional[Dict[str, Any]] = None,
+        deadline_seconds: Optional[float] = None
+    ) -> SemanticUnderstanding:
+        """
+        Parse user request with single AI call for complete semantic understanding.
+        
+        Args:
+            user_request: The user's natural language request
+            conversation_context: Previous conversation context if available
+            deadline_seconds: Latency budget; tightens any deadline already set by the caller
+        
+        Returns:
+            SemanticUnderstanding: Complete understanding and execution plan
+        """
+        with deadline_scope(deadline_seconds):
+            return await self._parse_request(user_request, conversation_context)
+    
+    async def _parse_request(self, user_request: str, conversation_context: Optional[Dict[str, Any]]) -> SemanticUnderstanding:
+        try:
+            # Reuse the understanding from a combined response-analysis call
+            primed_understanding = self._take_primed_understanding(user_request, conversation_context)
+            if primed_understanding:
+                return primed_understanding
+            
+            # Recurring request with the same business context
+            cached_understanding = self._get_cached_understanding(user_request, conversation_context)
+            if cached_understanding:
+                return cached_understanding
+            
+            # Local fast path for clear single-capability requests
+            if self.fast_path_classifier:
+                fast_understanding = self.fast_path_classifier.classify(user_request)
+                if fast_understanding:
+                    return await self._enhance_with_capability_mapping(fast_understanding)
+            
+            # Build comprehensive prompt for single AI analysis
+            analysis_prompt = self._build_semantic_analysis_prompt(user_request, conversation_context)
+            
+            # Single AI call for complete understanding
+            response = await self.ai_engine.generate(analysis_prompt)
+            
+            # Extract text content if response is an AIResponse object
+            if hasattr(response, 'content'):
+                response_text = response.content
+            else:
+                response_text = str(response)
+            
+            # Parse the structured response
+            understanding = self._parse_ai_response(response_text, user_request)
+            
+            # Log confident parses as fast-path training examples
+            if self.fast_path_classifier:
+                self.fast_path_classifier.observe(user_request, understanding)
+            
+            # Enhance with capability mapping
+            understanding = await self._enhance_with_capability_mapping(understanding)
+            self.cache_understanding(user_request, conversation_context, understanding)
+            
+            return understanding
+        
+        except DeadlineExceeded as e:
+            deadline_misses.record("semantic_parser")
+            logger.warning(f"Semantic parse missed its deadline: {e}")
+            return self._create_local_fallback(user_request, str(e))
+        except Exception as e:
+            logger.error(f"Failed to parse request semantically: {e}")
+            # Return intelligent fallback understanding
+            return await self._create_intelligent_fallback(user_request, str(e))
+    
+    # Fields after the capability lists in the prompt schema; seeing one means the lists are final
+    CAPABILITY_FIELDS = ("primary_capabilities", "secondary_capabilities")
+    POST_CAPABILITY_FIELDS = ("recommended_agents", "execution_strategy", "execution_plan")
+    
+    async def _notify_capabilities_ready(
+        self,
+        provisional: SemanticUnderstanding,
+        on_capabilities: Optional[Callable[[SemanticUnderstanding], Any]]
+    ) -> SemanticUnderstanding:
+        """Map a provisional understanding to agents and hand it to the listener (sync or async)."""
+        provisional = await self._enhance_with_capability_mapping(provisional)
+        if on_capabilities:
+            try:
+                outcome = on_capabilities(provisional)
+                if inspect.isawaitable(outcome):
+                    await outcome
+            except Exception as e:
+                logger.warning(f"Capability listener failed: {e}")
+        return provisional
+    
+    async def parse_request_streaming(
+        self,
+        user_request: str,
+        conversation_context: Optional[Dict[str, Any]] = None,
+        on_capabilities: Optional[Callable[[SemanticUnderstanding], Any]] = None,
+        deadline_seconds: Optional[float] = None
+    ) -> SemanticUnderstanding:
+        """
+        Parse a request from a streamed AI response, acting on capabilities early.
+        
+        The response is decoded field by field as it streams. As soon as the
+        capability lists are complete, a provisional understanding is mapped to
+        agents and passed to on_capabilities while the rest of the JSON is still
+        being generated. The listener takes the understanding as its only
+        argument and may be sync or async; PlanExecutor.capability_listener(session_id)
+        gives one that warms up the plan's agents. Primed, cached and fast-path
+        understandings notify the listener immediately. Engines without
+        streaming support fall back to a single delta. deadline_seconds
+        tightens any deadline already set by the caller, as in parse_request.
+        
+        Returns:
+            SemanticUnderstanding: The final understanding, as parse_request would return it
+        """
+        with deadline_scope(deadline_seconds):
+            return await self._parse_request_streaming(user_request, conversation_context, on_capabilities)
+    
+    async def _parse_request_streaming(
+        self,
+        user_request: str,
+        conversation_context: Optional[Dict[str, Any]],
+        on_capabilities: Optional[Callable[[SemanticUnderstanding], Any]]
+    ) -> SemanticUnderstanding:
+        if not hasattr(self.ai_engine, "generate_streaming"):
+            understanding = await self.parse_request(user_request, conversation_context)
+            if on_capabilities:
+                await self._notify_capabilities_ready(understanding, on_capabilities)
+            return understanding
+        
+        early_task: Optional[asyncio.Task] = None
+        try:
+            early_understanding = (
+                self._take_primed_understanding(user_request, conversation_context)
+                or self._get_cached_understanding(user_request, conversation_context)
+            )
+            if not early_understanding and self.fast_path_classifier:
+                early_understanding = self.fast_path_classifier.classify(user_request)
+            if early_understanding:
+                return await self._notify_capabilities_ready(early_understanding, on_capabilities)
+            
+            analysis_prompt = self._build_semantic_analysis_prompt(user_request, conversation_context)
+            json_parser = IncrementalJSONObjectParser()
+            stream_start = time.perf_counter()
+            capabilities_ready_seconds = None
+            
+            def on_delta(delta: str):
+                nonlocal early_task, capabilities_ready_seconds
+                json_parser.feed(delta)
+                if early_task is not None:
+                    return
+                fields = json_parser.fields
+                if json_parser.has_fields(*self.CAPABILITY_FIELDS) or (
+                    "primary_capabilities" in fields and any(key in fields for key in self.POST_CAPABILITY_FIELDS)
+                ):
+                    capabilities_ready_seconds = time.perf_counter() - stream_start
+                    provisional = self._understanding_from_data(dict(fields), user_request)
+                    provisional.execution_plan = {**provisional.execution_plan, "provisional": True}
+                    early_task = asyncio.ensure_future(self._notify_capabilities_ready(provisional, on_capabilities))
+            
+            response = await self.ai_engine.generate_streaming(analysis_prompt, callback=on_delta)
+            generation_seconds = time.perf_counter() - stream_start
+            response_text = response.content if hasattr(response, 'content') else str(response)
+            
+            understanding = self._parse_ai_response(response_text, user_request)
+            if self.fast_path_classifier:
+                self.fast_path_classifier.observe(user_request, understanding)
+            understanding = await self._enhance_with_capability_mapping(understanding)
+            self.cache_understanding(user_request, conversation_context, understanding)
+            
+            early_matched = False
+            if early_task is not None:
+                provisional = await early_task
+                early_matched = provisional.recommended_agents == understanding.recommended_agents
+            else:
+                # Capabilities never completed early (or the engine sent one delta); notify now
+                await self._notify_capabilities_ready(understanding, on_capabilities)
+            
+            understanding.execution_plan["streaming"] = {
+                "capabilities_ready_seconds": round(capabilities_ready_seconds, 4) if capabilities_ready_seconds is not None else None,
+                "generation_seconds": round(generation_seconds, 4),
+                "early_agents_matched": early_matched
+            }
+            return understanding
+        
+        except DeadlineExceeded as e:
+            deadline_misses.record("semantic_parser")
+            logger.warning(f"Streamed semantic parse missed its deadline: {e}")
+            return self._create_local_fallback(user_request, str(e))
+        except Exception as e:
+            logger.error(f"Failed to parse streamed request semantically: {e}")
+            return await self._create_intelligent_fallback(user_request, str(e))
+        finally:
+            # A failed parse must not leave the listener acting on its agents, or its errors unretrieved
+            if early_task is not None:
+                if not early_task.done():
+                    early_task.cancel()
+                try:
+                    await early_task
+                except (asyncio.CancelledError, Exception):
+                    pass
+    
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """Rough token estimate (~4 characters per token)."""
+        return len(text) // 4 + 1
+    
+    def _pack_requests(self, indexed_requests: List[Tuple[int, str]], token_budget: int) -> List[List[Tuple[int, str]]]:
+        """Greedily pack requests in order so each pack's input and expected output fit the budget."""
+        packs: List[List[Tuple[int, str]]] = []
+        current: List[Tuple[int, str]] = []
+        current_tokens = 0
+        for index, user_request in indexed_requests:
+            item_tokens = (self._estimate_tokens(user_request) + self.BATCH_ITEM_OVERHEAD_TOKENS
+                           + self.BATCH_ESTIMATED_OUTPUT_TOKENS)
+            if current and current_tokens + item_tokens > token_budget:
+                packs.append(current)
+                current, current_tokens = [], 0
+            # An oversized request still gets a pack of its own
+            current.append((index, user_request))
+            current_tokens += item_tokens
+        if current:
+            packs.append(current)
+        return packs
+    
+    def _parse_batch_response(self, response_text: str, pack: List[Tuple[int, str]]) -> Dict[int, SemanticUnderstanding]:
+        """Split a batch response back into understandings; missing or invalid items are left out."""
+        text = response_text.strip()
+        if text.startswith('```'):
+            text = text.split('\n', 1)[1] if '\n' in text else text[3:]
+            text = text.rsplit('```', 1)[0]
+        start, end = text.find('['), text.rfind(']') + 1
+        if start == -1 or end <= start:
+            raise ValueError("No JSON array found in batch response")
+        items = json.loads(text[start:end])
+        if not isinstance(items, list):
+            raise ValueError("Batch response is not a JSON array")
+        
+        parsed: Dict[int, SemanticUnderstanding] = {}
+        for position, item in enumerate(items):
+            if not isinstance(item, dict):
+                continue
+            pack_position = item.get("request_index", position)
+            if not isinstance(pack_position, int) or not 0 <= pack_position < len(pack) or pack_position in parsed:
+                continue
+            # Items without a goal or any routing are treated as failed and re-issued
+            if not item.get("business_goal") or not (item.get("primary_capabilities") or item.get("recommended_agents")):
+                continue
+            try:
+                parsed[pack_position] = self._understanding_from_data(item, pack[pack_position][1])
+            except Exception as e:
+                logger.debug(f"Dropping unparseable batch item {pack_position}: {e}")
+        return parsed
+    
+    async def _parse_pack(
+        self,
+        pack: List[Tuple[int, str]],
+        conversation_context: Optional[Dict[str, Any]],
+        semaphore: asyncio.Semaphore
+    ) -> Dict[int, SemanticUnderstanding]:
+        """Analyze one pack with a single AI call, re-issuing failed items individually."""
+        parsed: Dict[int, SemanticUnderstanding] = {}
+        if len(pack) > 1:
+            async with semaphore:
+                try:
+                    prompt = self._get_prompt_template().render_batch([request for _, request in pack], conversation_context)
+                    response = await self.ai_engine.generate(
+                        prompt, max_tokens=len(pack) * self.BATCH_ESTIMATED_OUTPUT_TOKENS
+                    )
+                    response_text = response.content if hasattr(response, 'content') else str(response)
+                    parsed = self._parse_batch_response(response_text, pack)
+                except Exception as e:
+                    logger.warning(f"Batch parse of {len(pack)} requests failed, re-issuing individually: {e}")
+            self.batch_stats["packs"] += 1
+            self.batch_stats["batched_requests"] += len(parsed)
+        
+        results: Dict[int, SemanticUnderstanding] = {}
+        for pack_position, understanding in parsed.items():
+            index, user_request = pack[pack_position]
+            if self.fast_path_classifier:
+                self.fast_path_classifier.observe(user_request, understanding)
+            results[index] = await self._enhance_with_capability_mapping(understanding)
+            self.cache_understanding(user_request, conversation_context, results[index])
+        
+        missing = [(index, user_request) for pack_position, (index, user_request) in enumerate(pack) if pack_position not in parsed]
+        if missing and len(pack) > 1:
+            self.batch_stats["reissued_requests"] += len(missing)
+        
+        async def parse_single(index: int, user_request: str):
+            async with semaphore:
+                results[index] = await self.parse_request(user_request, conversation_context)
+        
+        await asyncio.gather(*[parse_single(index, user_request) for index, user_request in missing])
+        return results
+    
+    async def parse_requests(
+        self,
+        user_requests: List[str],
+        conversation_context: Optional[Dict[str, Any]] = None,
+        token_budget: Optional[int] = None,
+        max_concurrency: Optional[int] = None
+    ) -> List[SemanticUnderstanding]:
+        """
+        Parse a backlog of independent requests with as few AI calls as possible.
+        
+        Requests answered by a primed understanding, the intent cache or the
+        fast path skip the AI entirely. The rest are packed into prompts capped by token_budget,
+        each answered with a per-request JSON array, and packs run concurrently.
+        Items missing from or invalid in a batch response are re-issued
+        through parse_request.
+        
+        Returns:
+            List[SemanticUnderstanding]: One understanding per request, in input order
+        """
+        results: Dict[int, SemanticUnderstanding] = {}
+        pending: List[Tuple[int, str]] = []
+        
+        for index, user_request in enumerate(user_requests):
+            primed_understanding = self._take_primed_understanding(user_request, conversation_context)
+            if primed_understanding:
+                results[index] = primed_understanding
+                continue
+            cached_understanding = self._get_cached_understanding(user_request, conversation_context)
+            if cached_understanding:
+                results[index] = cached_understanding
+                continue
+            if self.fast_path_classifier:
+                fast_understanding = self.fast_path_classifier.classify(user_request)
+                if fast_understanding:
+                    results[index] = await self._enhance_with_capability_mapping(fast_understanding)
+                    continue
+            pending.append((index, user_request))
+        
+        packs = self._pack_requests(pending, token_budget or self.BATCH_TOKEN_BUDGET)
+        semaphore = asyncio.Semaphore(max_concurrency or self.BATCH_MAX_CONCURRENCY)
+        for pack_results in await asyncio.gather(*[
+            self._parse_pack(pack, conversation_context, semaphore) for pack in packs
+        ]):
+            results.update(pack_results)
+        
+        logger.info(
+            f"Parsed {len(user_requests)} requests: {len(user_requests) - len(pending)} without AI, "
+            f"{len(pending)} in {len(packs)} packs"
+        )
+        return [results[index] for index in range(len(user_requests))]
+    
+    def _get_prompt_template(self) -> "SemanticPromptTemplate":
+        """Get the compiled prompt template, recompiling only when the registry changes."""
+        if self._prompt_template is None or self._prompt_template.registry_version != self.registry.version:
+            self._prompt_template = get_prompt_template(self.registry)
+        return self._prompt_template
+    
+    @property
+    def prompt_version(self) -> str:
+        """Version hash of the current semantic analysis prompt."""
+        return self._get_prompt_template().version
+    
+    def _build_semantic_analysis_prompt(self, user_request: str, context: Optional[Dict[str, Any]]) -> str:
+        """Build comprehensive prompt for semantic analysis."""
+        return self._get_prompt_template().render(user_request, context)
+
     def _get_agent_descriptions(self) -> Dict[str, str]:
         """Get descriptions of available agents."""
-        descriptions = {}
-        for capabilities in self.registry.capability_map.values():
-            for agent_cap in capabilities:
-                descriptions[agent_cap.agent_id] = {
-                    "capability": agent_cap.capability_category.value,
-                    "skills": agent_cap.specific_skills
-                }
-        return descriptions
+        return self.registry.get_agent_descriptions()
 
     def _parse_execution_strategy(self, strategy_value: str) -> ExecutionStrategy:
         """Parse execution strategy with fallback for invalid values."""
@@ -521,69 +1284,16 @@ in the execution_plan and suggest the closest available capabilities.
         if not capabilities_list:
             return parsed_capabilities
         
+        resolver = get_capability_resolver(self.registry)
         for cap in capabilities_list:
             if not cap or cap in ['none', 'null', '']:
                 continue
                 
-            try:
-                # Try to parse as CapabilityCategory
-                parsed_cap = CapabilityCategory(cap.lower().strip())
-                parsed_capabilities.append(parsed_cap)
-            except ValueError:
-                # Try to map common variations
-                capability_mapping = {
-                    'branding': CapabilityCategory.BRAND_CREATION,
-                    'brand': CapabilityCategory.BRAND_CREATION,
-                    'logo': CapabilityCategory.LOGO_GENERATION,
-                    'logos': CapabilityCategory.LOGO_GENERATION,
-                    'market': CapabilityCategory.MARKET_ANALYSIS,
-                    'research': CapabilityCategory.MARKET_ANALYSIS,
-                    'website': CapabilityCategory.WEBSITE_BUILDING,
-                    'web': CapabilityCategory.WEBSITE_BUILDING,
-                    'sales': CapabilityCategory.SALES_OUTREACH,
-                    'content': CapabilityCategory.CONTENT_CREATION,
-                    'writing': CapabilityCategory.CONTENT_CREATION,
-                    'design': CapabilityCategory.DESIGN_SERVICES,
-                    'visual': CapabilityCategory.DESIGN_SERVICES,
-                    'leads': CapabilityCategory.LEAD_GENERATION,
-                    'prospects': CapabilityCategory.LEAD_GENERATION,
-                    'prospecting': CapabilityCategory.LEAD_GENERATION,
-                    'lead generation': CapabilityCategory.LEAD_GENERATION,
-                    'lead mining': CapabilityCategory.LEAD_GENERATION,
-                    'find leads': CapabilityCategory.LEAD_GENERATION,
-                    'data': CapabilityCategory.DATA_ANALYSIS,
-                    # MARKETING-SPECIFIC MAPPINGS
-                    'marketing': CapabilityCategory.CONTENT_MARKETING,
-                    'marketing campaign': CapabilityCategory.CONTENT_MARKETING,
-                    'marketing campaigns': CapabilityCategory.CONTENT_MARKETING,
-                    'content marketing': CapabilityCategory.CONTENT_MARKETING,
-                    'content strategy': CapabilityCategory.CONTENT_MARKETING,
-                    'content calendar': CapabilityCategory.CONTENT_MARKETING,
-                    'marketing strategy': CapabilityCategory.CONTENT_MARKETING,
-                    'marketing automation': CapabilityCategory.CONTENT_MARKETING,
-                    'seo': CapabilityCategory.CONTENT_MARKETING,
-                    'seo optimization': CapabilityCategory.CONTENT_MARKETING,
-                    'content distribution': CapabilityCategory.CONTENT_MARKETING,
-                    'marketing materials': CapabilityCategory.CONTENT_MARKETING,
-                    'analysis': CapabilityCategory.DATA_ANALYSIS,
-                    'social': CapabilityCategory.SOCIAL_MONITORING,
-                    'monitoring': CapabilityCategory.SOCIAL_MONITORING,
-                    'mentions': CapabilityCategory.SOCIAL_MONITORING,
-                    'brand monitoring': CapabilityCategory.SOCIAL_MONITORING,
-                    'social listening': CapabilityCategory.SOCIAL_MONITORING,
-                    'competitor tracking': CapabilityCategory.SOCIAL_MONITORING,
-                    'linkedin': CapabilityCategory.LINKEDIN_AUTOMATION,
-                    'linkedin scraping': CapabilityCategory.LINKEDIN_AUTOMATION,
-                    'viral posts': CapabilityCategory.LINKEDIN_AUTOMATION,
-                    'linkedin trends': CapabilityCategory.LINKEDIN_AUTOMATION,
-                    'linkedin content': CapabilityCategory.LINKEDIN_AUTOMATION
-                }
-                
-                cap_lower = cap.lower().strip()
-                if cap_lower in capability_mapping:
-                    parsed_capabilities.append(capability_mapping[cap_lower])
-                else:
-                    logger.warning(f"Unknown capability '{cap}', skipping")
+            capability_value = resolver.resolve(cap) if isinstance(cap, str) else None
+            if capability_value:
+                parsed_capabilities.append(CapabilityCategory(capability_value))
+            else:
+                logger.warning(f"Unknown capability '{cap}', skipping")
         
         # If no valid capabilities found, default to content creation
         if not parsed_capabilities:
@@ -602,89 +1312,141 @@ in the execution_plan and suggest the closest available capabilities.
                 response = response[3:-3].strip()
             
             data = json.loads(response)
-            
-            # FIXED: Ensure business_context is always a dict to prevent AttributeError
-            business_context_raw = data.get("business_context", {})
-            if isinstance(business_context_raw, str):
-                # If AI returned business_context as string, convert to dict
-                business_context = {"description": business_context_raw}
-                logger.warning(f"AI returned business_context as string, converted to dict: {business_context}")
-            elif isinstance(business_context_raw, dict):
-                business_context = business_context_raw
-            else:
-                business_context = {}
-                logger.warning(f"AI returned invalid business_context type {type(business_context_raw)}, using empty dict")
-            
-            return SemanticUnderstanding(
-                business_goal=data.get("business_goal", "Unclear goal"),
-                user_intent_summary=data.get("user_intent_summary", original_request[:100]),
-                business_domain=data.get("business_domain"),
-                urgency_level=data.get("urgency_level", "medium"),
-                
-                primary_capabilities=self._parse_capabilities(data.get("primary_capabilities", [])),
-                secondary_capabilities=self._parse_capabilities(data.get("secondary_capabilities", [])),
-                
-                recommended_agents=data.get("recommended_agents", []),
-                execution_strategy=self._parse_execution_strategy(data.get("execution_strategy", "single_agent")),
-                execution_plan=data.get("execution_plan", {}),
-                
-                extracted_parameters=data.get("extracted_parameters", {}),
-                business_context=business_context,  # Use the validated dict
-                user_preferences=data.get("user_preferences", {}),
-                
-                confidence_score=float(data.get("confidence_score", 0.5)),
-                reasoning=data.get("reasoning", ""),
-                potential_challenges=data.get("potential_challenges", [])
-            )
+            return self._understanding_from_data(data, original_request)
             
         except Exception as e:
             logger.error(f"Failed to parse AI response: {e}")
             logger.debug(f"Raw response: {response}")
             
             # Return minimal fallback
-            return SemanticUnderstanding(
-                business_goal="Failed to parse goal",
-                user_intent_summary=original_request[:100],
-                primary_capabilities=[CapabilityCategory.CONTENT_CREATION],
-                secondary_capabilities=[],
-                recommended_agents=["general_agent"],
-                execution_strategy=ExecutionStrategy.SINGLE_AGENT,
-                execution_plan={"error": "Failed to parse AI response"},
-                extracted_parameters={},
-                business_context={},
-                user_preferences={},
-                confidence_score=0.1,
-                reasoning=f"Parse error: {str(e)}"
-            )
+            return self._create_parse_failure_understanding(original_request, str(e))
+    
+    def _understanding_from_data(self, data: Dict[str, Any], original_request: str) -> SemanticUnderstanding:
+        """Build a SemanticUnderstanding from one decoded analysis object."""
+        # FIXED: Ensure business_context is always a dict to prevent AttributeError
+        business_context_raw = data.get("business_context", {})
+        if isinstance(business_context_raw, str):
+            # If AI returned business_context as string, convert to dict
+            business_context = {"description": business_context_raw}
+            logger.warning(f"AI returned business_context as string, converted to dict: {business_context}")
+        elif isinstance(business_context_raw, dict):
+            business_context = business_context_raw
+        else:
+            business_context = {}
+            logger.warning(f"AI returned invalid business_context type {type(business_context_raw)}, using empty dict")
+        
+        return SemanticUnderstanding(
+            business_goal=data.get("business_goal", "Unclear goal"),
+            user_intent_summary=data.get("user_intent_summary", original_request[:100]),
+            business_domain=data.get("business_domain"),
+            urgency_level=data.get("urgency_level", "medium"),
+            
+            primary_capabilities=self._parse_capabilities(data.get("primary_capabilities", [])),
+            secondary_capabilities=self._parse_capabilities(data.get("secondary_capabilities", [])),
+            
+            recommended_agents=data.get("recommended_agents", []),
+            execution_strategy=self._parse_execution_strategy(data.get("execution_strategy", "single_agent")),
+            execution_plan=data.get("execution_plan", {}),
+            
+            extracted_parameters=data.get("extracted_parameters", {}),
+            business_context=business_context,  # Use the validated dict
+            user_preferences=data.get("user_preferences", {}),
+            
+            confidence_score=float(data.get("confidence_score", 0.5)),
+            reasoning=data.get("reasoning", ""),
+            potential_challenges=data.get("potential_challenges", [])
+        )
+    
+    def _create_parse_failure_understanding(self, original_request: str, error_msg: str) -> SemanticUnderstanding:
+        """Minimal understanding used when the AI response cannot be parsed."""
+        return SemanticUnderstanding(
+            business_goal="Failed to parse goal",
+            user_intent_summary=original_request[:100],
+            primary_capabilities=[CapabilityCategory.CONTENT_CREATION],
+            secondary_capabilities=[],
+            recommended_agents=["general_agent"],
+            execution_strategy=ExecutionStrategy.SINGLE_AGENT,
+            execution_plan={"error": "Failed to parse AI response"},
+            extracted_parameters={},
+            business_context={},
+            user_preferences={},
+            confidence_score=0.1,
+            reasoning=f"Parse error: {error_msg}"
+        )
 
     async def _enhance_with_capability_mapping(self, understanding: SemanticUnderstanding) -> SemanticUnderstanding:
         """Enhance understanding with precise capability-to-agent mapping."""
-        # Resolve dependencies between capabilities
+        # Plan capabilities as a DAG of parallel stages
         all_capabilities = understanding.primary_capabilities + understanding.secondary_capabilities
-        resolved_capabilities = self.registry.resolve_dependencies(all_capabilities)
+        try:
+            plan = self.registry.plan_execution(all_capabilities)
+        except CapabilityCycleError as e:
+            logger.error(f"{e}, falling back to sequential order")
+            plan = None
+        resolved_capabilities = list(plan.order) if plan else self.registry.resolve_dependencies(all_capabilities)
         
         # Map capabilities to best available agents
         enhanced_agents = []
         execution_plan_updates = {}
+        agent_for_capability: Dict[CapabilityCategory, str] = {}
         
         for capability in resolved_capabilities:
             best_agent = self.registry.get_best_agent_for_capability(
                 capability, understanding.business_context
             )
-            if best_agent and best_agent.agent_id not in enhanced_agents:
+            if not best_agent:
+                continue
+            agent_for_capability[capability] = best_agent.agent_id
+            if best_agent.agent_id not in enhanced_agents:
                 enhanced_agents.append(best_agent.agent_id)
                 execution_plan_updates[best_agent.agent_id] = {
                     "capability": capability.value,
                     "estimated_duration": best_agent.estimated_duration,
+                    "expected_duration": self.registry.expected_duration(best_agent),
+                    "selection_score": round(self.registry.score_agent(best_agent, understanding.business_context), 3),
                     "requirements": best_agent.execution_requirements
                 }
         
+        # Agents per stage; an agent serving several capabilities runs once, in its earliest stage
+        parallel_stages = []
+        staged_agents = set()
+        for stage in (plan.stages if plan else [(capability,) for capability in resolved_capabilities]):
+            stage_agents = []
+            for capability in stage:
+                agent_id = agent_for_capability.get(capability)
+                if agent_id and agent_id not in staged_agents:
+                    staged_agents.add(agent_id)
+                    stage_agents.append(agent_id)
+            if stage_agents:
+                parallel_stages.append(stage_agents)
+        
+        # Upstream agents each agent needs, so the executor can skip dependents of a failed agent
+        agent_dependencies: Dict[str, List[str]] = {agent_id: [] for agent_id in enhanced_agents}
+        for capability, dependencies in (plan.dependencies if plan else {}).items():
+            agent_id = agent_for_capability.get(capability)
+            if agent_id is None:
+                continue
+            for dependency in dependencies:
+                upstream = agent_for_capability.get(dependency)
+                if upstream and upstream != agent_id and upstream not in agent_dependencies[agent_id]:
+                    agent_dependencies[agent_id].append(upstream)
+        if not plan:
+            # Sequential fallback order: each agent waits for the one before it
+            ordered = [agent_id for stage in parallel_stages for agent_id in stage]
+            for previous, agent_id in zip(ordered, ordered[1:]):
+                agent_dependencies[agent_id] = [previous]
+        
         # Update the understanding with enhanced mappings if we have better ones
         if enhanced_agents:
             understanding.recommended_agents = enhanced_agents
         understanding.execution_plan.update({
             "agent_mappings": execution_plan_updates,
-            "resolved_capability_order": [cap.value for cap in resolved_capabilities]
+            "resolved_capability_order": [cap.value for cap in resolved_capabilities],
+            "parallel_stages": parallel_stages,
+            "agent_dependencies": agent_dependencies,
+            "capability_stages": plan.to_dict()["stages"] if plan else [[cap.value] for cap in resolved_capabilities],
+            "critical_path": [cap.value for cap in plan.critical_path] if plan else [],
+            "critical_path_seconds": plan.critical_path_seconds if plan else None
         })
         
         return understanding
@@ -712,14 +1474,15 @@ in the execution_plan and suggest the closest available capabilities.
     
     def _agent_exists(self, agent_id: str) -> bool:
         """Check if an agent is registered in the capability registry."""
-        for capabilities in self.registry.capability_map.values():
-            for agent_cap in capabilities:
-                if agent_cap.agent_id == agent_id:
-                    return True
-        return False
+        return self.registry.has_agent(agent_id)
     
     async def _create_intelligent_fallback(self, user_request: str, error_msg: str) -> SemanticUnderstanding:
         """Create intelligent fallback when parsing fails or request is off-key."""
+        if not has_time_for(self.FALLBACK_AI_MIN_SECONDS):
+            deadline_misses.record("semantic_fallback")
+            logger.warning("Not enough time before deadline for an AI fallback, using local fallback")
+            return self._create_local_fallback(user_request, error_msg)
+        
         try:
             # Try to use AI to provide helpful suggestions even for off-key requests
             fallback_prompt = f"""
@@ -760,7 +1523,7 @@ Respond with JSON:
 }}
 """
             
-            response = await self.ai_engine.generate(fallback_prompt)
+            response = await run_within_deadline(self.ai_engine.generate(fallback_prompt), "semantic_fallback")
             
             # Extract text content if response is an AIResponse object
             if hasattr(response, 'content'):
@@ -780,24 +1543,28 @@ Respond with JSON:
         except Exception as e:
             logger.error(f"Intelligent fallback also failed: {e}")
             # Final fallback
-            return SemanticUnderstanding(
-                business_goal="I don't fully understand this request",
-                user_intent_summary=user_request[:100],
-                primary_capabilities=[],
-                secondary_capabilities=[],
-                recommended_agents=[],
-                execution_strategy=ExecutionStrategy.SINGLE_AGENT,
-                execution_plan={
-                    "off_key_request": True,
-                    "suggestion": "Could you rephrase your request? I specialize in logos, branding, market research, websites, and sales materials.",
-                    "available_alternatives": ["logo_generation", "brand_creation", "market_analysis", "website_building", "sales_outreach"]
-                },
-                extracted_parameters={},
-                business_context={},
-                user_preferences={},
-                confidence_score=0.1,
-                reasoning=f"Request unclear. Available services: logos, branding, market research, websites, sales materials. Error: {error_msg}"
-            )
+            return self._create_local_fallback(user_request, error_msg)
+    
+    def _create_local_fallback(self, user_request: str, error_msg: str) -> SemanticUnderstanding:
+        """Final fallback built without any AI call."""
+        return SemanticUnderstanding(
+            business_goal="I don't fully understand this request",
+            user_intent_summary=user_request[:100],
+            primary_capabilities=[],
+            secondary_capabilities=[],
+            recommended_agents=[],
+            execution_strategy=ExecutionStrategy.SINGLE_AGENT,
+            execution_plan={
+                "off_key_request": True,
+                "suggestion": "Could you rephrase your request? I specialize in logos, branding, market research, websites, and sales materials.",
+                "available_alternatives": ["logo_generation", "brand_creation", "market_analysis", "website_building", "sales_outreach"]
+            },
+            extracted_parameters={},
+            business_context={},
+            user_preferences={},
+            confidence_score=0.1,
+            reasoning=f"Request unclear. Available services: logos, branding, market research, websites, sales materials. Error: {error_msg}"
+        )
 
 
 # Example usage and testing
@@ -820,7 +1587,61 @@ if __name__ == "__main__":
             print(f"Agents: {understanding.recommended_agents}")
             print(f"Confidence: {understanding.confidence_score}")
     
+    def benchmark_prompt_build(iterations: int = 2000):
+        """Microbenchmark parser construction and per-request prompt build time."""
+        import timeit
+        
+        canned_response = json.dumps({
+            "business_goal": "Generate leads for fintech companies",
+            "user_intent_summary": "Lead generation for fintech",
+            "primary_capabilities": ["lead_generation"],
+            "secondary_capabilities": [],
+            "recommended_agents": [],
+            "execution_strategy": "single_agent",
+            "execution_plan": {},
+            "extracted_parameters": {"target_market": "fintech"},
+            "business_context": {"industry": "fintech"},
+            "user_preferences": {},
+            "confidence_score": 0.9,
+            "reasoning": "Lead generation requested"
+        })
+        
+        class _CannedEngine:
+            async def generate(self, prompt, **kwargs):
+                return canned_response
+        
+        logging.disable(logging.INFO)
+        context = {"conversation_history": [{"role": "user", "content": "We sell to fintech startups"}]}
+        
+        registry_build = timeit.timeit(CapabilityAgentRegistry, number=200) / 200
+        parser_construction = timeit.timeit(lambda: SemanticRequestParser(_CannedEngine()), number=iterations) / iterations
+        
+        parser = SemanticRequestParser(_CannedEngine())
+        parser._build_semantic_analysis_prompt("warm up", context)
+        prompt_build = timeit.timeit(
+            lambda: parser._build_semantic_analysis_prompt("Generate leads for fintech companies", context),
+            number=iterations
+        ) / iterations
+        template_compile = timeit.timeit(lambda: SemanticPromptTemplate(parser.registry), number=200) / 200
+        
+        async def parse_many():
+            for _ in range(iterations):
+                await parser.parse_request("Generate leads for fintech companies", context)
+        
+        parse_start = time.perf_counter()
+        asyncio.run(parse_many())
+        full_parse = (time.perf_counter() - parse_start) / iterations
+        
+        print(f"Registry build (once per process):   {registry_build * 1e6:9.1f} us")
+        print(f"Parser construction (shared registry):{parser_construction * 1e6:9.1f} us")
+        print(f"Template compile (once per version): {template_compile * 1e6:9.1f} us")
+        print(f"Per-request prompt build:            {prompt_build * 1e6:9.1f} us")
+        print(f"Per-request parse (canned response): {full_parse * 1e6:9.1f} us")
+        print(f"Prompt version: {parser.prompt_version}")
+    
     # Run test if called directly
     import sys
     if len(sys.argv) > 1 and sys.argv[1] == "test":
-        asyncio.run(test_semantic_parser())
\ No newline at end of file
+        asyncio.run(test_semantic_parser())
+    elif len(sys.argv) > 1 and sys.argv[1] == "bench":
+        benchmark_prompt_build()
\ No newline at end of file
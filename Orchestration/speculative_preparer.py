@@ -0,0 +1,356 @@
+"""
+Speculative Preparer - Warm up the likely next agent while the user reads the current result
+
+Some agent chains are near-certain (ICP generation is almost always followed by
+lead mining, branding by website generation). After a plan finishes, this module:
+1. Predicts likely follow-on agents from known chains, registry dependencies and observed history
+2. Starts their cheap, idempotent preparatory step (data fetch, context load) in the background
+3. Hands the prepared data to the agent if the next plan runs it, discards it otherwise
+4. Reports prediction hit rate, how often correct predictions were not ready
+   to use, and the cost wasted on those and on misses
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from .semantic_request_parser import CapabilityAgentRegistry, get_default_registry
+
+logger = logging.getLogger(__name__)
+
+# A preparer receives the speculative agent input and returns prepared data.
+# It must be idempotent and side-effect free, since its result may be thrown away.
+AgentPreparer = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+# Chains observed often enough in production to be worth speculating on cold
+KNOWN_FOLLOW_ON_AGENTS: Dict[str, Dict[str, float]] = {
+    "icp_generator_agent": {"lead_mining_agent": 0.9},
+    "branding_agent": {"website_generator_agent": 0.8, "logo_generation_agent": 0.4},
+    "market_research_agent": {"icp_generator_agent": 0.5},
+    "lead_mining_agent": {"advanced_email_orchestration_agent": 0.5},
+}
+
+
+@dataclass
+class Speculation:
+    """One in-flight or finished speculative preparation."""
+    session_id: str
+    agent_id: str
+    probability: float
+    task: asyncio.Task
+    started_at: float
+    finished_at: Optional[float] = None
+    speculative: bool = True  # False for warm-ups of agents a parsed plan already needs
+    
+    @property
+    def elapsed_seconds(self) -> float:
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+
+class FollowOnPredictor:
+    """
+    Estimates P(next agent | previous agent).
+
+    Known chains and registry dependencies act as a prior worth PRIOR_WEIGHT
+    observations, so history gradually overrides them.
+    """
+    
+    PRIOR_WEIGHT = 5.0
+    DEPENDENCY_PRIOR = 0.6  # next agent's capability declares a dependency on the previous one
+    
+    def __init__(self, registry: Optional[CapabilityAgentRegistry] = None, known_chains: Optional[Dict[str, Dict[str, float]]] = None):
+        self.registry = registry or get_default_registry()
+        self.known_chains = known_chains if known_chains is not None else KNOWN_FOLLOW_ON_AGENTS
+        self.transition_counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.observation_counts: Dict[str, int] = defaultdict(int)
+        self._dependency_priors: Optional[Dict[str, Dict[str, float]]] = None
+        self._dependency_priors_version: Optional[str] = None
+    
+    def _get_dependency_priors(self) -> Dict[str, Dict[str, float]]:
+        """Agents whose capability depends on another agent's capability, rebuilt when the registry changes."""
+        if self._dependency_priors is None or self._dependency_priors_version != self.registry.version:
+            priors: Dict[str, Dict[str, float]] = defaultdict(dict)
+            agents = [agent for agents in self.registry.capability_map.values() for agent in agents]
+            for previous in agents:
+                for candidate in agents:
+                    if previous.capability_category.value in candidate.dependencies:
+                        priors[previous.agent_id][candidate.agent_id] = self.DEPENDENCY_PRIOR
+            self._dependency_priors = dict(priors)
+            self._dependency_priors_version = self.registry.version
+        return self._dependency_priors
+    
+    def _prior(self, previous_agent: str, next_agent: str) -> float:
+        known = self.known_chains.get(previous_agent, {}).get(next_agent, 0.0)
+        from_registry = self._get_dependency_priors().get(previous_agent, {}).get(next_agent, 0.0)
+        return max(known, from_registry)
+    
+    def observe(self, previous_agents: Iterable[str], next_agents: Iterable[str]):
+        """Record that next_agents ran in the plan following previous_agents."""
+        next_agents = set(next_agents)
+        for previous in set(previous_agents):
+            self.observation_counts[previous] += 1
+            for next_agent in next_agents:
+                self.transition_counts[previous][next_agent] += 1
+    
+    def train(self, agent_sequences: Iterable[List[str]]):
+        """Seed transition counts from logged agent sequences, one list per session."""
+        for sequence in agent_sequences:
+            for previous, next_agent in zip(sequence, sequence[1:]):
+                self.observe([previous], [next_agent])
+    
+    def probability(self, previous_agent: str, next_agent: str) -> float:
+        observed = self.transition_counts.get(previous_agent, {}).get(next_agent, 0)
+        total = self.observation_counts.get(previous_agent, 0)
+        return (observed + self.PRIOR_WEIGHT * self._prior(previous_agent, next_agent)) / (total + self.PRIOR_WEIGHT)
+    
+    def predict(self, previous_agents: Iterable[str], exclude: Iterable[str] = ()) -> List[Tuple[str, float]]:
+        """Candidate follow-on agents with their probability, most likely first."""
+        excluded = set(exclude)
+        candidates = set()
+        for previous in previous_agents:
+            candidates.update(self.known_chains.get(previous, {}))
+            candidates.update(self._get_dependency_priors().get(previous, {}))
+            candidates.update(self.transition_counts.get(previous, {}))
+        
+        scored = []
+        for candidate in candidates - excluded:
+            # Any previous agent can trigger the follow-on; take the strongest signal
+            probability = max(self.probability(previous, candidate) for previous in previous_agents)
+            scored.append((candidate, probability))
+        return sorted(scored, key=lambda item: item[1], reverse=True)
+
+
+class SpeculativePreparer:
+    """
+    Runs preparatory steps for likely follow-on agents and tracks whether they paid off.
+
+    Wasted cost is the time spent on discarded preparations, plus any "cost"
+    a preparer reports in its result. Hit rate is prediction accuracy over
+    speculate() predictions: a correct prediction whose preparation was not
+    ready within claim_timeout, or failed, is an unready hit, not a miss.
+    Warm-ups started through prepare() are counted apart.
+    """
+    
+    DEFAULT_MIN_PROBABILITY = 0.6
+    DEFAULT_MAX_SPECULATIONS = 2  # per session, per finished plan
+    SPECULATION_TTL_SECONDS = 900
+    MAX_TRACKED_SESSIONS = 1024
+    
+    def __init__(
+        self,
+        preparers: Mapping[str, AgentPreparer],
+        predictor: Optional[FollowOnPredictor] = None,
+        min_probability: float = DEFAULT_MIN_PROBABILITY,
+        max_speculations: int = DEFAULT_MAX_SPECULATIONS,
+        claim_timeout: float = 0.25
+    ):
+        self.preparers = preparers
+        self.predictor = predictor or FollowOnPredictor()
+        self.min_probability = min_probability
+        self.max_speculations = max_speculations
+        # How long a stage waits for its unfinished preparations before running those agents cold
+        self.claim_timeout = claim_timeout
+        
+        self._speculations: Dict[str, Dict[str, Speculation]] = {}
+        self._last_agents: "OrderedDict[str, List[str]]" = OrderedDict()
+        
+        self.started = 0
+        self.hits = 0  # correct predictions, ready or not
+        self.unready_hits = 0  # correct predictions not ready within claim_timeout, or failed
+        self.misses = 0
+        self.hit_seconds_saved = 0.0
+        self.wasted_seconds = 0.0
+        self.wasted_cost = 0.0
+        self.warm_ups_started = 0
+        self.warm_ups_used = 0
+        self.warm_ups_unready = 0
+    
+    def _remember_agents(self, session_id: str, agent_ids: List[str]):
+        self._last_agents[session_id] = list(agent_ids)
+        self._last_agents.move_to_end(session_id)
+        while len(self._last_agents) > self.MAX_TRACKED_SESSIONS:
+            expired_session, _ = self._last_agents.popitem(last=False)
+            self._discard_all(expired_session)
+    
+    def _discard(self, speculation: Speculation, unready: bool = False):
+        """
+        Throw away a speculation that was not used, charging its cost as waste.
+        
+        unready marks a correctly predicted agent whose preparation was not ready
+        in time or failed; it is counted as an unready hit rather than a miss.
+        """
+        if speculation.speculative:
+            if unready:
+                self.hits += 1
+                self.unready_hits += 1
+            else:
+                self.misses += 1
+        elif unready:
+            self.warm_ups_unready += 1
+        if not speculation.task.done():
+            speculation.task.cancel()
+        self.wasted_seconds += speculation.elapsed_seconds
+        if speculation.task.done() and not speculation.task.cancelled() and speculation.task.exception() is None:
+            prepared = speculation.task.result()
+            if isinstance(prepared, dict):
+                self.wasted_cost += float(prepared.get("cost", 0.0) or 0.0)
+        logger.debug(f"Discarded speculative {speculation.agent_id} for session {speculation.session_id}")
+    
+    def _discard_all(self, session_id: str):
+        for speculation in self._speculations.pop(session_id, {}).values():
+            self._discard(speculation)
+    
+    async def _run_preparer(self, speculation_ref: Dict[str, Speculation], agent_id: str, preparer: AgentPreparer, agent_input: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return await preparer(agent_input)
+        finally:
+            speculation = speculation_ref.get(agent_id)
+            if speculation:
+                speculation.finished_at = time.monotonic()
+    
+    def speculate(self, session_id: str, completed_agents: List[str], agent_input: Dict[str, Any]) -> List[str]:
+        """
+        Start preparing likely follow-on agents after a plan completes.
+
+        agent_input is the context shared by the preparers (business goal,
+        parameters, upstream results). Returns the agents being prepared.
+        Must be called from inside the running event loop.
+        """
+        # Anything left over from the previous plan was not used
+        self._discard_all(session_id)
+        self._remember_agents(session_id, completed_agents)
+        
+        session_speculations: Dict[str, Speculation] = {}
+        for agent_id, probability in self.predictor.predict(completed_agents, exclude=completed_agents):
+            if len(session_speculations) >= self.max_speculations or probability < self.min_probability:
+                break
+            preparer = self.preparers.get(agent_id)
+            if preparer is None:
+                continue
+            
+            task = asyncio.ensure_future(self._run_preparer(
+                session_speculations, agent_id, preparer, {**agent_input, "agent_id": agent_id, "speculative": True}
+            ))
+            session_speculations[agent_id] = Speculation(
+                session_id=session_id,
+                agent_id=agent_id,
+                probability=probability,
+                task=task,
+                started_at=time.monotonic()
+            )
+            self.started += 1
+            logger.debug(f"Speculatively preparing {agent_id} for session {session_id} (p={probability:.2f})")
+        
+        if session_speculations:
+            self._speculations[session_id] = session_speculations
+        return list(session_speculations)
+    
+    def prepare(self, session_id: str, agent_ids: List[str], agent_input: Dict[str, Any]) -> List[str]:
+        """
+        Start preparing agents a plan is known to need (e.g. from a streamed parse
+        whose capabilities are already final). Agents already being prepared for
+        this session are left alone. Returns the agents newly started.
+        """
+        session_speculations = self._speculations.setdefault(session_id, {})
+        started = []
+        for agent_id in agent_ids:
+            preparer = self.preparers.get(agent_id)
+            if preparer is None or agent_id in session_speculations:
+                continue
+            task = asyncio.ensure_future(self._run_preparer(
+                session_speculations, agent_id, preparer, {**agent_input, "agent_id": agent_id, "speculative": False}
+            ))
+            session_speculations[agent_id] = Speculation(
+                session_id=session_id,
+                agent_id=agent_id,
+                probability=1.0,
+                task=task,
+                started_at=time.monotonic(),
+                speculative=False
+            )
+            self.warm_ups_started += 1
+            started.append(agent_id)
+        return started
+    
+    def start_plan(self, session_id: str, agent_ids: List[str]):
+        """
+        Note the agents a new plan is about to run.
+
+        Speculations for other agents are discarded, and the transition is fed
+        into the predictor so it learns from real follow-ups. The prepared data
+        itself is collected stage by stage through claim().
+        """
+        previous_agents = self._last_agents.get(session_id)
+        if previous_agents:
+            self.predictor.observe(previous_agents, agent_ids)
+        
+        session_speculations = self._speculations.get(session_id, {})
+        now = time.monotonic()
+        for agent_id, speculation in list(session_speculations.items()):
+            if agent_id not in agent_ids or now - speculation.started_at > self.SPECULATION_TTL_SECONDS:
+                self._discard(session_speculations.pop(agent_id))
+    
+    async def _claim_one(self, speculation: Speculation) -> Optional[Dict[str, Any]]:
+        try:
+            result = await asyncio.wait_for(asyncio.shield(speculation.task), timeout=self.claim_timeout)
+        except asyncio.TimeoutError:
+            logger.debug(f"Speculative {speculation.agent_id} not ready in {self.claim_timeout}s, running cold")
+            self._discard(speculation, unready=True)
+            return None
+        except Exception as e:
+            logger.warning(f"Speculative preparation for {speculation.agent_id} failed: {e}")
+            self._discard(speculation, unready=True)
+            return None
+        
+        # Claimed speculations are no longer tracked by the session, so stamp the finish here
+        speculation.finished_at = speculation.finished_at or time.monotonic()
+        if speculation.speculative:
+            self.hits += 1
+            self.hit_seconds_saved += speculation.elapsed_seconds
+        else:
+            self.warm_ups_used += 1
+        return result
+    
+    async def claim(self, session_id: str, agent_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Collect prepared data for the agents of the stage about to start.
+
+        Unfinished preparations are awaited together, for at most claim_timeout;
+        agents whose preparation is not ready by then run cold.
+        """
+        session_speculations = self._speculations.get(session_id, {})
+        claimed = [session_speculations.pop(agent_id) for agent_id in agent_ids if agent_id in session_speculations]
+        if not session_speculations:
+            self._speculations.pop(session_id, None)
+        if not claimed:
+            return {}
+        
+        results = await asyncio.gather(*[self._claim_one(speculation) for speculation in claimed])
+        return {
+            speculation.agent_id: result
+            for speculation, result in zip(claimed, results)
+            if result is not None
+        }
+    
+    def get_speculation_stats(self) -> Dict[str, Any]:
+        """Get speculation statistics"""
+        resolved = self.hits + self.misses
+        return {
+            "speculations_started": self.started,
+            "in_flight": sum(len(speculations) for speculations in self._speculations.values()),
+            "hits": self.hits,
+            "unready_hits": self.unready_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / resolved if resolved else 0.0,
+            "ready_rate": (self.hits - self.unready_hits) / self.hits if self.hits else 0.0,
+            "seconds_saved": round(self.hit_seconds_saved, 3),
+            "wasted_seconds": round(self.wasted_seconds, 3),
+            "wasted_cost": round(self.wasted_cost, 6),
+            "warm_ups_started": self.warm_ups_started,
+            "warm_ups_used": self.warm_ups_used,
+            "warm_ups_unready": self.warm_ups_unready,
+            "min_probability": self.min_probability
+        }
@@ -2,15 +2,25 @@
 Universal Context Store - Cross-agent context management
 """
 
+import asyncio
+import copy
 import json
 import logging
+import time
+import uuid
 import redis.asyncio as redis
-from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
 from datetime import datetime, timedelta
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 
 from ..workflow_result_store import WorkflowJSONEncoder
+from .context_backends import ContextRecord, ContextStorageBackend, ContextWriteBatch, RedisContextBackend
+from .context_codec import ContextCodec
+from .context_search import ContextSearchIndex, ContextSnippet
+from .conversation_summary import RollingConversationSummary
+from .intent_cache import IntentCache
 
 logger = logging.getLogger(__name__)
 
@@ -35,15 +45,141 @@ class ContextItem:
     timestamp: str
     business_goal: str
     agent_id: str
+    # Large collections stored as chunks next to the item: name -> {"items": [...], "summary": {...}}
+    collections: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+
+@dataclass
+class SessionContextSnapshot:
+    """Newest stored context of every type for one session."""
+    session_id: str
+    items: Dict[ContextType, Dict[str, Any]]  # stored item: data, timestamp, workflow_id, business_goal, agent_id
+    hours_back: float
+    
+    @property
+    def context_types(self) -> List[ContextType]:
+        return list(self.items)
+    
+    def __contains__(self, context_type) -> bool:
+        return ContextType(context_type) in self.items
+    
+    def get(self, context_type) -> Optional[Dict[str, Any]]:
+        """Extracted data of the newest context of a type, or None."""
+        item = self.items.get(ContextType(context_type))
+        return item["data"] if item else None
+    
+    def to_recent_deliverables(self) -> List[Dict[str, Any]]:
+        """Oldest-first deliverables in the shape the response analyzer reads from conversation context."""
+        return [
+            {
+                "agent_type": context_type.value,
+                "business_goal": item.get("business_goal", ""),
+                "deliverables": [
+                    f"{key}: {value}" for key, value in item["data"].items()
+                    if isinstance(value, (str, int, float)) and value != ""
+                ],
+                "timestamp": item.get("timestamp")
+            }
+            for context_type, item in sorted(self.items.items(), key=lambda entry: entry[1].get("timestamp", ""))
+        ]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {context_type.value: item["data"] for context_type, item in self.items.items()}
+
+
+@dataclass
+class ContextEvent:
+    """One entry of a session's context stream: an agent result was stored."""
+    event_id: str  # monotonic stream id "<ms>-<seq>"
+    session_id: str
+    context_type: str
+    agent_id: str
+    workflow_id: str
+    context_key: str  # primary key of the stored item (see get_event_context)
+    timestamp: str
+    
+    @classmethod
+    def from_entry(cls, event_id: str, fields: Dict[str, str]) -> "ContextEvent":
+        return cls(event_id=event_id, **{name: fields.get(name, "") for name in (
+            "session_id", "context_type", "agent_id", "workflow_id", "context_key", "timestamp"
+        )})
 
 
 class UniversalContextStore:
     """Stores and retrieves context across ALL agent types."""
     
-    def __init__(self, redis_client: redis.Redis):
+    CONTEXT_TTL_SECONDS = 7 * 24 * 60 * 60
+    CONVERSATION_SUMMARY_TTL_SECONDS = 7 * 24 * 60 * 60
+    # Newest candidates fetched per get_recent_context call (skips members whose key expired)
+    RECENT_CONTEXT_CANDIDATES = 8
+    MAX_CACHED_SUMMARIES = 1024
+    
+    # Large collections (e.g. full lead sets): inline up to the preview size, chunked beyond it
+    COLLECTION_PREVIEW_SIZE = 10
+    COLLECTION_CHUNK_SIZE = 100
+    COLLECTION_FETCH_CHUNKS = 4  # chunks per MGET while iterating
+    
+    # Append-only per-session event log of stored contexts, consumed through consumer groups
+    CONTEXT_STREAM_MAX_LENGTH = 1000
+    
+    # Conversation summaries are folded from an append-only per-session log, so concurrent
+    # writers never overwrite each other's entries; the folded snapshot is only a shortcut
+    CONVERSATION_LOG_MAX_LENGTH = 500
+    CONVERSATION_LOG_FETCH = 100
+    CONVERSATION_SNAPSHOT_EVERY = 20  # save the snapshot once a read folds this many entries
+    
+    # Pub/sub channel announcing the session of every context write, for L1 invalidation
+    INVALIDATION_CHANNEL = "context_invalidation"
+    INVALIDATION_RECONNECT_SECONDS = 1.0
+    
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        intent_cache: Optional[IntentCache] = None,
+        summary_token_budget: int = RollingConversationSummary.DEFAULT_TOKEN_BUDGET,
+        l1_ttl_seconds: float = 30.0,
+        l1_max_sessions: int = 1024,
+        codec: Optional[ContextCodec] = None,
+        backend: Optional[ContextStorageBackend] = None,
+        search_index: Optional[ContextSearchIndex] = None
+    ):
+        if backend is None and redis_client is None:
+            raise ValueError("UniversalContextStore needs a redis_client or a storage backend")
         self.redis_client = redis_client
         self.logger = logging.getLogger(__name__)
         
+        # Storage: Redis in production; in-memory or SQLite for tests and single-node installs
+        self.backend = backend or RedisContextBackend(redis_client, index_ttl_seconds=self.CONTEXT_TTL_SECONDS)
+        
+        # Compact encoding for context values; legacy JSON values stay readable
+        self.codec = codec or ContextCodec(json_encoder=WorkflowJSONEncoder)
+        self._text_values = self.backend.text_values
+        # Cached intent decisions for a session go stale once new agent results land
+        self.intent_cache = intent_cache
+        # BM25 index over extracted context fields, for relevance-filtered prompts (see search_context)
+        # Same staleness bound as the L1 cache, for writes by other workers that go unannounced
+        self.search_index = search_index or ContextSearchIndex(max_sessions=l1_max_sessions, ttl_seconds=l1_ttl_seconds)
+        
+        # Rolling conversation summaries, persisted in Redis and kept hot in-process
+        self.summary_token_budget = summary_token_budget
+        self._conversation_summaries: "OrderedDict[str, RollingConversationSummary]" = OrderedDict()
+        
+        # Background index compaction
+        self._compactor_task: Optional[asyncio.Task] = None
+        self.index_stats: Dict[str, Any] = {}
+        
+        # Process-local L1 read-through cache: session -> {read key: (cached_at, value)}.
+        # Writes here and in other workers (via pub/sub) invalidate a session; the
+        # TTL bounds staleness if invalidation messages are missed.
+        self.l1_ttl_seconds = l1_ttl_seconds
+        self.l1_max_sessions = l1_max_sessions
+        self._l1: "OrderedDict[str, Dict[Tuple, Tuple[float, Any]]]" = OrderedDict()
+        self._invalidation_task: Optional[asyncio.Task] = None
+        self._worker_id = uuid.uuid4().hex
+        # Bumped on every invalidation so a read that raced a write does not cache its stale result
+        self._l1_epoch = 0
+        self.l1_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+        
         # Define what data to extract from each agent type
         self.context_extractors = {
             ContextType.BRANDING: self._extract_branding_context,
@@ -64,44 +200,78 @@ class UniversalContextStore:
         """Store agent results as queryable context."""
         
         try:
-            # Determine context type from agent_id
-            context_type = self._map_agent_to_context_type(agent_id)
-            if not context_type:
-                self.logger.debug(f"No context mapping for agent {agent_id}")
-                return False
-            
-            # Extract relevant context using specific extractor
-            extractor = self.context_extractors.get(context_type)
-            if not extractor:
-                self.logger.debug(f"No extractor for context type {context_type}")
-                return False
-            
-            extracted_data = extractor(results)
-            if not extracted_data:
-                self.logger.debug(f"No extractable data for {context_type}")
+            context_item = self._build_context_item(session_id, agent_id, results)
+            if not context_item:
                 return False
             
-            # Create context item
-            context_item = ContextItem(
-                context_type=context_type,
-                data=extracted_data,
-                session_id=session_id,
-                workflow_id=results.get("workflow_id", "unknown"),
-                timestamp=datetime.utcnow().isoformat(),
-                business_goal=results.get("business_goal", ""),
-                agent_id=agent_id
-            )
-            
             # Store in Redis with multiple access patterns
-            await self._store_context_item(context_item)
+            if not await self._write_context_items(session_id, [(context_item, results)]):
+                return False
             
-            self.logger.info(f"✅ Stored {context_type.value} context for session {session_id}")
+            self.logger.info(f"✅ Stored {context_item.context_type.value} context for session {session_id}")
             return True
             
         except Exception as e:
             self.logger.error(f"Failed to store context: {e}")
             return False
     
+    async def store_many(self, session_id: str, agent_results: Dict[str, Dict[str, Any]]) -> Dict[str, bool]:
+        """
+        Store the outputs of several agents (e.g. every stage of a workflow) in one round trip.
+        
+        Returns whether each agent's results were stored; agents without a
+        context mapping or extractable data map to False.
+        """
+        
+        stored = {agent_id: False for agent_id in agent_results}
+        try:
+            items = []
+            for agent_id, results in agent_results.items():
+                context_item = self._build_context_item(session_id, agent_id, results)
+                if context_item:
+                    items.append((context_item, results))
+            
+            if items and await self._write_context_items(session_id, items):
+                for context_item, _ in items:
+                    stored[context_item.agent_id] = True
+                self.logger.info(f"✅ Stored {len(items)} contexts for session {session_id} in one transaction")
+            return stored
+            
+        except Exception as e:
+            self.logger.error(f"Failed to store contexts: {e}")
+            return stored
+    
+    def _build_context_item(self, session_id: str, agent_id: str, results: Dict[str, Any]) -> Optional[ContextItem]:
+        """Extract the queryable context from agent results, or None if there is none."""
+        
+        # Determine context type from agent_id
+        context_type = self._map_agent_to_context_type(agent_id)
+        if not context_type:
+            self.logger.debug(f"No context mapping for agent {agent_id}")
+            return None
+        
+        # Extract relevant context using specific extractor
+        extractor = self.context_extractors.get(context_type)
+        if not extractor:
+            self.logger.debug(f"No extractor for context type {context_type}")
+            return None
+        
+        extracted_data = extractor(results)
+        if not extracted_data:
+            self.logger.debug(f"No extractable data for {context_type}")
+            return None
+        
+        return ContextItem(
+            context_type=context_type,
+            data=extracted_data,
+            session_id=session_id,
+            workflow_id=results.get("workflow_id", "unknown"),
+            timestamp=datetime.utcnow().isoformat(),
+            business_goal=results.get("business_goal", ""),
+            agent_id=agent_id,
+            collections=extracted_data.pop("_collections", {})
+        )
+    
     def _map_agent_to_context_type(self, agent_id: str) -> Optional[ContextType]:
         """Map agent ID to context type."""
         mapping = {
@@ -175,7 +345,7 @@ class UniversalContextStore:
         
         # Convert lead objects to dicts for storage
         leads_data = []
-        for lead in qualified_leads[:10]:  # Store top 10 leads
+        for lead in qualified_leads:
             if hasattr(lead, 'to_dict'):
                 leads_data.append(lead.to_dict())
             elif isinstance(lead, dict):
@@ -192,7 +362,8 @@ class UniversalContextStore:
             return None
         
         extracted = {
-            "qualified_leads": leads_data,
+            # Top leads inline; the full set goes to a chunked collection (see iter_collection)
+            "qualified_leads": leads_data[:self.COLLECTION_PREVIEW_SIZE],
             "leads_found": leads_found,
             "icp_criteria_used": lead_data.get("icp_criteria_used", {}),
             "apollo_status": "connected" if mining_success else "failed",
@@ -201,6 +372,17 @@ class UniversalContextStore:
             "top_titles": list(set(lead.get("job_title", "") for lead in leads_data[:5] if lead.get("job_title"))),
             "csv_file": lead_data.get("leads_csv_file"),
         }
+        if len(leads_data) > self.COLLECTION_PREVIEW_SIZE:
+            extracted["_collections"] = {
+                "qualified_leads": {
+                    "items": leads_data,
+                    "summary": {
+                        "top_companies": extracted["top_companies"],
+                        "top_titles": extracted["top_titles"],
+                        "leads_found": leads_found
+                    }
+                }
+            }
         
         self.logger.info(f"✅ Extracted lead mining context: {len(leads_data)} leads")
         return extracted
@@ -272,65 +454,687 @@ class UniversalContextStore:
         self.logger.info(f"✅ Extracted ICP generation context with {extracted['icp_confidence']:.2f} confidence")
         return extracted
     
-    async def _store_context_item(self, context_item: ContextItem) -> bool:
-        """Store context item with multiple access patterns."""
+    async def _write_context_items(self, session_id: str, items: List[Tuple[ContextItem, Dict[str, Any]]]) -> bool:
+        """
+        Write context items, their indexes and conversation log entries atomically.
+        
+        Everything goes into one backend write batch (one MULTI/EXEC on Redis),
+        so a crash can no longer leave index entries without their primary key,
+        and a warm session costs a single round trip however many items are stored.
+        """
         
         try:
-            timestamp_key = int(datetime.utcnow().timestamp())
-            
-            # Primary storage key
-            primary_key = f"agent_context:{context_item.session_id}:{context_item.context_type.value}:{timestamp_key}"
+            await self.backend.write(self._build_write_batch(session_id, items))
             
-            # Store the context data
-            await self.redis_client.setex(
-                primary_key,
-                7 * 24 * 60 * 60,  # 7 days TTL
-                json.dumps({
-                    "data": context_item.data,
-                    "timestamp": context_item.timestamp,
-                    "workflow_id": context_item.workflow_id,
-                    "business_goal": context_item.business_goal,
-                    "agent_id": context_item.agent_id
-                }, cls=WorkflowJSONEncoder)
+        except Exception as e:
+            self.logger.error(f"Failed to store context items: {e}")
+            return False
+        
+        self._invalidate_session_caches(session_id, keep_summary=True)
+        if self.search_index.has_session(session_id):
+            # Sessions not indexed yet are built from the snapshot on their first search
+            for context_item, _ in items:
+                self.search_index.index_item(session_id, context_item.context_type.value, context_item.data, context_item.timestamp)
+        return True
+    
+    def _build_write_batch(self, session_id: str, items: List[Tuple[ContextItem, Dict[str, Any]]]) -> ContextWriteBatch:
+        batch = ContextWriteBatch()
+        for context_item, results in items:
+            self._queue_context_item(batch, context_item)
+            self._queue_deliverable_entry(batch, context_item, results)
+        batch.publish(self.INVALIDATION_CHANNEL, json.dumps({"session_id": session_id, "origin": self._worker_id}))
+        return batch
+    
+    def _queue_context_item(self, batch: ContextWriteBatch, context_item: ContextItem) -> str:
+        """Add one context item (and its collections) to a write batch; returns the primary key."""
+        
+        # Primary storage key: microsecond timestamp plus a random suffix, so items of
+        # one type stored in the same second (or clock tick) no longer overwrite each other
+        score = self._index_score(datetime.fromisoformat(context_item.timestamp))
+        primary_key = f"agent_context:{context_item.session_id}:{context_item.context_type.value}:{score:.6f}-{uuid.uuid4().hex[:8]}"
+        
+        # Large collections go to chunks; the item keeps a reference to the manifest
+        for name, collection in context_item.collections.items():
+            collection_id = f"{context_item.session_id}:{context_item.context_type.value}:{uuid.uuid4().hex[:12]}"
+            self._queue_collection(batch, collection_id, collection["items"], collection.get("summary", {}))
+            context_item.data.setdefault("collections", {})[name] = collection_id
+        
+        # Store the context data
+        payload = self._encode_value({
+            "data": context_item.data,
+            "timestamp": context_item.timestamp,
+            "workflow_id": context_item.workflow_id,
+            "business_goal": context_item.business_goal,
+            "agent_id": context_item.agent_id
+        })
+        batch.put_record(ContextRecord(
+            key=primary_key,
+            session_id=context_item.session_id,
+            context_type=context_item.context_type.value,
+            score=score,
+            value=payload,
+            ttl_seconds=self.CONTEXT_TTL_SECONDS
+        ))
+        
+        # Event log entry (ids assigned by the backend in commit order)
+        batch.append_to_stream(
+            self._context_stream_key(context_item.session_id),
+            {
+                "session_id": context_item.session_id,
+                "context_type": context_item.context_type.value,
+                "agent_id": context_item.agent_id,
+                "workflow_id": context_item.workflow_id or "",
+                "context_key": primary_key,
+                "timestamp": context_item.timestamp
+            },
+            self.CONTEXT_STREAM_MAX_LENGTH,
+            self.CONTEXT_TTL_SECONDS
+        )
+        
+        return primary_key
+    
+    @staticmethod
+    def _context_stream_key(session_id: str) -> str:
+        return f"context_stream:{session_id}"
+    
+    async def create_context_consumer_group(self, session_id: str, group: str, start_id: str = "0") -> bool:
+        """
+        Create a consumer group on a session's context stream (idempotent).
+        
+        start_id "0" delivers the whole retained history, "$" only events
+        stored from now on. Returns False if the group already existed.
+        """
+        
+        try:
+            return await self.backend.create_stream_group(self._context_stream_key(session_id), group, start_id)
+        except Exception as e:
+            self.logger.error(f"Failed to create context consumer group: {e}")
+            return False
+    
+    async def read_context_events(
+        self,
+        session_id: str,
+        group: str,
+        consumer: str,
+        count: int = 10,
+        block_ms: Optional[int] = None,
+        pending: bool = False
+    ) -> List[ContextEvent]:
+        """
+        Next context events for one consumer of a group, in stored order.
+        
+        Each event goes to one consumer of the group and stays pending until
+        acked with ack_context_events. With block_ms the call waits for new
+        events instead of polling; with pending=True it re-reads this
+        consumer's unacknowledged events (after a crash).
+        """
+        
+        try:
+            entries = await self.backend.read_stream_group(
+                self._context_stream_key(session_id), group, consumer, count, block_ms, pending
             )
+        except Exception as e:
+            self.logger.error(f"Failed to read context events: {e}")
+            return []
+        return [ContextEvent.from_entry(event_id, fields) for event_id, fields in entries]
+    
+    async def ack_context_events(self, session_id: str, group: str, event_ids: List[str]) -> int:
+        """Acknowledge processed events; returns how many were pending."""
+        
+        try:
+            return await self.backend.ack_stream(self._context_stream_key(session_id), group, event_ids)
+        except Exception as e:
+            self.logger.error(f"Failed to ack context events: {e}")
+            return 0
+    
+    async def replay_context_events(self, session_id: str, after_id: str = "0", count: int = 100) -> List[ContextEvent]:
+        """Events after an id, oldest first, without consumer group bookkeeping (exact replay)."""
+        
+        try:
+            entries = await self.backend.stream_range(self._context_stream_key(session_id), after_id, count)
+        except Exception as e:
+            self.logger.error(f"Failed to replay context events: {e}")
+            return []
+        return [ContextEvent.from_entry(event_id, fields) for event_id, fields in entries]
+    
+    async def get_event_context(self, event: ContextEvent) -> Optional[Dict[str, Any]]:
+        """Extracted data of the item an event refers to (None once it expired)."""
+        
+        try:
+            context_item = self.codec.decode(await self.backend.get(event.context_key))
+        except Exception as e:
+            self.logger.error(f"Failed to load context for event {event.event_id}: {e}")
+            return None
+        return context_item["data"] if context_item else None
+    
+    @staticmethod
+    def _index_score(timestamp: datetime) -> float:
+        """Sorted-set score for a naive UTC timestamp (same clock as the primary key suffix)."""
+        return timestamp.timestamp()
+    
+    def _l1_get(self, session_id: str, read_key: Tuple) -> Tuple[bool, Any]:
+        """(hit, value) from the L1 cache; values are copies, so callers may mutate them."""
+        entries = self._l1.get(session_id)
+        entry = entries.get(read_key) if entries else None
+        if entry is None or time.monotonic() - entry[0] > self.l1_ttl_seconds:
+            self.l1_stats["misses"] += 1
+            return False, None
+        self._l1.move_to_end(session_id)
+        self.l1_stats["hits"] += 1
+        return True, copy.deepcopy(entry[1])
+    
+    def _l1_put(self, session_id: str, read_key: Tuple, value: Any, epoch: int):
+        if self.l1_ttl_seconds <= 0 or epoch != self._l1_epoch:
+            return
+        self._l1.setdefault(session_id, {})[read_key] = (time.monotonic(), copy.deepcopy(value))
+        self._l1.move_to_end(session_id)
+        while len(self._l1) > self.l1_max_sessions:
+            self._l1.popitem(last=False)
+    
+    def _invalidate_session_caches(self, session_id: str, keep_summary: bool = False):
+        """Forget everything cached in-process about a session."""
+        self._l1.pop(session_id, None)
+        self._l1_epoch += 1
+        if not keep_summary:
+            # Another worker updated the session; reload its summary and search index on next use
+            self._conversation_summaries.pop(session_id, None)
+            self.search_index.drop_session(session_id)
+        if self.intent_cache:
+            self.intent_cache.invalidate_session(session_id)
+        self.l1_stats["invalidations"] += 1
+    
+    def start_invalidation_listener(self):
+        """Subscribe to context writes from other workers and drop their sessions from the L1 cache."""
+        
+        if self._invalidation_task and not self._invalidation_task.done():
+            return
+        
+        if not self.backend.supports_pubsub:
+            # Single-node backends have no other workers to hear from
+            self.logger.info(f"{type(self.backend).__name__} has no pub/sub; L1 invalidation is local only")
+            return
+        
+        async def listen_forever():
+            while True:
+                try:
+                    async for message in self.backend.subscribe(self.INVALIDATION_CHANNEL):
+                        event = json.loads(message)
+                        if event.get("origin") != self._worker_id:
+                            self._invalidate_session_caches(event["session_id"])
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.logger.error(f"Context invalidation listener failed: {e}")
+                # Messages may have been missed while disconnected
+                self._l1.clear()
+                self._l1_epoch += 1
+                self._conversation_summaries.clear()
+                self.search_index.clear()
+                await asyncio.sleep(self.INVALIDATION_RECONNECT_SECONDS)
+        
+        self._invalidation_task = asyncio.ensure_future(listen_forever())
+    
+    async def stop_invalidation_listener(self):
+        if self._invalidation_task:
+            self._invalidation_task.cancel()
+            try:
+                await self._invalidation_task
+            except asyncio.CancelledError:
+                pass
+            self._invalidation_task = None
+    
+    def get_l1_stats(self) -> Dict[str, Any]:
+        lookups = self.l1_stats["hits"] + self.l1_stats["misses"]
+        return {
+            **self.l1_stats,
+            "sessions": len(self._l1),
+            "hit_rate": self.l1_stats["hits"] / lookups if lookups else 0.0,
+            "listening": bool(self._invalidation_task and not self._invalidation_task.done())
+        }
+    
+    async def get_recent_context(self, session_id: str, context_type: str, hours_back: int = 2) -> Optional[Dict[str, Any]]:
+        """Get most recent context of specific type for session.
+        
+        Served from the L1 cache when possible; otherwise one indexed backend
+        read (on Redis, a ZREVRANGEBYSCORE on the (session, type) time index plus
+        one MGET). Contexts stored before the time indexes existed need
+        migrate_time_indexes().
+        """
+        
+        cutoff_time = datetime.utcnow() - timedelta(hours=hours_back)
+        read_key = ("recent", context_type, hours_back)
+        
+        # A cached miss stays valid until the next write; a cached item until it leaves the window
+        hit, context_item = self._l1_get(session_id, read_key)
+        if hit and (context_item is None or datetime.fromisoformat(context_item["timestamp"]) >= cutoff_time):
+            return context_item["data"] if context_item else None
+        
+        epoch = self._l1_epoch
+        try:
+            context_item = await self._fetch_recent_context_item(session_id, context_type, cutoff_time)
+        except Exception as e:
+            self.logger.error(f"Failed to get recent context: {e}")
+            return None
+        
+        self._l1_put(session_id, read_key, context_item, epoch)
+        return context_item["data"] if context_item else None
+    
+    async def _fetch_recent_context_item(
+        self,
+        session_id: str,
+        context_type: str,
+        cutoff_time: datetime
+    ) -> Optional[Dict[str, Any]]:
+        """Newest stored context item of a type at or after cutoff_time, straight from the backend."""
+        
+        values = await self.backend.latest(
+            session_id, context_type, self._index_score(cutoff_time), self.RECENT_CONTEXT_CANDIDATES
+        )
+        
+        # Newest first; items that already expired come back as None
+        for context_json in values:
+            if context_json:
+                return self.codec.decode(context_json)
+        
+        return None
+    
+    def _encode_value(self, value: Any):
+        """Codec-encoded value; armoured text for clients that decode responses to str."""
+        return self.codec.encode(value, text=self._text_values)
+    
+    @staticmethod
+    def _collection_key(collection_id: str, part: str) -> str:
+        return f"context_collection:{collection_id}:{part}"
+    
+    def _queue_collection(self, batch: ContextWriteBatch, collection_id: str, items: List[Any], summary: Dict[str, Any]):
+        """Queue a collection as codec-encoded (compressed) chunks plus a manifest."""
+        
+        chunk_count = 0
+        compressed_bytes = 0
+        for start in range(0, len(items), self.COLLECTION_CHUNK_SIZE):
+            chunk = self._encode_value(items[start:start + self.COLLECTION_CHUNK_SIZE])
+            compressed_bytes += len(chunk)
+            batch.put_blob(self._collection_key(collection_id, str(chunk_count)), chunk, self.CONTEXT_TTL_SECONDS)
+            chunk_count += 1
+        
+        manifest = {
+            "collection_id": collection_id,
+            "total_items": len(items),
+            "chunk_size": self.COLLECTION_CHUNK_SIZE,
+            "chunk_count": chunk_count,
+            "compressed_bytes": compressed_bytes,
+            "summary": summary,
+            "created_at": datetime.utcnow().isoformat()
+        }
+        batch.put_blob(self._collection_key(collection_id, "manifest"), json.dumps(manifest, cls=WorkflowJSONEncoder), self.CONTEXT_TTL_SECONDS)
+    
+    async def get_collection_manifest(self, collection_id: str) -> Optional[Dict[str, Any]]:
+        """Manifest of a chunked collection: counts and summaries, without decoding any items."""
+        
+        try:
+            manifest_json = await self.backend.get(self._collection_key(collection_id, "manifest"))
+            return json.loads(manifest_json) if manifest_json else None
+        except Exception as e:
+            self.logger.error(f"Failed to get collection manifest: {e}")
+            return None
+    
+    async def iter_collection(self, collection_id: str, start: int = 0, limit: Optional[int] = None) -> AsyncIterator[Any]:
+        """
+        Lazily yield items of a chunked collection, fetching only the chunks needed.
+        
+        Chunks are fetched COLLECTION_FETCH_CHUNKS at a time with one MGET, so
+        memory and bandwidth scale with how far the caller iterates.
+        """
+        
+        manifest = await self.get_collection_manifest(collection_id)
+        if not manifest:
+            return
+        
+        chunk_size = manifest["chunk_size"]
+        end = manifest["total_items"] if limit is None else min(manifest["total_items"], start + limit)
+        position = start - start % chunk_size
+        for first_chunk in range(start // chunk_size, manifest["chunk_count"], self.COLLECTION_FETCH_CHUNKS):
+            if position >= end:
+                return
+            chunk_ids = range(first_chunk, min(first_chunk + self.COLLECTION_FETCH_CHUNKS, manifest["chunk_count"]))
+            chunks = await self.backend.mget([self._collection_key(collection_id, str(n)) for n in chunk_ids])
+            for chunk in chunks:
+                if chunk is None:
+                    self.logger.warning(f"Collection {collection_id} is missing a chunk; stopping early")
+                    return
+                for item in self.codec.decode(chunk):
+                    if position >= end:
+                        return
+                    if position >= start:
+                        yield item
+                    position += 1
+    
+    async def iter_context_collection(self, context_data: Dict[str, Any], name: str = "qualified_leads") -> AsyncIterator[Any]:
+        """Yield the full collection behind a stored context (chunked if large, inline otherwise)."""
+        
+        collection_id = (context_data.get("collections") or {}).get(name)
+        if collection_id:
+            async for item in self.iter_collection(collection_id):
+                yield item
+        else:
+            for item in context_data.get(name) or []:
+                yield item
+    
+    async def get_session_snapshot(self, session_id: str, hours_back: float = 2) -> SessionContextSnapshot:
+        """
+        Newest context of every type for a session, in one round trip.
+        
+        On Redis this reads the derived snapshot hash that every write refreshes
+        (one HGETALL, or nothing on an L1 hit); sessions written before the
+        snapshot existed are rebuilt from the time indexes once and backfilled.
+        """
+        
+        cutoff_time = datetime.utcnow() - timedelta(hours=hours_back)
+        read_key = ("snapshot",)
+        hit, raw_items = self._l1_get(session_id, read_key)
+        if not hit:
+            epoch = self._l1_epoch
+            try:
+                raw_items = await self.backend.latest_per_type(session_id, [context_type.value for context_type in ContextType])
+            except Exception as e:
+                self.logger.error(f"Failed to get session snapshot: {e}")
+                return SessionContextSnapshot(session_id=session_id, items={}, hours_back=hours_back)
+            raw_items = {key: self.codec.decode(value) for key, value in raw_items.items()}
+            self._l1_put(session_id, read_key, raw_items, epoch)
+        
+        items = {}
+        for context_type, item in raw_items.items():
+            try:
+                if datetime.fromisoformat(item["timestamp"]) >= cutoff_time:
+                    items[ContextType(context_type)] = item
+            except (KeyError, ValueError):
+                self.logger.debug(f"Skipping malformed snapshot entry {context_type} for session {session_id}")
+        return SessionContextSnapshot(session_id=session_id, items=items, hours_back=hours_back)
+    
+    async def search_context(self, session_id: str, query: str, k: int = 5) -> List[ContextSnippet]:
+        """
+        The k stored context fields most relevant to a query (BM25), for prompt assembly.
+        
+        Searches the newest item of each context type. The session's index is
+        kept up to date by local writes and rebuilt from the snapshot when
+        missing (first use, eviction, or a write by another worker) or older
+        than l1_ttl_seconds, so missed invalidations leave it stale no longer
+        than the L1 cache.
+        """
+        
+        if not query:
+            return []
+        
+        if self.search_index.has_session(session_id):
+            return self.search_index.search(session_id, query, k)
+        
+        epoch = self._l1_epoch
+        snapshot = await self.get_session_snapshot(session_id, hours_back=self.CONTEXT_TTL_SECONDS / 3600)
+        self.search_index.ensure_session(session_id)
+        for context_type, item in snapshot.items.items():
+            self.search_index.index_item(session_id, context_type.value, item.get("data", {}), item.get("timestamp", ""))
+        snippets = self.search_index.search(session_id, query, k)
+        if epoch != self._l1_epoch:
+            # A write landed while the snapshot was read; rebuild on the next search
+            self.search_index.drop_session(session_id)
+        return snippets
+    
+    async def migrate_time_indexes(self, scan_count: int = 1000) -> int:
+        """
+        Backfill the time indexes for context keys stored before they existed.
+        
+        On Redis this walks the keyspace with SCAN (non-blocking, unlike KEYS)
+        and scores each key by its timestamp suffix; other backends index on
+        write and have nothing to migrate. Safe to re-run; returns the keys indexed.
+        """
+        
+        indexed = await self.backend.migrate(scan_count)
+        
+        # Reads cached before the backfill may have missed migrated contexts
+        self._l1.clear()
+        self._l1_epoch += 1
+        
+        self.logger.info(f"✅ Indexed {indexed} existing context keys by time")
+        return indexed
+    
+    async def compact_indexes(self, scan_count: int = 500, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Drop index entries whose primary context key no longer exists.
+        
+        On Redis, walks every index with SCAN and checks members in pipelined
+        batches of scan_count; other backends drop expired records. Returns (and
+        keeps in self.index_stats) the index count, entry count, dangling entries
+        and dangling ratio. With dry_run the indexes are only measured.
+        """
+        
+        started = time.perf_counter()
+        stats = await self.backend.compact(scan_count, dry_run)
+        indexes, entries, dangling = stats["indexes"], stats["entries"], stats["dangling_entries"]
+        
+        self.index_stats = {
+            "indexes": indexes,
+            "entries": entries,
+            "dangling_entries": dangling,
+            "dangling_ratio": dangling / entries if entries else 0.0,
+            "removed_entries": 0 if dry_run else dangling,
+            "compaction_seconds": round(time.perf_counter() - started, 3),
+            "compacted_at": datetime.utcnow().isoformat()
+        }
+        self.logger.info(
+            f"Index compaction{' (dry run)' if dry_run else ''}: {dangling}/{entries} dangling entries across {indexes} indexes"
+        )
+        return self.index_stats
+    
+    def start_index_compactor(self, interval_seconds: float = 3600):
+        """Run compact_indexes in the background every interval_seconds."""
+        
+        if self._compactor_task and not self._compactor_task.done():
+            return
+        
+        async def compact_forever():
+            while True:
+                try:
+                    await self.compact_indexes()
+                except Exception as e:
+                    self.logger.error(f"Index compaction failed: {e}")
+                await asyncio.sleep(interval_seconds)
+        
+        self._compactor_task = asyncio.ensure_future(compact_forever())
+    
+    async def stop_index_compactor(self):
+        if self._compactor_task:
+            self._compactor_task.cancel()
+            try:
+                await self._compactor_task
+            except asyncio.CancelledError:
+                pass
+            self._compactor_task = None
+    
+    def get_index_stats(self) -> Dict[str, Any]:
+        """Index size and dangling ratio from the last compaction (empty before the first run)."""
+        return dict(self.index_stats)
+    
+    @staticmethod
+    def _conversation_summary_key(session_id: str) -> str:
+        return f"conversation_summary:{session_id}"
+    
+    async def get_conversation_summary(self, session_id: str) -> RollingConversationSummary:
+        """
+        Rolling conversation summary for a session (new and empty if none is stored).
+        
+        The in-process copy or stored snapshot is brought up to date by folding
+        the session's conversation log entries written since, by any worker.
+        """
+        
+        summary = self._conversation_summaries.get(session_id)
+        if summary is not None:
+            self._conversation_summaries.move_to_end(session_id)
+        else:
+            try:
+                summary_json = await self.backend.get(self._conversation_summary_key(session_id))
+                if summary_json:
+                    summary = RollingConversationSummary.from_dict(json.loads(summary_json))
+            except Exception as e:
+                self.logger.error(f"Failed to load conversation summary: {e}")
             
-            # Session index (for "show me everything from this session")
-            session_index_key = f"session_context_index:{context_item.session_id}"
-            await self.redis_client.lpush(session_index_key, primary_key)
-            await self.redis_client.expire(session_index_key, 7 * 24 * 60 * 60)
-            
-            # Type index (for "show me all my lead generation work")
-            type_index_key = f"context_type_index:{context_item.context_type.value}"
-            await self.redis_client.lpush(type_index_key, primary_key)
-            await self.redis_client.expire(type_index_key, 30 * 24 * 60 * 60)  # 30 days
+            if summary is None:
+                summary = RollingConversationSummary(session_id, self.summary_token_budget)
             
+            self._conversation_summaries[session_id] = summary
+            while len(self._conversation_summaries) > self.MAX_CACHED_SUMMARIES:
+                self._conversation_summaries.popitem(last=False)
+        
+        if await self._fold_conversation_log(summary) >= self.CONVERSATION_SNAPSHOT_EVERY:
+            await self._save_conversation_summary(summary)
+        return summary
+    
+    async def record_conversation_message(self, session_id: str, role: str, content: str) -> bool:
+        """Append a chat message to the session's conversation log and refresh its summary snapshot."""
+        
+        if not content:
             return True
-            
+        try:
+            batch = ContextWriteBatch()
+            self._queue_conversation_entry(batch, session_id, {"kind": "message", "role": role or "", "content": content})
+            await self.backend.write(batch)
+            summary = await self.get_conversation_summary(session_id)
+            return await self._save_conversation_summary(summary)
         except Exception as e:
-            self.logger.error(f"Failed to store context item: {e}")
+            self.logger.error(f"Failed to record conversation message: {e}")
             return False
     
-    async def get_recent_context(self, session_id: str, context_type: str, hours_back: int = 2) -> Optional[Dict[str, Any]]:
-        """Get most recent context of specific type for session."""
+    @staticmethod
+    def _conversation_log_key(session_id: str) -> str:
+        return f"conversation_log:{session_id}"
+    
+    def _queue_conversation_entry(self, batch: ContextWriteBatch, session_id: str, fields: Dict[str, str]):
+        batch.append_to_stream(
+            self._conversation_log_key(session_id),
+            fields,
+            self.CONVERSATION_LOG_MAX_LENGTH,
+            self.CONVERSATION_SUMMARY_TTL_SECONDS
+        )
+    
+    def _queue_deliverable_entry(self, batch: ContextWriteBatch, context_item: ContextItem, results: Dict[str, Any]):
+        """Log stored agent work for the session's rolling summary."""
+        
+        deliverables = results.get("deliverables")
+        if not isinstance(deliverables, list):
+            deliverables = [
+                f"{key}: {value}" for key, value in context_item.data.items()
+                if isinstance(value, (str, int, float)) and value != ""
+            ]
+        self._queue_conversation_entry(batch, context_item.session_id, {
+            "kind": "deliverable",
+            "agent_type": context_item.context_type.value,
+            "business_goal": context_item.business_goal or "",
+            "deliverables": json.dumps(
+                deliverables[:RollingConversationSummary.MAX_DELIVERABLE_DETAILS], cls=WorkflowJSONEncoder
+            )
+        })
+    
+    async def _fold_conversation_log(self, summary: RollingConversationSummary) -> int:
+        """Apply log entries after summary.folded_through, in log order; returns how many were applied."""
         
+        folded = 0
         try:
-            cutoff_time = datetime.utcnow() - timedelta(hours=hours_back)
-            pattern = f"agent_context:{session_id}:{context_type}:*"
-            
-            keys = await self.redis_client.keys(pattern)
-            
-            # Find most recent within time bounds
-            for key in sorted(keys, reverse=True):
-                context_json = await self.redis_client.get(key)
-                if context_json:
-                    context_item = json.loads(context_json)
-                    context_time = datetime.fromisoformat(context_item["timestamp"])
-                    
-                    if context_time >= cutoff_time:
-                        return context_item["data"]
-            
-            return None
-            
+            while True:
+                entries = await self.backend.stream_range(
+                    self._conversation_log_key(summary.session_id), summary.folded_through, self.CONVERSATION_LOG_FETCH
+                )
+                for entry_id, fields in entries:
+                    if fields.get("kind") == "deliverable":
+                        summary.add_deliverable(
+                            fields.get("agent_type", ""), fields.get("business_goal", ""),
+                            json.loads(fields.get("deliverables") or "[]")
+                        )
+                    else:
+                        summary.add_message(fields.get("role", ""), fields.get("content", ""))
+                    summary.folded_through = entry_id
+                    folded += 1
+                if len(entries) < self.CONVERSATION_LOG_FETCH:
+                    break
         except Exception as e:
-            self.logger.error(f"Failed to get recent context: {e}")
-            return None
+            self.logger.error(f"Failed to fold conversation log: {e}")
+        return folded
+    
+    def _queue_conversation_summary(self, batch: ContextWriteBatch, summary: RollingConversationSummary):
+        batch.put_blob(
+            self._conversation_summary_key(summary.session_id),
+            json.dumps(summary.to_dict(), cls=WorkflowJSONEncoder),
+            self.CONVERSATION_SUMMARY_TTL_SECONDS
+        )
+    
+    async def _save_conversation_summary(self, summary: RollingConversationSummary) -> bool:
+        """
+        Save a folded snapshot. Concurrent saves may leave an older one in
+        place; readers then fold the extra log entries again, nothing is lost.
+        """
+        try:
+            batch = ContextWriteBatch()
+            self._queue_conversation_summary(batch, summary)
+            await self.backend.write(batch)
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to save conversation summary: {e}")
+            return False
+
+if __name__ == "__main__":
+    import os
+    
+    async def benchmark_context_writes(workflows: int = 200, agents_per_workflow: int = 4):
+        """
+        Write throughput: one command per round trip (old) vs one pipeline per item vs store_many per workflow.
+        
+        Run against a real Redis (REDIS_URL); the gap grows with network latency.
+        """
+        client = redis.from_url(os.environ.get("REDIS_URL", "redis://localhost:6379/15"), decode_responses=True)
+        store = UniversalContextStore(client)
+        agent_ids = ["branding_agent", "market_research_agent", "website_generator_agent", "content_marketing_agent"]
+        payload = {
+            "business_goal": "Launch an artisan bakery", "workflow_id": "bench",
+            "brand_name": "Crumb & Co", "color_palette": ["#f4e1c1", "#7a4b2a", "#2f2f2f"],
+            "key_findings": ["Weekend demand peaks", "Sourdough premium holds"], "market_analysis": {"size": "$4.2B", "growth": 0.06},
+            "sitemap": {"pages": ["home", "menu", "about", "order"]}, "homepage": {"hero": "Fresh every morning"},
+            "content_calendar": [{"week": w, "topic": f"Seasonal bake {w}"} for w in range(8)], "seo_keywords": ["bakery near me"]
+        }
+        results = {agent_id: payload for agent_id in agent_ids[:agents_per_workflow]}
+        
+        class SequentialWriter:
+            """Pipeline stand-in that sends every queued command as its own round trip."""
+            def __init__(self):
+                self.commands = []
+            
+            def __getattr__(self, name):
+                return lambda *args, **kwargs: self.commands.append(getattr(client, name)(*args, **kwargs))
+        
+        async def unpipelined(session_id: str):
+            # The pre-pipeline write path: same commands, one round trip each
+            for agent_id, agent_results in results.items():
+                context_item = store._build_context_item(session_id, agent_id, agent_results)
+                writer = SequentialWriter()
+                store.backend._queue_batch(writer, store._build_write_batch(session_id, [(context_item, agent_results)]))
+                for command in writer.commands:
+                    await command
+        
+        async def per_item(session_id: str):
+            for agent_id, agent_results in results.items():
+                await store.store_agent_context(session_id, agent_id, agent_results)
+        
+        async def batched(session_id: str):
+            await store.store_many(session_id, results)
+        
+        await client.ping()
+        for name, write in (("unpipelined", unpipelined), ("pipeline per item", per_item), ("store_many", batched)):
+            start = time.perf_counter()
+            for n in range(workflows):
+                await write(f"bench:{name}:{n}")
+            elapsed = time.perf_counter() - start
+            items = workflows * len(results)
+            print(f"{name:18} {items / elapsed:10.0f} items/s  ({elapsed / workflows * 1000:.2f} ms per workflow)")
+        
+        async for key in client.scan_iter(match="*bench:*"):
+            await client.delete(key)
+        await client.aclose()
+    
+    asyncio.run(benchmark_context_writes())